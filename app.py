@@ -1,213 +1,222 @@
 import streamlit as st
-import requests
-import pandas as pd
-import plotly.express as px
 import streamlit.components.v1 as components
 import json
-from gtts import gTTS
-import base64
-import io
-import difflib
-
-from docx import Document
-import re
-
-try:
-    import textstat
-
-    from textblob import TextBlob
-except ImportError:
-    pass
+import html
+import os
+import time
+import uuid
+from string import Template
+
+from resonate import EMOJI_LEVELS, LANGUAGES, LENGTHS, PERSONAS, PLATFORMS, VIBES, Engine
+from resonate.files import MAX_CHARS, content_hash, ingest
+from resonate import engine as engine_defaults
+from resonate.analysis import analyze_async, analyze_many, summarize
+from resonate.batch import build_matrix
+from resonate.diff import diff_texts, section_segments
+from resonate.keywords import keyword_hits, parse_keywords, score_many
+from resonate.history import HistoryStore
+from resonate.tts import synthesize
+from resonate.longdoc import DEFAULT_CHUNK_TOKENS
+from resonate.prompts import budget_warnings
+from resonate.tokens import count_tokens
+from resonate.tracing import tracer
+from resonate.fairqueue import FairScheduler
+from resonate.singleflight import SingleFlight
+from resonate.jobs import ACTIVE, JobQueue, TooManyJobs
+
+# Whole-script timing for the Performance panel
+RUN_STARTED = time.perf_counter()
 
 
 # --- CONFIGURATION ---
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
 API_TOKEN = st.secrets["HUGGING_FACE_API_KEY"]
-TEXT_MODEL = "meta-llama/Meta-Llama-3-8B-Instruct"
-headers = {"Authorization": f"Bearer {API_TOKEN}"}
-
-# --- AI LOGIC ---
-def query_ai(messages):
-    ROUTER_URL = "https://router.huggingface.co/v1/chat/completions"
-    payload = {
-        "model": TEXT_MODEL,
-        "messages": messages,
-        "max_tokens": 1000,
-        "temperature": 0.7
-    }
-    try:
-        response = requests.post(ROUTER_URL, headers=headers, json=payload, timeout=30)
-        if response.status_code == 200:
-            return response.json()
-        return {"error": f"API Error {response.status_code}"}
-    except Exception as e:
-        return {"error": str(e)}
-
-def query_audio(text):
-    # Neural TTS Model (Much more natural than gTTS)
-    API_URL = "https://api-inference.huggingface.co/models/facebook/mms-tts-eng"
-    try:
-        response = requests.post(API_URL, headers=headers, json={"inputs": text}, timeout=30)
-        if response.status_code == 200:
-            return response.content
-        return None
-    except:
-        return None
-
-def read_file(uploaded_file):
-    if uploaded_file.name.endswith('.docx'):
-        doc = Document(uploaded_file)
-        return "\n".join([para.text for para in doc.paragraphs])
-    else: # Plain text
-        return str(uploaded_file.read(), "utf-8")
+# Set to "" in secrets.toml to keep the response cache in memory only
+RESPONSE_CACHE_PATH = st.secrets.get("RESPONSE_CACHE_PATH", ".cache/responses.sqlite")
+# Overridable so the app can be pointed at a local stub server
+ROUTER_URL = st.secrets.get("HF_ROUTER_URL", engine_defaults.ROUTER_URL)
+TTS_URL = st.secrets.get("HF_TTS_URL", engine_defaults.TTS_URL)
+# Where completions run: "hf", "fake", "llama:<path.gguf>" or an OpenAI-compatible URL; several = latency-routed with failover
+BACKENDS = st.secrets.get("BACKENDS", "hf")
+# History survives refreshes via the ?sid= URL parameter; "" keeps it in memory for this server process only
+HISTORY_PATH = st.secrets.get("HISTORY_PATH", ".cache/history.sqlite")
+HISTORY_MAX_ROWS = int(st.secrets.get("HISTORY_MAX_ROWS", 500))
+HISTORY_MAX_AGE_DAYS = int(st.secrets.get("HISTORY_MAX_AGE_DAYS", 30))
+HISTORY_PAGE_SIZE = 10
+# Side-by-Side diff sections (~30 sentences each) rendered per "Show more"
+DIFF_SECTIONS_PER_PAGE = 3
+# Optional span log (JSONL) and Prometheus text file; "" disables either
+TRACE_PATH = st.secrets.get("TRACE_PATH", "")
+METRICS_PATH = st.secrets.get("METRICS_PATH", "")
+# Upstream capacity shared by every session on this server, handed out round-robin per session
+MAX_CONCURRENT_CALLS = int(st.secrets.get("MAX_CONCURRENT_CALLS", 8))
+PER_USER_CONCURRENT = int(st.secrets.get("PER_USER_CONCURRENT", 4))
+USER_QUOTA_PER_HOUR = int(st.secrets.get("USER_QUOTA_PER_HOUR", 0))  # 0 = unlimited
+# Several server processes sharing RESPONSE_CACHE_PATH can also coalesce identical in-flight calls
+COALESCE_ACROSS_WORKERS = bool(st.secrets.get("COALESCE_ACROSS_WORKERS", False))
+# Transformations run as background jobs so a rerun or refresh doesn't lose them
+JOB_WORKERS = int(st.secrets.get("JOB_WORKERS", 8))
+MAX_JOBS_PER_SESSION = int(st.secrets.get("MAX_JOBS_PER_SESSION", 3))
+JOB_POLL_SECONDS = 1.0
+# Batch variants start at most this many per second, whatever the parallelism
+BATCH_RATE = 2.0
+JOBS_SHOWN = 5
+
+# --- ENGINE ---
+@st.cache_resource
+def get_engine():
+    # One pooled HTTP client + response cache per server process, reused across reruns and sessions
+    lease_path = RESPONSE_CACHE_PATH if COALESCE_ACROSS_WORKERS and RESPONSE_CACHE_PATH else None
+    scheduler = FairScheduler(MAX_CONCURRENT_CALLS, PER_USER_CONCURRENT, quota=USER_QUOTA_PER_HOUR or None)
+    return Engine(API_TOKEN, router_url=ROUTER_URL, tts_url=TTS_URL, cache_path=RESPONSE_CACHE_PATH,
+                  flights=SingleFlight(lease_path=lease_path), scheduler=scheduler, backend=BACKENDS)
+
+@st.cache_resource
+def load_asset(name):
+    # CSS and HTML snippets are read once per process instead of rebuilt on every rerun
+    with open(os.path.join(ASSETS_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+@st.cache_resource
+def load_template(name):
+    # $text placeholders, since the CSS and JS inside are full of braces
+    return Template(load_asset(name))
+
+@st.cache_resource
+def get_job_queue():
+    # Shared by every session on this server process; jobs are looked up by session id
+    return JobQueue(max_workers=JOB_WORKERS, max_per_user=MAX_JOBS_PER_SESSION)
+
+@st.cache_resource
+def get_history_store():
+    return HistoryStore(HISTORY_PATH, max_rows_per_session=HISTORY_MAX_ROWS, max_age_days=HISTORY_MAX_AGE_DAYS)
+
+@st.cache_resource
+def get_tracer():
+    tracer.configure(TRACE_PATH, METRICS_PATH)
+    return tracer
+
+def save_to_history(session_id, original, res, data, tone, platform, vibe, language):
+    # Takes the session id explicitly since background jobs call it without a script context
+    return get_history_store().add(
+        session_id, original, res, data, f"{tone} | {platform} | {vibe} | {language}",
+        persona=tone, platform=platform, vibe=vibe, language=language
+    )
+
+def load_result(res, data, history_id=None):
+    # Clear all previous result states first
+    if 'final_edit_box' in st.session_state:
+        del st.session_state['final_edit_box']
+    st.session_state['out'] = res
+    st.session_state['data'] = data
+    st.session_state['out_id'] = history_id
 
 def render_social_preview(text, platform):
     if platform == "X (Twitter) 🐦":
-        html = f"""
-        <div style="font-family: sans-serif; background: #15202b; color: white; padding: 20px; border-radius: 12px; border: 1px solid #38444d; max-width: 500px; margin: auto;">
-            <div style="display: flex; gap: 12px;">
-                <div style="min-width: 48px; width: 48px; height: 48px; background: #7f00ff; border-radius: 50%;"></div>
-                <div>
-                    <div style="font-weight: bold;">You <span style="color: #657786; font-weight: normal;">@resonate_user · 1m</span></div>
-                    <div style="margin-top: 5px; font-size: 15px; line-height: 1.5;">{text}</div>
-                    <div style="margin-top: 15px; color: #657786; font-size: 18px;">
-                        💬 2 &nbsp;&nbsp; 🔄 5 &nbsp;&nbsp; ❤️ 12
-                    </div>
-                </div>
-            </div>
-        </div>
-        """
+        html = load_template("preview_x.html").safe_substitute(text=text)
         st.markdown(html, unsafe_allow_html=True)
 
     elif platform == "LinkedIn 🔵":
         preview_text = text[:200] + "... see more" if len(text) > 200 else text
-        html = f"""
-        <div style="font-family: sans-serif; background: white; color: black; padding: 15px; border-radius: 8px; border: 1px solid #e0e0e0; max-width: 500px; margin: auto;">
-            <div style="display: flex; gap: 10px; margin-bottom: 10px;">
-                <div style="min-width: 48px; width: 48px; height: 48px; background: #0a66c2; border-radius: 50%;"></div>
-                <div>
-                    <div style="font-weight: bold; font-size: 14px;">Your Name</div>
-                    <div style="color: gray; font-size: 12px;">Creative Visionary • 1st</div>
-                    <div style="color: gray; font-size: 12px;">1h • 🌐</div>
-                </div>
-            </div>
-            <div style="font-size: 14px; line-height: 1.5;">{preview_text}</div>
-            <div style="margin-top: 10px; height: 150px; background: #f3f2ef; display: flex; align-items: center; justify-content: center; color: gray; border-radius: 4px;">
-                [Image/Media Preview Block]
-            </div>
-            <div style="margin-top: 10px; border-top: 1px solid #e0e0e0; padding-top: 10px; display: flex; justify-content: space-between; color: gray; font-size: 14px;">
-                <span>👍 Like</span> <span>💬 Comment</span> <span>↪️ Share</span> <span>✈️ Send</span>
-            </div>
-        </div>
-        """
+        html = load_template("preview_linkedin.html").safe_substitute(text=preview_text)
         st.markdown(html, unsafe_allow_html=True)
     
     else:
         st.info(f"Visual preview not available for {platform} yet. Switch to 'Final Result' to see your text.")
 
-def execute_transformation(text, tone, platform, emoji_level, length, vibe, target_lang, custom_prompt, target_keywords):
-    tone_map = {
-        "Professional 👔": "Rewrite to be corporate-ready and sophisticated.",
-        "Grammar Medic 🩹": "Correct grammar, spelling, and flow only.",
-        "Brutally Honest 🎯": "Remove all fluff. Just facts.",
-        "Hype Man 🚀": "Make it high-energy and exciting.",
-        "Simplifier (ELI5) 👶": "Explain like I'm 5 years old.",
-        "Scientific / Academic 🧪": "Use technical, objective language.",
-        "Storyteller / Creative 📖": "Add descriptive flair.",
-        "Motivational Coach 🏆": "Focus on growth and energy.",
-        "Angry Customer 😤": "Demanding, dissatisfied tone.",
-        "Passive Aggressive 🙃": "Politely annoying.",
-        "Legal/Formal ⚖️": "Strict legal terminology.",
-        "Gen Z / Slang 🧢": "Modern slang.",
-        "Shakespearean 🎭": "William Shakespeare style.",
-        "Pirate 🏴‍☠️": "Gritty pirate captain style."
-    }
-
-    platform_map = {
-        "Standard Text 📄": "Paragraphs.",
-        "WhatsApp 🟢": "Use *bold* for emphasis. Chatty.",
-        "LinkedIn 🔵": "Professional spacing + 3 hashtags.",
-        "Instagram 📸": "Vibrant + hashtag block.",
-        "X (Twitter) 🐦": "Concise hook + 2 hashtags.",
-        "Email 📧": "Subject, Greeting, Body, Sign-off.",
-        "Slack / Discord 💬": "Fast-paced formatting.",
-        "Reddit 🤖": "Markdown + TL;DR.",
-        "YouTube Script 🎬": "Hook, Intro, Body, CTA.",
-        "SMS 📱": "Maximum brevity."
-    }
-
-    emoji_instr = {"None 🚫": "No emojis.", "Sparse 🤏": "Max 2 emojis.", "Heavy ✨": "Generous emojis."}[emoji_level]
-    vibe_instr = f"Atmosphere: {vibe}. Additional constraint: {custom_prompt}."
-    
-    kw_instruction = ""
-    if target_keywords:
-        kw_instruction = f"MANDATORY: You must naturally include these exact keywords: {target_keywords}."
-
-    messages = [
-        {"role": "system", "content": f"You are Resonate AI. Task: {tone_map.get(tone)}. {platform_map.get(platform)}. {emoji_instr} {vibe_instr} {kw_instruction} Length: {length}. Output ONLY the transformed text in {target_lang}. IMPORTANT: On a new line at the very end, add exactly this: [SCORES] followed by 5 comma-separated numbers (0-100) representing (Clarity, Energy, Professionalism, Creativity, Emotion). Example: [SCORES] 85,70,90,65,80"},
-        {"role": "user", "content": f"Text: \"{text}\""}
-    ]
-
+JOB_ICONS = {"queued": "⏳", "running": "⚙️", "done": "✅", "failed": "❌", "cancelled": "🚫"}
+
+def render_jobs(session_id):
+    jobs = get_job_queue().jobs(session_id)
+    seen = st.session_state.setdefault('jobs_seen', set())
+    finished = [job for job in jobs if job['status'] not in ACTIVE and job['id'] not in seen]
+    if finished:
+        seen.update(job['id'] for job in finished)
+        # The newest result is shown as soon as it lands (results are already in history)
+        landed = [job for job in finished if job['status'] == "done"]
+        for job in landed:
+            if job['kind'] == "batch":
+                st.session_state['batch_results'] = job['result']
+                break
+        for job in landed:
+            if job['kind'] != "batch":
+                load_result(*job['result'], job['history_id'])
+                break
+        if landed:
+            st.session_state['history_page'] = 0
+        st.rerun()
+
+    for job in jobs[:JOBS_SHOWN]:
+        j1, j2 = st.columns([5, 1])
+        status = job['status']
+        if status == "running":
+            status = f"running {time.time() - job['started']:.0f}s"
+        j1.caption(f"{JOB_ICONS[job['status']]} {job['label']} · {status}" + (f" · {job['progress']}" if job['progress'] else ""))
+        if job['status'] in ACTIVE:
+            if j2.button("✖", key=f"job_cancel_{job['id']}", help="Cancel this transformation"):
+                get_job_queue().cancel(job['id'], session_id)
+                st.rerun()
+            if job['partial']:
+                st.markdown(f'<div class="output-container">{job["partial"]}</div>', unsafe_allow_html=True)
+            if job['items']:
+                # Batch variants fill the grid as they finish; the full comparison (with Load buttons) follows when done
+                grid = st.columns(3)
+                for i, item in enumerate(job['items']):
+                    with grid[i % 3]:
+                        render_batch_card(item['variant'], item['transformed'], item['metrics'])
+        elif job['status'] == "done":
+            if j2.button("🔄", key=f"job_load_{job['id']}", help="Load this result"):
+                if job['kind'] == "batch":
+                    st.session_state['batch_results'] = job['result']
+                else:
+                    load_result(*job['result'], job['history_id'])
+                st.rerun()
+        elif job['error']:
+            j1.caption(job['error'])
 
-    output = query_ai(messages)
+def lazy_tabs(labels, key):
+    # Newer Streamlit only runs the selected tab's body with on_change="rerun"; older versions render every tab
     try:
-        if "choices" in output:
-            full_res = output["choices"][0]["message"]["content"].strip()
-            
-            # More robust extraction using unique delimiter
-            if "[SCORES]" in full_res:
-                parts = full_res.split("[SCORES]")
-                text_part = parts[0].strip()
-                score_str = parts[1].strip()
-                
-                # Extract digits from the score string
-                scores = re.findall(r'\d+', score_str)
-                if len(scores) >= 5:
-                    data_part = ",".join(scores[:5])
-                    return text_part, data_part
-            
-            # Fallback regex search if delimiter is missing but scores are present
-            score_match = re.search(r'(\d{1,3}(?:,\s*)?){5}', full_res)
-            if score_match:
-                matched_str = score_match.group(0)
-                scores = re.findall(r'\d+', matched_str)
-                if len(scores) >= 5:
-                    data_part = ",".join(scores[:5])
-                    text_part = full_res.replace(matched_str, "").replace("[SCORES]", "").strip()
-                    return text_part, data_part
-
-
-            return full_res, "50,50,50,50,50"
-        return f"⚠️ {output.get('error')}", "0,0,0,0,0"
-    except Exception as e:
-        return f"❌ Transformation Failed: {str(e)}", "0,0,0,0,0"
+        return st.tabs(labels, key=key, on_change="rerun")
+    except TypeError:
+        return st.tabs(labels)
+
+def tab_is_open(tab):
+    return getattr(tab, "open", True) is not False
+
+def render_diff_pane(segments):
+    # Escaped here since the diff wraps model output in markup of its own
+    parts = []
+    for text, tag in segments:
+        text = html.escape(text)
+        parts.append(f'<span class="diff-{tag}">{text}</span>' if tag != "equal" else text)
+    return f'<div class="output-container diff-pane">{"".join(parts)}</div>'
+
+def render_keyword_marks(text, hits):
+    spans = sorted((start, end) for hit in hits for start, end in hit['positions'])
+    parts, last = [], 0
+    for start, end in spans:
+        if start < last:
+            continue  # Overlapping phrase, already marked
+        parts.append(html.escape(text[last:start]))
+        parts.append(f'<mark class="kw-hit">{html.escape(text[start:end])}</mark>')
+        last = end
+    parts.append(html.escape(text[last:]))
+    return f'<div class="output-container diff-pane">{"".join(parts)}</div>'
+
+def variant_label(variant):
+    return f"{variant['tone']} | {variant['platform']} | {variant['vibe']} | {variant['target_lang']}"
+
+def render_batch_card(variant, res, data):
+    st.caption(f"{variant_label(variant)} | {variant['emoji_level']} | {variant['length']}")
+    st.markdown(f'<div class="output-container">{res}</div>', unsafe_allow_html=True)
+    st.caption(f"Scores (Clarity, Energy, Professionalism, Creativity, Emotion): {data}")
 
 # --- UI SETUP ---
 st.set_page_config(page_title="Resonate AI", page_icon="🦋", layout="wide")
+get_tracer()  # Apply export paths before anything is traced
 
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600&display=swap');
-    .main { background-color: #0e1117; font-family: 'Inter', sans-serif; }
-    .stTextArea textarea { border-color: #7f00ff; border-radius: 12px; }
-    .stButton>button {
-        background: #7f00ff;
-        color: white; border-radius: 15px; height: 3.5em; font-weight: bold; border: none;
-    }
-    .output-container {
-        background: rgba(255, 255, 255, 0.03);
-        padding: 25px; border-radius: 12px; border-left: 5px solid #7f00ff;
-        font-size: 1.1rem; line-height: 1.6; color: #f0f0f0;
-        white-space: pre-wrap; word-wrap: break-word;
-    }
-
-    div[data-testid="stNotification"] {
-        word-wrap: break-word;
-        white-space: pre-wrap;
-    }
-
-</style>
-
-""", unsafe_allow_html=True)
+st.markdown(f"<style>{load_asset('style.css')}</style>", unsafe_allow_html=True)
 
 st.title("🦋 Resonate AI")
 st.markdown("""
@@ -216,35 +225,53 @@ st.markdown("""
 """)
 
 # --- SESSION STATE INITIALIZATION ---
-if 'history' not in st.session_state:
-    st.session_state['history'] = []
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = st.query_params.get("sid") or uuid.uuid4().hex
+if st.query_params.get("sid") != st.session_state['session_id']:
+    st.query_params["sid"] = st.session_state['session_id']
+if 'out_id' not in st.session_state:
+    st.session_state['out_id'] = None
+if 'history_page' not in st.session_state:
+    st.session_state['history_page'] = 0
 if 'out' not in st.session_state:
     st.session_state['out'] = None
 if 'data' not in st.session_state:
     st.session_state['data'] = None
+if 'batch_results' not in st.session_state:
+    st.session_state['batch_results'] = []
 
 with st.sidebar:
     st.header("📜 Session History")
-    if not st.session_state['history']:
-        st.info("No history yet. Start resonating!")
-    
-    for i, item in enumerate(reversed(st.session_state['history'])):
-        # Calculate original index since we are reversed
-        orig_idx = len(st.session_state['history']) - 1 - i
-        with st.expander(f"Run #{orig_idx + 1}: {item['style']}"):
+    history = get_history_store()
+    sid = st.session_state['session_id']
+    history_query = st.text_input("Search history", placeholder="Search originals and results...", label_visibility="collapsed")
+    history_total = history.count(sid, query=history_query)
+    if not history_total:
+        st.info("No matching runs." if history_query else "No history yet. Start resonating!")
+
+    # Only the visible page is queried; full texts are fetched by id on Load
+    last_page = max(0, (history_total - 1) // HISTORY_PAGE_SIZE)
+    page = min(st.session_state['history_page'], last_page)
+    for i, item in enumerate(history.page(sid, offset=page * HISTORY_PAGE_SIZE, limit=HISTORY_PAGE_SIZE, query=history_query)):
+        run_no = history_total - page * HISTORY_PAGE_SIZE - i
+        label = f"Run #{run_no}: {item['style']}" if not history_query else item['style']
+        with st.expander(label):
             st.caption("Transformed Preview:")
-            st.text(item['transformed'][:100] + "...")
-            if st.button("🔄 Load", key=f"load_{orig_idx}"):
-                # Clear all previous result states first
-                st.session_state['out'] = None
-                st.session_state['data'] = None
-                if 'final_edit_box' in st.session_state:
-                    del st.session_state['final_edit_box']
-                
-                # Load new values
-                st.session_state['out'] = item['transformed']
-                st.session_state['data'] = item['metrics']
+            st.text(item['preview'] + "...")
+            if st.button("🔄 Load", key=f"load_{item['id']}"):
+                row = history.get(item['id'])
+                load_result(row['transformed'], row['metrics'], row['id'])
                 st.rerun()
+
+    if history_total > HISTORY_PAGE_SIZE:
+        h1, h2, h3 = st.columns([1, 2, 1])
+        if h1.button("◀", disabled=page == 0, key="history_prev"):
+            st.session_state['history_page'] = page - 1
+            st.rerun()
+        h2.caption(f"Page {page + 1} of {last_page + 1}")
+        if h3.button("▶", disabled=page >= last_page, key="history_next"):
+            st.session_state['history_page'] = page + 1
+            st.rerun()
     
     st.divider()
     st.header("🛠️ Manual Overrides")
@@ -253,6 +280,60 @@ with st.sidebar:
     st.divider()
     st.header("🎯 SEO Targeting")
     target_keywords = st.text_input("Target Keywords (comma separated)", placeholder="e.g. AI, growth, synergy")
+    keyword_stem = st.checkbox("Count plurals and inflections", value=True, help='"campaign" also matches "campaigns" and "campaigning". Turn off for exact words only.')
+
+    st.divider()
+    st.header("⚡ Response Cache")
+    cache_info = get_engine().cache.snapshot()
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Hits", cache_info["hits"] + cache_info["disk_hits"])
+    m2.metric("Misses", cache_info["misses"])
+    m3.metric("Evictions", cache_info["evictions"])
+    st.caption(f"Hit rate {cache_info['hit_rate']:.0%} · {cache_info['entries']} in memory ({cache_info['bytes'] / 1024:.1f} KB) · {cache_info['disk_entries']} on disk")
+    if USER_QUOTA_PER_HOUR:
+        used, quota = get_engine().scheduler.usage(sid)
+        st.caption(f"Your quota: {used}/{quota} model calls this hour (cached results are free)")
+    if st.button("🧹 Clear Cache", use_container_width=True, help="Forget the replies cached for this session; other sessions keep theirs."):
+        # The cache is shared by every session in the process, so only our own entries go
+        get_engine().cache.clear(owner=sid)
+        st.rerun()
+
+    st.divider()
+    if st.toggle("⏱️ Performance", help="Latency percentiles, cache hit rate and token usage for this server process."):
+        perf = get_tracer().snapshot()
+        runs = perf['runs']
+        tokens_per_run = sum(r['prompt_tokens'] + r['completion_tokens'] for r in runs) / len(runs) if runs else 0
+        p1, p2, p3 = st.columns(3)
+        p1.metric("Hit Rate", f"{cache_info['hit_rate']:.0%}")
+        p2.metric("Tokens/Run", f"{tokens_per_run:.0f}")
+        p3.metric("Runs", len(runs))
+        if runs:
+            last = runs[-1]
+            st.caption(f"Last run: {last['prompt_tokens']} prompt + {last['completion_tokens']} completion tokens in {last['ms'] / 1000:.2f}s")
+        if perf['spans']:
+            spans_rows = sorted((
+                {"span": name, "n": s['count'], "p50 ms": round(s['p50_ms'], 1), "p95 ms": round(s['p95_ms'], 1), "errors": s['errors']}
+                for name, s in perf['spans'].items()
+            ), key=lambda row: row["p95 ms"], reverse=True)
+            st.dataframe(spans_rows, hide_index=True, use_container_width=True)
+        if hasattr(get_engine().backend, "snapshot"):
+            st.caption("Backends (moving averages)")
+            st.dataframe([
+                {"backend": b['backend'], "healthy": b['healthy'], "ms": round(b['complete_ms'] or 0), "ttft ms": round(b['stream_ms'] or 0),
+                 "errors": f"{b['error_rate']:.0%}", "calls": b['calls'], "wins": b['wins']}
+                for b in get_engine().backend.snapshot()
+            ], hide_index=True, use_container_width=True)
+        queue_info = get_engine().scheduler.snapshot()
+        job_info = get_job_queue().snapshot()
+        st.caption(f"HTTP retries: {perf['counters'].get('http.retries', 0):.0f} · coalesced: {perf['counters'].get('singleflight.joined', 0):.0f}"
+                   f" · cut at max_tokens: {perf['counters'].get('tokens.truncated', 0):.0f}"
+                   f" · hedged: {perf['counters'].get('router.hedged', 0):.0f} · failovers: {perf['counters'].get('router.failover', 0):.0f}"
+                   f" · in flight: {queue_info['active']} ({queue_info['queued']} queued)"
+                   f" · jobs: {job_info['running']} running, {job_info['queued']} waiting" + (f" · spans → {TRACE_PATH}" if TRACE_PATH else ""))
+        st.download_button("📥 Prometheus metrics", data=get_tracer().prometheus(), file_name="resonate_metrics.prom", mime="text/plain", use_container_width=True)
+        if st.button("↺ Reset Stats", use_container_width=True):
+            get_tracer().reset()
+            st.rerun()
 
 col1, col2 = st.columns([1.5, 1])
 
@@ -263,11 +344,17 @@ with col1:
     input_text_placeholder = "Drop your messy thoughts here, let them resonate..."
 
     if input_mode == "Upload File 📂":
-        uploaded_file = st.file_uploader("Drop your draft (DOCX, TXT)", type=['docx', 'txt'])
+        uploaded_file = st.file_uploader("Drop your draft (DOCX, TXT, PDF)", type=['docx', 'txt', 'pdf'])
         if uploaded_file:
+            # Hash each upload once per session; the parse itself is cached by content hash
+            upload_hashes = st.session_state.setdefault('upload_hashes', {})
+            if uploaded_file.file_id not in upload_hashes:
+                upload_hashes[uploaded_file.file_id] = content_hash(uploaded_file)
+            parsed = ingest(uploaded_file, digest=upload_hashes[uploaded_file.file_id])
+            if parsed['truncated']:
+                st.warning(f"Large file: only the first part was loaded (limit {MAX_CHARS:,} characters or the page/byte ceiling).")
             # Auto-fill the text area with file content
-            file_text = read_file(uploaded_file)
-            u_text = st.text_area("File Content (Editable):", value=file_text, height=400)
+            u_text = st.text_area("File Content (Editable):", value=parsed['text'], height=400)
         else:
             u_text = ""
             st.info("Waiting for file...")
@@ -277,65 +364,158 @@ with col1:
 with col2:
     st.subheader("⚙️ Refinement Suite")
     with st.expander("Step 1: Choose Persona 🎭", expanded=True):
-        t = st.selectbox("Persona Mode:", ["Professional 👔", "Grammar Medic 🩹", "Simplifier (ELI5) 👶", "Brutally Honest 🎯", "Hype Man 🚀", "Scientific / Academic 🧪", "Storyteller / Creative 📖", "Motivational Coach 🏆", "Angry Customer 😤", "Passive Aggressive 🙃", "Legal/Formal ⚖️", "Gen Z / Slang 🧢", "Shakespearean 🎭", "Pirate 🏴‍☠️"])
+        t = st.selectbox("Persona Mode:", PERSONAS)
     
     with st.expander("Step 2: Define Destination 🚀", expanded=True):
-        p = st.selectbox("Platform Format:", ["Standard Text 📄", "WhatsApp 🟢", "LinkedIn 🔵", "Instagram 📸", "X (Twitter) 🐦", "Email 📧", "Slack / Discord 💬", "Reddit 🤖", "YouTube Script 🎬", "SMS 📱"])
+        p = st.selectbox("Platform Format:", PLATFORMS)
     
     with st.expander("Step 3: Style intensity ✨", expanded=False):
         c1, c2 = st.columns(2)
-        with c1: e = st.selectbox("Emoji Level:", ["None 🚫", "Sparse 🤏", "Heavy ✨"], index=1)
-        with c2: l = st.selectbox("Output Depth:", ["Concise", "Detailed"])
+        with c1: e = st.selectbox("Emoji Level:", EMOJI_LEVELS, index=1)
+        with c2: l = st.selectbox("Output Depth:", LENGTHS)
     
     with st.expander("Step 4: Atmosphere Tuning 🎻", expanded=False):
-        v = st.select_slider("Select Vibe", options=["Neutral", "Inspiring", "Cynical", "Grateful", "Sarcastic"])
+        v = st.select_slider("Select Vibe", options=VIBES)
 
     with st.expander("Step 5: Global Reach 🌍", expanded=False):
-        target_lang = st.selectbox("Target Language 🌍", ["English", "Spanish", "French", "German", "Hindi", "Japanese", "Chinese", "Arabic", "Portuguese", "Russian"])
+        target_lang = st.selectbox("Target Language 🌍", LANGUAGES)
 
     with st.expander("Step 6: Insights Architect 📊", expanded=False):
         show_stats = st.checkbox("Show Linguistic Analysis (Charts)", value=True)
+        stream_output = st.checkbox("Stream output live ⚡", value=True, help="Render tokens as they are generated.")
+        llm_scores = st.checkbox("Ask the model for scores 🤖", value=False, help="By default the radar scores are computed locally, which saves output tokens and latency.")
+        long_mode = st.checkbox("Long-document mode 📚", value=False, help="Split long drafts into chunks, transform them in parallel and stitch the result.")
+
+    with st.expander("Step 7: Batch Variants 🧪", expanded=False):
+        st.caption("Render the same draft across several combinations at once.")
+        b_tones = st.multiselect("Personas", PERSONAS, default=[t])
+        b_platforms = st.multiselect("Platforms", PLATFORMS, default=[p])
+        b1, b2 = st.columns(2)
+        with b1: b_emojis = st.multiselect("Emoji Levels", EMOJI_LEVELS, default=[e])
+        with b2: b_lengths = st.multiselect("Depths", LENGTHS, default=[l])
+        b_vibes = st.multiselect("Vibes", VIBES, default=[v])
+        b_langs = st.multiselect("Languages", LANGUAGES, default=[target_lang])
+        batch_workers = st.slider("Parallel requests", 1, 8, 4, help=f"Variants in flight at once. New requests also start at most {BATCH_RATE:g} per second.")
+        batch_variants = build_matrix(b_tones, b_platforms, b_emojis, b_lengths, b_vibes, b_langs)
+        st.caption(f"{len(batch_variants)} variant(s) queued · up to {batch_workers} at once, starting at most {BATCH_RATE:g}/s")
+        run_batch_clicked = st.button("🧪 RUN BATCH", use_container_width=True, disabled=not batch_variants)
 
     st.divider()
+    if u_text and not long_mode:
+        # Counted locally before anything is sent, so a reply that won't fit is flagged right by the button
+        warnings = budget_warnings(u_text, p, l, target_lang)
+        for warning in warnings:
+            st.warning(warning, icon="✂️")
+        draft_tokens = count_tokens(u_text)
+        if not warnings and draft_tokens > DEFAULT_CHUNK_TOKENS:
+            st.caption(f"This draft is ~{draft_tokens} tokens; long-document mode is recommended.")
     if st.button("🚀 EXECUTE FULL TRANSFORMATION", use_container_width=True):
         if u_text:
-            with st.spinner("Analyzing resonance..."):
-                res, data = execute_transformation(u_text, t, p, e, l, v, target_lang, custom_prompt, target_keywords)
-                st.session_state['out'] = res
-
-                st.session_state['data'] = data
-                # Append to history
-                st.session_state['history'].append({
-                    "original": u_text,
-                    "transformed": res,
-                    "style": f"{t} | {p} | {v} | {target_lang}",
-                    "metrics": data
-                })
-                # Rerun to force the UI to recognize session state changes and update the text_area
+            # Submitted as a background job: touching a widget mid-request no longer throws the result away
+            engine = get_engine()
+            args = (u_text, t, p, e, l, v, target_lang, custom_prompt, target_keywords)
+
+            def run(job):
+                if long_mode:
+                    done = set()
+                    def on_chunk(index, total, chunk_res, chunk_data):
+                        done.add(index)
+                        job.report(f"{len(done)}/{total} chunks")
+                    return engine.execute_long_document(*args, on_chunk=on_chunk, llm_scores=llm_scores, user=sid, should_cancel=lambda: job.cancelled)
+                return engine.execute_transformation(*args, on_token=job.stream if stream_output else None, llm_scores=llm_scores, user=sid)
+
+            def on_done(job, result):
+                res, data = result
+                return save_to_history(sid, u_text, res, data, t, p, v, target_lang)
+
+            try:
+                get_job_queue().submit(sid, run, label=f"{t} · {p} · {' '.join(u_text.split())[:32]}", on_done=on_done)
                 st.rerun()
+            except TooManyJobs as err:
+                st.warning(str(err))
 
         else:
             st.warning("Input required to resonate.")
 
+    # Polls only while something is queued or running; a finished job triggers one full rerun
+    @st.fragment(run_every=JOB_POLL_SECONDS if any(job['status'] in ACTIVE for job in get_job_queue().jobs(sid)) else None)
+    def jobs_panel():
+        render_jobs(sid)
+
+    jobs_panel()
+
+if run_batch_clicked:
+    if u_text:
+        # A background job like single runs, so a widget change mid-batch doesn't lose the variants
+        engine = get_engine()
+        variants = list(batch_variants)
+
+        def run_batch_job(job):
+            results = [None] * len(variants)
+
+            def on_batch_result(index, variant, result):
+                res, data = result
+                # Each variant is saved as it lands, unless the batch was cancelled meanwhile
+                history_id = None if job.cancelled else save_to_history(sid, u_text, res, data, variant['tone'], variant['platform'], variant['vibe'], variant['target_lang'])
+                results[index] = {"variant": variant, "transformed": res, "metrics": data, "history_id": history_id}
+                # Shown in the jobs panel as each variant lands, not only when the whole batch is done
+                job.add_item(results[index])
+                job.report(f"{sum(r is not None for r in results)}/{len(results)} variants")
+
+            engine.execute_batch(u_text, variants, custom_prompt, target_keywords, max_workers=batch_workers, rate=BATCH_RATE, on_result=on_batch_result, llm_scores=llm_scores, user=sid, should_cancel=lambda: job.cancelled)
+            return results
+
+        try:
+            get_job_queue().submit(sid, run_batch_job, label=f"🧪 Batch of {len(variants)} · {' '.join(u_text.split())[:32]}", kind="batch")
+            st.rerun()
+        except TooManyJobs as err:
+            st.warning(str(err))
+    else:
+        st.warning("Input required to resonate.")
+if st.session_state['batch_results']:
+    st.divider()
+    st.subheader("🧪 Batch Comparison")
+    grid = st.columns(3)
+    for i, item in enumerate(st.session_state['batch_results']):
+        with grid[i % 3]:
+            render_batch_card(item['variant'], item['transformed'], item['metrics'])
+            if st.button("🔄 Load", key=f"batch_load_{i}"):
+                load_result(item['transformed'], item['metrics'], item.get('history_id'))
+                st.rerun()
+    try:
+        batch_df = analyze_many([item['transformed'] for item in st.session_state['batch_results']])
+        batch_df.insert(0, "variant", [variant_label(item['variant']) for item in st.session_state['batch_results']])
+        batch_keywords = parse_keywords(target_keywords)
+        if batch_keywords:
+            batch_df.insert(1, "keyword hit rate", score_many([item['transformed'] for item in st.session_state['batch_results']], batch_keywords, stem=keyword_stem)["hit_rate"])
+        st.caption("Linguistic X-Ray per variant")
+        st.dataframe(batch_df, hide_index=True, use_container_width=True)
+    except Exception:
+        st.caption("Linguistic X-Ray unavailable for this batch.")
+
 if st.session_state['out']:
     st.divider()
     
     # Keyword Hit Rate Check
     if target_keywords:
         st.subheader("🎯 Keyword Hit Rate")
-        keywords = [k.strip().lower() for k in target_keywords.split(",") if k.strip()]
+        keywords = parse_keywords(target_keywords)
         if keywords:
+            # One pass over the output for every keyword; parts of words never count, inflections only with stemming on
+            hits = keyword_hits(st.session_state['out'], keywords, stem=keyword_stem)
             found_count = 0
             cols = st.columns(len(keywords))
-            lower_out = st.session_state['out'].lower()
-            
-            for idx, kw in enumerate(keywords):
-                if kw in lower_out:
-                    cols[idx].success(f"✅ {kw}")
+
+            for idx, hit in enumerate(hits):
+                if hit['count']:
+                    cols[idx].success(f"✅ {hit['keyword']} ×{hit['count']}")
                     found_count += 1
                 else:
-                    cols[idx].error(f"❌ {kw}")
-            
+                    cols[idx].error(f"❌ {hit['keyword']}")
+
+            if found_count:
+                with st.expander("🔍 Highlight matches"):
+                    st.markdown(render_keyword_marks(st.session_state['out'], hits), unsafe_allow_html=True)
             if found_count == len(keywords):
                 st.balloons()
         st.divider()
@@ -347,7 +527,7 @@ if st.session_state['out']:
         tab_list.append("👀 Social Preview")
     tab_list.extend(["⚖️ Side-by-Side", "📊 Linguistic Analysis"])
     
-    tabs = st.tabs(tab_list)
+    tabs = lazy_tabs(tab_list, key="result_tabs")
     
     # Unpack tabs correctly
     if show_preview:
@@ -366,40 +546,7 @@ if st.session_state['out']:
         with c_p1:
             # Copy to Clipboard Button using JS
             js_text = st.session_state["out"].replace('`', '\\`').replace('\n', '\\n')
-            copy_js = f"""
-            <button id="copy-btn" onclick="copyToClipboard()" style="
-                background: transparent;
-                color: #bc82ff;
-                border: 1px solid rgba(127, 0, 255, 0.5);
-                border-radius: 10px;
-                padding: 10px 20px;
-                font-weight: 600;
-                cursor: pointer;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                gap: 8px;
-                transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-                font-family: 'Inter', sans-serif;
-                white-space: nowrap;
-                box-shadow: 0 4px 15px rgba(127, 0, 255, 0.1);
-            " onmouseover="this.style.background='rgba(127, 0, 255, 0.1)'; this.style.boxShadow='0 0 15px rgba(127, 0, 255, 0.4)';" onmouseout="this.style.background='transparent'; this.style.boxShadow='0 4px 15px rgba(127, 0, 255, 0.1)';">
-                📋 Copy Result
-            </button>
-
-            <script>
-            function copyToClipboard() {{
-                const text = `{js_text}`;
-                navigator.clipboard.writeText(text).then(() => {{
-                    const btn = document.getElementById('copy-btn');
-                    btn.innerHTML = "✨ Copied!";
-                    setTimeout(() => {{
-                        btn.innerHTML = "📋 Copy Result";
-                    }}, 2000);
-                }});
-            }}
-            </script>
-            """
+            copy_js = load_template("copy_button.html").safe_substitute(text=js_text)
             components.html(copy_js, height=62)
 
         with c_p2:
@@ -419,49 +566,74 @@ if st.session_state['out']:
 
     with tab2:
         col_a, col_b = st.columns(2)
-        # Find original text for comparison
-        # Fallback to current input if not in history or if just loaded
+        # Look the original up by history id; fall back to the current input
         orig_text = u_text
-        for item in reversed(st.session_state['history']):
-            if item['transformed'] == st.session_state['out']:
-                orig_text = item['original']
-                break
-                
-        with col_a:
-            st.caption("Original")
-            st.info(orig_text if orig_text else "No original text available.")
-        with col_b:
-            st.caption("Resonated")
-            st.success(st.session_state['out'])
+        if st.session_state['out_id'] is not None:
+            row = get_history_store().get(st.session_state['out_id'])
+            if row:
+                orig_text = row['original']
+
+        if not orig_text:
+            with col_a:
+                st.caption("Original")
+                st.info("No original text available.")
+            with col_b:
+                st.caption("Resonated")
+                st.success(st.session_state['out'])
+        elif tab_is_open(tab2):
+            diff = diff_texts(orig_text, st.session_state['out'])
+            stats = diff['stats']
+            with col_a:
+                st.caption(f"Original · {stats['removed']} removed · {stats['changed']} rewritten")
+            with col_b:
+                st.caption(f"Resonated · {stats['added']} added · {stats['kept']} kept as-is")
+            word_level = st.toggle("Word-level highlights", value=True, key="diff_words")
+            # Sections render a page at a time so a huge diff doesn't freeze the browser
+            shown_key, shown = st.session_state.get('diff_shown', (None, 0))
+            shown = shown if shown_key == diff['key'] else DIFF_SECTIONS_PER_PAGE
+            for index in range(min(shown, len(diff['sections']))):
+                left, right = section_segments(diff, index, words=word_level)
+                col_a, col_b = st.columns(2)
+                col_a.markdown(render_diff_pane(left), unsafe_allow_html=True)
+                col_b.markdown(render_diff_pane(right), unsafe_allow_html=True)
+            if shown < len(diff['sections']):
+                if st.button(f"Show more ({len(diff['sections']) - shown} section(s) left)", key="diff_more"):
+                    st.session_state['diff_shown'] = (diff['key'], shown + DIFF_SECTIONS_PER_PAGE)
+                    st.rerun()
 
     with tab3:
+        # Start the X-Ray on the worker pool now so it overlaps with audio/chart rendering below
+        xray_future = analyze_async(st.session_state['out']) if tab_is_open(tab3) else None
         # On-demand Voice Synthesis moved here to keep page short
         if st.button("🔊 Generate Audio"):
             try:
                 with st.spinner("Synthesizing..."):
-                    audio_content = query_audio(st.session_state['out'])
-                    if audio_content:
-                        b64_audio = base64.b64encode(audio_content).decode()
-                        format_type = "wav"
+                    first_part = st.empty()
+                    def on_audio_chunk(index, total, chunk_audio, chunk_mime):
+                        # Start playback as soon as the opening sentences are ready
+                        if index == 0 and total > 1:
+                            with first_part.container():
+                                st.caption(f"▶ Part 1 of {total} (the rest follows when ready)")
+                                st.audio(chunk_audio, format=chunk_mime, autoplay=True)
+                    parts, mime = synthesize(get_engine(), st.session_state['out'], on_chunk=on_audio_chunk)
+                    # The full narration renders below, so the early preview goes
+                    first_part.empty()
+                    if parts:
+                        st.session_state['audio'] = (st.session_state['out'], parts, mime)
                     else:
-                        tts = gTTS(text=st.session_state['out'], lang='en', tld='co.uk')
-                        audio_fp = io.BytesIO()
-                        tts.write_to_fp(audio_fp)
-                        b64_audio = base64.b64encode(audio_fp.getvalue()).decode()
-                        format_type = "mp3"
-                    
-                    audio_html = f"""
-                    <div style="background: rgba(127, 0, 255, 0.05); padding: 15px; border-radius: 12px; border: 1px solid rgba(127, 0, 255, 0.2); margin-top: 10px; margin-bottom: 20px;">
-                        <audio controls autoplay style="width: 100%; filter: invert(100%) hue-rotate(180deg) brightness(1.5);">
-                            <source src="data:audio/{format_type};base64,{b64_audio}" type="audio/{format_type}">
-                            Your browser does not support the audio element.
-                        </audio>
-                    </div>
-                    """
-                    st.markdown(audio_html, unsafe_allow_html=True)
+                        st.error("Voice Synthesis Error: no engine could synthesize this text.")
             except Exception as e:
                 st.error(f"Voice Synthesis Error: {str(e)}")
 
+        narration = st.session_state.get('audio')
+        if narration and narration[0] == st.session_state['out']:
+            parts = narration[1]
+            for i, part in enumerate(parts):
+                # FLAC can't be stitched without re-encoding, so it plays as consecutive parts
+                if len(parts) > 1:
+                    st.caption(f"Part {i + 1} of {len(parts)}")
+                st.audio(part, format=narration[2])
+
         # Linguistic Analysis Section
         st.subheader("📊 Linguistic DNA & Deep X-Ray")
         
@@ -471,11 +643,13 @@ if st.session_state['out']:
             scores = [int(x.strip()) for x in raw_data.split(',')]
             if len(scores) < 5: scores = scores + [50]*(5-len(scores))
             
-            df = pd.DataFrame(dict(r=scores[:5], theta=['Clarity', 'Energy', 'Professionalism', 'Creativity', 'Emotion']))
-            fig = px.line_polar(df, r='r', theta='theta', line_close=True, range_r=[0,100], color_discrete_sequence=['#7f00ff'])
-            fig.update_polars(bgcolor="rgba(0,0,0,0)", radialaxis=dict(visible=True, range=[0, 100]))
-            fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white", height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            with tracer.span("ui.chart", chart="radar"):
+                # Loaded on first chart, not at startup: Plotly Express is one of the heaviest imports here
+                import plotly.express as px
+                fig = px.line_polar(r=scores[:5], theta=['Clarity', 'Energy', 'Professionalism', 'Creativity', 'Emotion'], line_close=True, range_r=[0,100], color_discrete_sequence=['#7f00ff'])
+                fig.update_polars(bgcolor="rgba(0,0,0,0)", radialaxis=dict(visible=True, range=[0, 100]))
+                fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white", height=400)
+                st.plotly_chart(fig, use_container_width=True)
             
             c1, c2, c3 = st.columns(3)
             with c1: st.metric("Read Time", f"{max(1, len(st.session_state['out'].split())//150)} min")
@@ -485,17 +659,16 @@ if st.session_state['out']:
         except:
             st.info("DNA Chart extraction in progress...")
 
-        # 2. Deep Linguistic X-Ray (TextStat/TextBlob)
+        # 2. Deep Linguistic X-Ray (TextStat/TextBlob), memoized by content hash
         try:
-            import textstat
-            from textblob import TextBlob
             st.divider()
             content = st.session_state['out']
-            if content:
-                blob = TextBlob(content)
-                reading_level = textstat.flesch_kincaid_grade(content)
-                sentiment = blob.sentiment.polarity 
-                subjectivity = blob.sentiment.subjectivity 
+            if content and xray_future is not None:
+                with st.spinner("Running X-Ray..."):
+                    xray = xray_future.result()
+                reading_level = xray['grade_level']
+                sentiment = xray['polarity']
+                subjectivity = xray['subjectivity']
                 k1, k2, k3, k4 = st.columns(4)
                 with k1:
                     st.metric("Grade Level", f"{reading_level}")
@@ -507,7 +680,18 @@ if st.session_state['out']:
                     subj_label = "Opinionated 🗣️" if subjectivity > 0.5 else "Objective ⚖️"
                     st.metric("Tone Type", subj_label, f"{subjectivity:.0%}")
                 with k4:
-                    word_count = len(content.split())
-                    st.metric("Word Count", word_count, f"Est: {word_count/200:.1f} min speech")
+                    word_count = xray['word_count']
+                    st.metric("Word Count", word_count, f"Est: {xray['speech_minutes']:.1f} min speech")
+
+                if get_history_store().count(sid) > 1 and st.checkbox("📈 Compare with whole session"):
+                    summary = summarize(analyze_many(get_history_store().transformed_texts(sid)))
+                    s1, s2, s3, s4 = st.columns(4)
+                    s1.metric("Avg Grade Level", f"{summary['mean_grade_level']:.1f}", f"{reading_level - summary['mean_grade_level']:+.1f} this run", delta_color="inverse")
+                    s2.metric("Avg Sentiment", f"{summary['mean_polarity']:.2f}", f"{sentiment - summary['mean_polarity']:+.2f} this run")
+                    s3.metric("Positive Runs", f"{summary['positive_share']:.0%}")
+                    s4.metric("Total Words", summary['total_words'], f"{summary['texts']} runs")
         except:
             st.warning("Deep metrics loading...")
+
+# Reruns that end in st.rerun() never get here, so this measures completed renders only
+get_tracer().record("ui.rerun", (time.perf_counter() - RUN_STARTED) * 1000)
@@ -0,0 +1 @@
+# Benchmarks and load tests for Resonate AI against a local mock of the HF endpoints: `python -m benchmarks`.
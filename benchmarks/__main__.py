@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Both under .cache/, which is git-ignored: results are per machine and not worth committing
+FIXTURES_DIR = os.path.join(os.path.dirname(HERE), ".cache", "bench_fixtures")
+RESULTS_DIR = os.path.join(os.path.dirname(HERE), ".cache", "bench_results")
+# Lower is better for every timing we compare; throughput is the one higher-is-better number
+COMPARED = ("median_ms", "p95_ms")
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def metadata():
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def flatten(results):
+    # {"micro.parse.extract_scores.median_ms": 0.01, "load.steps.transform.p95_ms": 80.0, "load.transforms_per_s": 42.0, ...}
+    flat = {}
+    for name, stats in results.get("micro", {}).items():
+        for key in COMPARED:
+            if key in stats:
+                flat[f"micro.{name}.{key}"] = stats[key]
+    load = results.get("load")
+    if load:
+        for step, stats in load["steps"].items():
+            for key in COMPARED:
+                if key in stats:
+                    flat[f"load.steps.{step}.{key}"] = stats[key]
+        flat["load.transforms_per_s"] = load["transforms_per_s"]
+    for name, stats in results.get("startup", {}).items():
+        for key in COMPARED:
+            if key in stats:
+                flat[f"{name}.{key}"] = stats[key]
+    return flat
+
+
+def compare(baseline, current, threshold=0.10):
+    """Print per-metric changes against a baseline run; returns the list of regressions."""
+    old, new = flatten(baseline), flatten(current)
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('git')} ({baseline['meta'].get('timestamp')}):")
+    for key in sorted(set(old) & set(new)):
+        before, after = old[key], new[key]
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = change < -threshold if key.endswith("_per_s") else change > threshold
+        if worse:
+            regressions.append(key)
+        print(f"  {'REGRESSED' if worse else '':>9} {key:<55} {before:>10.3f} -> {after:>10.3f} ({change:+.1%})")
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Micro-benchmarks and load tests against a local mock inference server.")
+    parser.add_argument("suite", nargs="?", choices=["micro", "load", "startup", "all"], default="all")
+    parser.add_argument("-o", "--output", default=None, help="Results JSON path (default: .cache/bench_results/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change that counts as a regression (default: 0.10)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if anything regressed past --threshold or a startup budget")
+    parser.add_argument("--quick", action="store_true", help="Fewer repetitions and a smaller load, for a smoke check")
+    load = parser.add_argument_group("load test")
+    load.add_argument("--sessions", type=int, default=16, help="Concurrent simulated sessions (default: 16)")
+    load.add_argument("--iterations", type=int, default=5, help="Transformations per session (default: 5)")
+    load.add_argument("--no-stream", dest="stream", action="store_false", help="Use non-streaming completions")
+    load.add_argument("--tts", action="store_true", help="Also narrate every result")
+    load.add_argument("--repeat-ratio", type=float, default=0.3, help="Share of drafts that repeat earlier ones (cache hits)")
+    load.add_argument("--think-time", type=float, default=0.0, help="Max seconds a session idles between runs")
+    load.add_argument("--latency", type=float, default=0.05, help="Mock time to first byte in seconds")
+    load.add_argument("--jitter", type=float, default=0.02)
+    load.add_argument("--token-delay", type=float, default=0.0, help="Mock delay between streamed deltas")
+    load.add_argument("--error-rate", type=float, default=0.0, help="Share of mock responses that fail with 503")
+    load.add_argument("--max-concurrent", type=int, default=8, help="Upstream calls in flight across all sessions (default: 8)")
+    load.add_argument("--per-user", type=int, default=4, help="Upstream calls in flight per session (default: 4)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Imported late so --help stays instant
+    from .load import run_load
+    from .micro import run_micro
+    from .startup import check_budgets, run_startup
+
+    results = {"meta": metadata()}
+    if args.suite in ("micro", "all"):
+        print("Running micro-benchmarks...", flush=True)
+        results["micro"] = run_micro(FIXTURES_DIR, quick=args.quick)
+    if args.suite in ("load", "all"):
+        sessions, iterations = (4, 2) if args.quick else (args.sessions, args.iterations)
+        print(f"Running load test: {sessions} sessions x {iterations} runs...", flush=True)
+        results["load"] = run_load(
+            sessions=sessions, iterations=iterations, stream=args.stream, tts=args.tts, repeat_ratio=args.repeat_ratio,
+            think_time=args.think_time, latency=args.latency, jitter=args.jitter, token_delay=args.token_delay,
+            error_rate=args.error_rate, max_concurrent=args.max_concurrent, per_user_concurrent=args.per_user,
+        )
+    if args.suite in ("startup", "all"):
+        print("Measuring cold start...", flush=True)
+        results["startup"] = run_startup(quick=args.quick)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    folder = os.path.dirname(output)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    for key, value in sorted(flatten(results).items()):
+        print(f"  {key:<55} {value:>10.3f}")
+    print(f"Results written to {output}")
+
+    # Startup has absolute budgets as well, so an eager import is caught even without a baseline
+    over_budget = check_budgets(results["startup"]) if "startup" in results else []
+    for problem in over_budget:
+        print(f"  OVER BUDGET {problem}")
+    if over_budget and args.fail_on_regression:
+        print(f"{len(over_budget)} startup budget(s) exceeded", file=sys.stderr)
+        return 1
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions and args.fail_on_regression:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
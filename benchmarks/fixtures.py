@@ -0,0 +1,62 @@
+import os
+import random
+
+WORDS = ("the a our team launch product growth customer story quarter results strategy idea market "
+         "value people simple clear focus build share impact moment signal journey insight we you "
+         "deliver improve plan review data feedback bold bright future together today").split()
+
+
+def sentence(rng, min_words=8, max_words=22):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + rng.choice([".", ".", ".", "!", "?"])
+
+
+def paragraph(rng, sentences=5):
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+
+def draft(rng, paragraphs=3):
+    return "\n\n".join(paragraph(rng, rng.randint(3, 6)) for _ in range(paragraphs))
+
+
+def drafts(count, seed=7, paragraphs=2):
+    rng = random.Random(seed)
+    return [draft(rng, paragraphs) for _ in range(count)]
+
+
+def write_txt(path, target_bytes, seed=1):
+    rng = random.Random(seed)
+    size = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while size < target_bytes:
+            chunk = paragraph(rng) + "\n\n"
+            f.write(chunk)
+            size += len(chunk.encode("utf-8"))
+    return path
+
+
+def write_docx(path, paragraphs, seed=2):
+    import docx
+
+    rng = random.Random(seed)
+    document = docx.Document()
+    for i in range(paragraphs):
+        if i % 25 == 0:
+            document.add_heading(sentence(rng, 3, 6), level=2)
+        document.add_paragraph(paragraph(rng))
+    document.save(path)
+    return path
+
+
+def build(folder, txt_bytes=2 * 1024 * 1024, docx_paragraphs=2000):
+    """Generate the large-file fixtures once per folder (deterministic, so reusable across runs)."""
+    os.makedirs(folder, exist_ok=True)
+    paths = {
+        "txt": os.path.join(folder, f"large_{txt_bytes // 1024}k.txt"),
+        "docx": os.path.join(folder, f"large_{docx_paragraphs}p.docx"),
+    }
+    if not os.path.exists(paths["txt"]):
+        write_txt(paths["txt"], txt_bytes)
+    if not os.path.exists(paths["docx"]):
+        write_docx(paths["docx"], docx_paragraphs)
+    return paths
@@ -0,0 +1,119 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resonate.analysis import analyze
+from resonate.engine import Engine
+from resonate.fairqueue import FairScheduler
+from resonate.history import HistoryStore
+from resonate.http_client import HttpClient
+from resonate.prompts import EMOJI_LEVELS, LANGUAGES, LENGTHS, PERSONAS, PLATFORMS, VIBES
+from resonate.tracing import tracer
+from resonate.tts import AudioCache, synthesize
+
+from . import fixtures
+from .micro import DEFAULT_OPTIONS
+from .mock_server import MockConfig, MockInferenceServer
+from .timing import summarize
+
+
+def failed(res):
+    return res.startswith(("⚠️", "❌"))
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, step, ms, ok=True):
+        with self._lock:
+            self.samples.setdefault(step, []).append(ms)
+            if not ok:
+                self.errors[step] = self.errors.get(step, 0) + 1
+
+    def timed(self, step, fn, check=None):
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            self.add(step, (time.perf_counter() - started) * 1000, ok=False)
+            return None
+        self.add(step, (time.perf_counter() - started) * 1000, ok=check(result) if check else True)
+        return result
+
+
+def simulate_session(engine, audio_cache, history, recorder, session_no, iterations, pool, repeat_ratio, stream, tts, think_time, seed):
+    # One browser tab: pick a draft, transform it, save it, run the X-Ray, optionally narrate, repeat
+    rng = random.Random(seed + session_no)
+    session_id = f"bench-{session_no}"
+    for _ in range(iterations):
+        if rng.random() < repeat_ratio:
+            # Popular draft with default settings: what other sessions are likely to have asked already
+            text, options = rng.choice(pool[:10]), DEFAULT_OPTIONS
+        else:
+            text = f"{rng.choice(pool)} Session {session_no} note {rng.random():.6f}."
+            options = (rng.choice(PERSONAS), rng.choice(PLATFORMS[:3]), EMOJI_LEVELS[1], LENGTHS[0], VIBES[0], LANGUAGES[0], "", "")
+        on_token = (lambda chunk: None) if stream else None
+        result = recorder.timed(
+            "transform", lambda: engine.execute_transformation(text, *options, on_token=on_token),
+            check=lambda r: not failed(r[0]),
+        )
+        if result is None:
+            continue
+        res, data = result
+        recorder.timed("history", lambda: history.add(session_id, text, res, data, " | ".join(options[:3]), persona=options[0], platform=options[1]))
+        recorder.timed("xray", lambda: analyze(res))
+        if tts:
+            recorder.timed("tts", lambda: synthesize(engine, res, cache=audio_cache), check=lambda r: r[0] is not None)
+        if think_time:
+            time.sleep(rng.uniform(0, think_time))
+
+
+def run_load(sessions=16, iterations=5, stream=True, tts=False, repeat_ratio=0.3, think_time=0.0,
+             latency=0.05, jitter=0.02, token_delay=0.0, error_rate=0.0, max_concurrent=8, per_user_concurrent=4, seed=11):
+    """Simulate `sessions` concurrent Streamlit sessions sharing one Engine, against the mock server."""
+    config = MockConfig(latency=latency, jitter=jitter, token_delay=token_delay, tts_latency=latency,
+                        error_rate=error_rate, seed=seed)
+    pool = fixtures.drafts(40, seed=seed, paragraphs=2)
+    recorder = Recorder()
+    tracer.reset()
+    with MockInferenceServer(config) as server:
+        # Shared like st.cache_resource shares them: one client pool, one response cache, one history DB
+        client = HttpClient(headers={"Authorization": "Bearer bench"}, pool_size=max(10, sessions))
+        engine = Engine("bench", router_url=server.router_url, tts_url=server.tts_url, cache_path=None, client=client,
+                        scheduler=FairScheduler(max_concurrent, per_user_concurrent))
+        audio_cache = AudioCache()
+        history = HistoryStore(None)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="session") as executor:
+            futures = [
+                executor.submit(simulate_session, engine, audio_cache, history, recorder, n, iterations, pool, repeat_ratio, stream, tts, think_time, seed)
+                for n in range(sessions)
+            ]
+            for future in futures:
+                future.result()
+        wall = time.perf_counter() - started
+        server_requests = dict(server.requests)
+
+    transforms = len(recorder.samples.get("transform", []))
+    cache = engine.cache.snapshot()
+    spans = tracer.snapshot()
+    return {
+        "config": {
+            "sessions": sessions, "iterations": iterations, "stream": stream, "tts": tts, "repeat_ratio": repeat_ratio,
+            "think_time": think_time, "latency": latency, "jitter": jitter, "token_delay": token_delay, "error_rate": error_rate,
+            "max_concurrent": max_concurrent, "per_user_concurrent": per_user_concurrent,
+        },
+        "wall_s": round(wall, 3),
+        "transforms_per_s": round(transforms / wall, 3) if wall else 0.0,
+        "steps": {step: dict(summarize(samples), errors=recorder.errors.get(step, 0)) for step, samples in recorder.samples.items()},
+        "cache_hit_rate": round(cache["hit_rate"], 4),
+        "server_requests": server_requests,
+        "http_retries": spans["counters"].get("http.retries", 0),
+        "coalesced": spans["counters"].get("singleflight.joined", 0),
+        "tokens": {"prompt": spans["counters"].get("tokens.prompt", 0), "completion": spans["counters"].get("tokens.completion", 0)},
+        "spans": {name: {k: round(v, 3) for k, v in s.items()} for name, s in spans["spans"].items()},
+    }
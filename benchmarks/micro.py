@@ -0,0 +1,107 @@
+import itertools
+import os
+
+from resonate import analysis, files
+from resonate.analysis import analyze, analyze_many
+from resonate.engine import Engine, finish_transformation
+from resonate.files import read_path
+from resonate.prompts import EMOJI_LEVELS, LANGUAGES, LENGTHS, PERSONAS, PLATFORMS, VIBES
+from resonate.scoring import score_frame
+from resonate.streaming import ScoresStreamParser, extract_scores
+
+from . import fixtures
+from .mock_server import MockConfig, MockInferenceServer, make_reply
+from .timing import bench
+
+DEFAULT_OPTIONS = (PERSONAS[0], PLATFORMS[0], EMOJI_LEVELS[1], LENGTHS[0], VIBES[0], LANGUAGES[0], "", "")
+
+
+def _completion(text):
+    return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+
+
+def _unique(texts):
+    # Endless stream of never-seen texts, so memoized paths are measured cold
+    counter = itertools.count()
+
+    def next_text():
+        i = next(counter)
+        return f"{texts[i % len(texts)]} Revision {i}."
+    return next_text
+
+
+def parsing(repeat):
+    sample = fixtures.drafts(1, seed=3)[0]
+    scored = make_reply([{"role": "system", "content": "[SCORES]"}, {"role": "user", "content": sample}])
+    plain = scored.split("\n[SCORES]")[0]
+    deltas = [scored[i:i + 4] for i in range(0, len(scored), 4)]
+
+    def stream_parse():
+        parser = ScoresStreamParser()
+        for delta in deltas:
+            parser.feed(delta)
+        return parser.finish()
+
+    next_text = _unique([plain])
+    current = {}
+    return {
+        "parse.extract_scores": bench(lambda: extract_scores(scored), repeat=repeat * 10),
+        "parse.stream_parser": bench(stream_parse, repeat=repeat * 10),
+        "parse.finish_llm_scores": bench(lambda: finish_transformation(_completion(scored), llm_scores=True), repeat=repeat * 10),
+        "parse.finish_local_scores_warm": bench(lambda: finish_transformation(_completion(plain)), repeat=repeat),
+        "parse.finish_local_scores_cold": bench(
+            lambda: finish_transformation(current["output"]), repeat=repeat,
+            setup=lambda: current.update(output=_completion(next_text())),
+        ),
+    }
+
+
+def transformation(repeat):
+    # Zero-latency mock: what's left is our own request building, HTTP client, SSE parsing and scoring
+    with MockInferenceServer(MockConfig(seed=1)) as server:
+        engine = Engine("bench", router_url=server.router_url, tts_url=server.tts_url, cache_path=None)
+        sample = fixtures.drafts(1, seed=5)[0]
+        next_text = _unique(fixtures.drafts(50, seed=6, paragraphs=1))
+        current = {}
+        new_text = lambda: current.update(text=next_text())
+        return {
+            "transform.json_miss": bench(lambda: engine.execute_transformation(current["text"], *DEFAULT_OPTIONS), repeat=repeat, setup=new_text),
+            "transform.stream_miss": bench(
+                lambda: engine.execute_transformation(current["text"], *DEFAULT_OPTIONS, on_token=lambda chunk: None),
+                repeat=repeat, setup=new_text,
+            ),
+            "transform.cache_hit": bench(lambda: engine.execute_transformation(sample, *DEFAULT_OPTIONS), repeat=repeat * 5),
+        }
+
+
+def file_reading(repeat, fixtures_dir):
+    paths = fixtures.build(fixtures_dir)
+    clear = files._parse_cache.clear
+    results = {}
+    for kind, path in paths.items():
+        label = f"{kind}_{os.path.getsize(path) // 1024}k"
+        results[f"files.read_{label}_cold"] = bench(lambda: read_path(path), repeat=max(3, repeat // 3), warmup=1, setup=clear)
+        results[f"files.read_{label}_warm"] = bench(lambda: read_path(path), repeat=repeat)
+    return results
+
+
+def xray(repeat):
+    sample = fixtures.drafts(1, seed=8)[0]
+    batch = fixtures.drafts(50, seed=9, paragraphs=1)
+    clear = analysis._analysis_cache.clear
+    return {
+        "xray.analyze_cold": bench(lambda: analyze(sample), repeat=repeat, setup=clear),
+        "xray.analyze_warm": bench(lambda: analyze(sample), repeat=repeat * 10),
+        "xray.analyze_many_50_cold": bench(lambda: analyze_many(batch), repeat=max(3, repeat // 3), warmup=1, setup=clear),
+        "scoring.score_frame_50_cold": bench(lambda: score_frame(batch), repeat=max(3, repeat // 3), warmup=1, setup=clear),
+    }
+
+
+def run_micro(fixtures_dir, quick=False):
+    repeat = 5 if quick else 30
+    results = {}
+    for name, suite in (("parsing", lambda: parsing(repeat)), ("transformation", lambda: transformation(repeat)),
+                        ("files", lambda: file_reading(repeat, fixtures_dir)), ("xray", lambda: xray(repeat))):
+        print(f"  micro: {name}...", flush=True)
+        results.update(suite())
+    return results
@@ -0,0 +1,213 @@
+# Local stand-in for the HF router and the mms-tts endpoint, with latency and error injection.
+# Run it on its own and point the app at it via HF_ROUTER_URL / HF_TTS_URL in secrets.toml:
+#   python -m benchmarks.mock_server --port 8765 --latency 0.3 --token-delay 0.01 --error-rate 0.05
+import argparse
+import io
+import json
+import random
+import re
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from resonate.streaming import SCORES_MARKER
+
+FILLER = ("resonate clear bold story growth team launch idea value bright simple focus build share "
+          "impact voice craft moment signal spark journey insight").split()
+
+
+class MockConfig:
+    """Knobs for the mock; safe to change while the server is running."""
+
+    def __init__(self, latency=0.0, jitter=0.0, token_delay=0.0, tts_latency=0.0, error_rate=0.0,
+                 error_status=503, retry_after=0, reply_words=120, seed=None, tts_format="flac"):
+        self.latency = latency  # Seconds before the first byte
+        self.jitter = jitter  # Uniform extra latency in [0, jitter]
+        self.token_delay = token_delay  # Seconds between streamed events
+        self.tts_latency = tts_latency
+        self.tts_format = tts_format  # "flac" like the real mms-tts endpoint, or "wav"
+        self.error_rate = error_rate  # Share of requests answered with error_status
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.reply_words = reply_words
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def roll(self):
+        # random.Random isn't thread-safe for our purposes; handler threads share one
+        with self._lock:
+            return self.rng.random(), self.rng.uniform(0, self.jitter) if self.jitter else 0.0
+
+
+def make_reply(messages, words=120):
+    # Deterministic for a given prompt: the draft's own words padded with filler, plus [SCORES] if asked for
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    source = re.findall(r"[A-Za-z']+", user) or FILLER
+    out = [source[i % len(source)] if i % 3 else FILLER[i % len(FILLER)] for i in range(words)]
+    sentences = [" ".join(out[i:i + 12]).capitalize() + "." for i in range(0, len(out), 12)]
+    reply = " ".join(sentences)
+    if SCORES_MARKER in system:
+        seed = sum(map(ord, user)) % 40
+        reply += f"\n{SCORES_MARKER} {50 + seed},{40 + seed},{60 + seed % 30},{45 + seed},{55 + seed % 35}"
+    return reply
+
+
+def make_wav(text, rate=8000, samples_per_char=60):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * (len(text) * samples_per_char))
+    return buf.getvalue()
+
+
+def make_flac(text, samples_per_char=60):
+    # Only the container signature matters to the client (it sniffs "fLaC" and can't stitch it);
+    # the frames are filler sized like the WAV, not decodable audio
+    streaminfo = bytes([0x80, 0x00, 0x00, 0x22]) + b"\x00" * 34
+    return b"fLaC" + streaminfo + b"\xff\xf8" * (len(text) * samples_per_char // 4)
+
+
+def estimate(text):
+    return max(1, len(text) // 4)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle + delayed ACK adds ~40ms per response
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        config = server.config
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        server.count(self.path)
+
+        roll, jitter = config.roll()
+        is_tts = "inputs" in body
+        time.sleep((config.tts_latency if is_tts else config.latency) + jitter)
+        if roll < config.error_rate:
+            server.count("errors")
+            payload = json.dumps({"error": "injected failure"}).encode()
+            return self._send(config.error_status, payload, headers={"Retry-After": str(config.retry_after)})
+
+        if is_tts:
+            if config.tts_format == "wav":
+                return self._send(200, make_wav(body["inputs"]), content_type="audio/wav")
+            return self._send(200, make_flac(body["inputs"]), content_type="audio/flac")
+
+        messages = body.get("messages") or []
+        reply = make_reply(messages, config.reply_words)
+        # Like a real backend, stop at max_tokens and say so
+        finish_reason = "stop"
+        if body.get("max_tokens") and estimate(reply) > body["max_tokens"]:
+            reply, finish_reason = reply[:body["max_tokens"] * 4], "length"
+        usage = {"prompt_tokens": sum(estimate(m.get("content", "")) for m in messages), "completion_tokens": estimate(reply)}
+        if not body.get("stream"):
+            payload = {"choices": [{"message": {"role": "assistant", "content": reply}, "finish_reason": finish_reason}], "usage": usage}
+            return self._send(200, json.dumps(payload).encode())
+
+        # Server-sent events, one small delta at a time; the connection closes at [DONE]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i in range(0, len(reply), 4):
+            event = {"choices": [{"delta": {"content": reply[i:i + 4]}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+            if config.token_delay:
+                time.sleep(config.token_delay)
+        self.wfile.write(f"data: {json.dumps({'choices': [{'delta': {}, 'finish_reason': finish_reason}]})}\n\n".encode())
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class MockInferenceServer(ThreadingHTTPServer):
+    """Threaded mock serving /v1/chat/completions (JSON or SSE) and any other path as TTS."""
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), Handler)
+        self.config = config or MockConfig()
+        self.requests = {}
+        self._count_lock = threading.Lock()
+        self._thread = None
+
+    def count(self, key):
+        with self._count_lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    @property
+    def router_url(self):
+        return self.url + "/v1/chat/completions"
+
+    @property
+    def tts_url(self):
+        return self.url + "/models/facebook/mms-tts-eng"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-inference", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.mock_server", description="Mock HF router + TTS endpoint for local testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first byte (default: 0.2)")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Seconds between streamed deltas")
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    parser.add_argument("--tts-format", choices=["flac", "wav"], default="flac", help="Audio container the TTS endpoint returns (default: flac, like mms-tts)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail (0-1)")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--reply-words", type=int, default=120)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(args.latency, args.jitter, args.token_delay, args.tts_latency, args.error_rate, args.error_status, reply_words=args.reply_words, tts_format=args.tts_format)
+    server = MockInferenceServer(config, args.host, args.port)
+    print(f"Mock router: {server.router_url}\nMock TTS:    {server.tts_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+
+from .timing import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Loaded on first use of their feature; any of these at startup is a regression however fast it looks
+HEAVY_MODULES = ("pandas", "numpy", "plotly.express", "gtts", "docx", "PyPDF2", "textblob", "textstat", "nltk", "tiktoken")
+# Median budgets. Loose enough for a noisy laptop, tight enough that one eager pandas import blows them.
+BUDGETS_MS = {
+    "startup.import_resonate": 250,
+    "startup.app_first_run": 1500,
+    "startup.app_rerun": 300,
+}
+
+# Everything app.py imports from the package, in a fresh interpreter
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import resonate
+from resonate import analysis, batch, diff, engine, fairqueue, files, history, keywords, longdoc, prompts, singleflight, tracing, tts
+ms = (time.perf_counter() - started) * 1000
+print(json.dumps({"ms": ms, "heavy": [m for m in HEAVY if m in sys.modules]}))
+"""
+
+# First paint and an idle rerun of the real script, in a fresh interpreter (Streamlit itself is imported untimed)
+APP_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=60)
+at.secrets["HUGGING_FACE_API_KEY"] = "bench"
+at.secrets["RESPONSE_CACHE_PATH"] = ""
+at.secrets["HISTORY_PATH"] = ""
+started = time.perf_counter()
+at.run()
+first = (time.perf_counter() - started) * 1000
+heavy = [m for m in HEAVY if m in sys.modules]
+started = time.perf_counter()
+at.run()
+rerun = (time.perf_counter() - started) * 1000
+print(json.dumps({"first": first, "rerun": rerun, "heavy": heavy, "errors": [str(e.value) for e in at.exception]}))
+"""
+
+
+def _probe(code):
+    script = f"HEAVY = {HEAVY_MODULES!r}\n{code}"
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, timeout=300, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run_startup(quick=False):
+    """Cold import and first-paint timings, each in a fresh interpreter."""
+    repeat = 2 if quick else 5
+    imports = [_probe(IMPORT_PROBE) for _ in range(repeat)]
+    results = {"startup.import_resonate": dict(summarize([r["ms"] for r in imports]), heavy=imports[-1]["heavy"])}
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        return results
+    apps = [_probe(APP_PROBE) for _ in range(repeat)]
+    results["startup.app_first_run"] = dict(summarize([r["first"] for r in apps]), heavy=apps[-1]["heavy"], errors=apps[-1]["errors"])
+    results["startup.app_rerun"] = summarize([r["rerun"] for r in apps])
+    return results
+
+
+def check_budgets(results):
+    """Human-readable budget violations: slow medians, heavy modules loaded eagerly, script errors."""
+    problems = []
+    for name, budget in BUDGETS_MS.items():
+        stats = results.get(name)
+        if stats and stats["median_ms"] > budget:
+            problems.append(f"{name}: median {stats['median_ms']:.0f} ms over the {budget} ms budget")
+    for name, stats in results.items():
+        if stats.get("heavy"):
+            problems.append(f"{name}: loaded {', '.join(stats['heavy'])} at startup")
+        if stats.get("errors"):
+            problems.append(f"{name}: script raised {stats['errors'][0]}")
+    return problems
@@ -0,0 +1,41 @@
+import gc
+import time
+
+from resonate.tracing import percentile
+
+
+def summarize(samples_ms):
+    if not samples_ms:
+        return {"n": 0}
+    return {
+        "n": len(samples_ms),
+        "mean_ms": round(sum(samples_ms) / len(samples_ms), 4),
+        "min_ms": round(min(samples_ms), 4),
+        "median_ms": round(percentile(samples_ms, 50), 4),
+        "p95_ms": round(percentile(samples_ms, 95), 4),
+        "p99_ms": round(percentile(samples_ms, 99), 4),
+        "max_ms": round(max(samples_ms), 4),
+    }
+
+
+def bench(fn, repeat=20, warmup=2, setup=None):
+    """Time fn() `repeat` times after `warmup` untimed calls; setup() runs untimed before each call."""
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+    samples = []
+    # GC pauses land on whichever call triggers them; keep them out of the per-call numbers
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return summarize(samples)
@@ -0,0 +1,4 @@
+# Streamlit-free core of Resonate AI: `app.py` is the UI, `python -m resonate` the batch CLI.
+from .engine import Engine, finish_transformation
+from .files import read_file, read_path
+from .prompts import EMOJI_LEVELS, LANGUAGES, LENGTHS, PERSONAS, PLATFORMS, VIBES, prepare_transformation
@@ -0,0 +1,111 @@
+import contextvars
+import hashlib
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .cache import ResponseCache
+from .tracing import tracer
+
+ANALYSIS_FIELDS = ["grade_level", "polarity", "subjectivity", "word_count", "read_minutes", "speech_minutes"]
+
+# Results are small dicts, so a few thousand fit comfortably; shared by every session in the process
+_analysis_cache = ResponseCache(max_entries=4096, max_bytes=4 * 1024 * 1024, ttl=None)
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="xray")
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def count_syllables(word):
+    # Vowel-group heuristic, close enough to CMUdict for readability formulas
+    groups = re.findall(r'[aeiouy]+', word.lower())
+    count = len(groups) - (1 if word.lower().endswith("e") and len(groups) > 1 else 0)
+    return max(1, count)
+
+
+def heuristic_grade(text):
+    # Flesch-Kincaid grade without textstat's dictionaries (used when its NLTK data is missing)
+    words = re.findall(r"[A-Za-z']+", text)
+    if not words:
+        return 0.0
+    sentences = max(1, len(re.findall(r'[.!?]+', text)))
+    syllables = sum(count_syllables(w) for w in words)
+    return round(0.39 * len(words) / sentences + 11.8 * syllables / len(words) - 15.59, 1)
+
+
+_textstat_usable = True
+
+
+def grade_level(text):
+    global _textstat_usable
+    if _textstat_usable:
+        try:
+            import textstat
+            return textstat.flesch_kincaid_grade(text)
+        except (ImportError, LookupError):
+            # Missing package or NLTK data won't fix itself mid-process; stop retrying the lookup
+            _textstat_usable = False
+    return heuristic_grade(text)
+
+
+def _compute(text):
+    # Imported here so the app only pays for TextBlob when X-Ray actually runs
+    from textblob import TextBlob
+
+    with tracer.span("analysis.xray", chars=len(text)):
+        sentiment = TextBlob(text).sentiment
+        word_count = len(text.split())
+        return {
+            "grade_level": grade_level(text),
+            "polarity": sentiment.polarity,
+            "subjectivity": sentiment.subjectivity,
+            "word_count": word_count,
+            "read_minutes": max(1, word_count // 150),
+            "speech_minutes": word_count / 200,
+        }
+
+
+def analyze(text):
+    key = text_hash(text)
+    result = _analysis_cache.get(key)
+    if result is None:
+        result = _compute(text)
+        _analysis_cache.set(key, result)
+    return result
+
+
+def analyze_async(text):
+    # Cache hits come back as an already-finished future, misses run on the worker pool
+    result = _analysis_cache.get(text_hash(text))
+    if result is not None:
+        future = Future()
+        future.set_result(result)
+        return future
+    # Run in a copy of the caller's context so the X-Ray span nests under the caller's trace
+    return _executor.submit(contextvars.copy_context().run, analyze, text)
+
+
+def analyze_many(texts):
+    """Score many texts at once (deduplicated, misses computed in parallel) into a DataFrame."""
+    import pandas as pd
+
+    with tracer.span("analysis.batch", texts=len(texts)):
+        unique = list(dict.fromkeys(texts))
+        contexts = [contextvars.copy_context() for _ in unique]
+        scored = dict(zip(unique, _executor.map(lambda ctx, t: ctx.run(analyze, t), contexts, unique)))
+        return pd.DataFrame([scored[t] for t in texts], columns=ANALYSIS_FIELDS)
+
+
+def summarize(df):
+    # Vectorized roll-up for history/batch views
+    if df.empty:
+        return {}
+    return {
+        "texts": len(df),
+        "mean_grade_level": float(df["grade_level"].mean()),
+        "mean_polarity": float(df["polarity"].mean()),
+        "mean_subjectivity": float(df["subjectivity"].mean()),
+        "total_words": int(df["word_count"].sum()),
+        "positive_share": float((df["polarity"] > 0.1).mean()),
+    }
@@ -0,0 +1,394 @@
+import asyncio
+import contextvars
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+from .http_client import HttpClient
+from .streaming import SCORES_MARKER, iter_sse_deltas
+from .tokens import CONTEXT_TOKENS, count_message_tokens, count_tokens
+from .tracing import tracer
+
+# --- DEFAULTS ---
+TEXT_MODEL = "meta-llama/Meta-Llama-3-8B-Instruct"
+ROUTER_URL = "https://router.huggingface.co/v1/chat/completions"
+
+# Every backend takes the same chat messages and returns the same OpenAI-shaped dict:
+# {"choices": [{"message": {...}, "finish_reason": ...}], "usage": {...}} or {"error": "..."}.
+# complete / stream / acomplete may also raise; the engine turns that into an error the same way.
+
+
+def _reply(content, finish_reason="stop", usage=None):
+    output = {"choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": finish_reason}]}
+    if usage:
+        output["usage"] = usage
+    return output
+
+
+class HttpBackend:
+    """Any OpenAI-compatible /v1/chat/completions endpoint: the HF router, a llama.cpp or vLLM server, etc."""
+
+    def __init__(self, client, url=ROUTER_URL, model=TEXT_MODEL, name=None):
+        self.client = client
+        self.url = url
+        self.model = model
+        self.host = urlparse(url).netloc
+        self.name = name or self.host
+
+    def payload(self, messages, max_tokens):
+        return {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": 0.7}
+
+    @staticmethod
+    def _parse(response):
+        if response.status_code == 200:
+            return response.json()
+        return {"error": f"API Error {response.status_code}"}
+
+    def complete(self, messages, max_tokens):
+        return self._parse(self.client.post(self.url, json=self.payload(messages, max_tokens)))
+
+    def stream(self, messages, on_delta, max_tokens):
+        payload = dict(self.payload(messages, max_tokens), stream=True, stream_options={"include_usage": True})
+        response = self.client.post(self.url, json=payload, stream=True)
+        if response.status_code != 200:
+            return {"error": f"API Error {response.status_code}"}
+        parts, usage, finish = [], {}, {}
+        with response:
+            for delta in iter_sse_deltas(response, usage, finish):
+                parts.append(delta)
+                on_delta(delta)
+        return _reply("".join(parts), finish.get("reason"), usage)
+
+    async def acomplete(self, messages, max_tokens):
+        return self._parse(await self.client.apost(self.url, json=self.payload(messages, max_tokens)))
+
+
+class LlamaCppBackend:
+    """Quantized GGUF model on the local CPU through llama-cpp-python (optional dependency).
+
+    The model is loaded on first use, and calls are serialized since one llama.cpp context
+    can't decode two prompts at once; run a llama.cpp server behind HttpBackend to go wider.
+    """
+
+    host = "local"
+
+    def __init__(self, model_path, n_ctx=CONTEXT_TOKENS, n_threads=None, name="local"):
+        self.model_path = model_path
+        self.model = os.path.basename(model_path)
+        self.name = name
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        self._llm = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._llm is None:
+            try:
+                from llama_cpp import Llama
+            except ImportError:
+                raise RuntimeError("Local backend needs llama-cpp-python (pip install llama-cpp-python)")
+            with tracer.span("local.load", model=self.model):
+                self._llm = Llama(model_path=self.model_path, n_ctx=self.n_ctx, n_threads=self.n_threads, verbose=False)
+        return self._llm
+
+    def complete(self, messages, max_tokens):
+        with self._lock:
+            return self._load().create_chat_completion(messages=messages, max_tokens=max_tokens, temperature=0.7)
+
+    def stream(self, messages, on_delta, max_tokens):
+        parts, finish_reason = [], None
+        with self._lock:
+            for chunk in self._load().create_chat_completion(messages=messages, max_tokens=max_tokens, temperature=0.7, stream=True):
+                choice = chunk["choices"][0]
+                finish_reason = choice.get("finish_reason") or finish_reason
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    on_delta(delta)
+        content = "".join(parts)
+        return _reply(content, finish_reason, {"prompt_tokens": count_message_tokens(messages), "completion_tokens": count_tokens(content)})
+
+    async def acomplete(self, messages, max_tokens):
+        return await asyncio.to_thread(self.complete, messages, max_tokens)
+
+
+class FakeBackend:
+    """Deterministic offline backend for tests and demos: the reply depends only on the prompt.
+
+    Echoes the draft with a tag, honours max_tokens (finish_reason "length") and the [SCORES]
+    instruction, so every persona/platform prompt round-trips without a network.
+    """
+
+    host = "fake"
+    model = "fake"
+
+    def __init__(self, name="fake", latency=0.0, error_rate=0.0, seed=0):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _respond(self, messages, max_tokens):
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            return {"error": "API Error 503"}
+        system, user = messages[0]["content"], messages[-1]["content"]
+        digest = hashlib.sha256(f"{system}\0{user}".encode("utf-8")).digest()
+        text = user[len('Text: "'):-1] if user.startswith('Text: "') and user.endswith('"') else user
+        content = f"[{digest.hex()[:8]}] {text}"
+        if SCORES_MARKER in system:
+            content += f"\n{SCORES_MARKER} " + ",".join(str(b % 101) for b in digest[:5])
+        finish_reason = "stop"
+        if count_tokens(content) > max_tokens:
+            content, finish_reason = content[:max_tokens * 4], "length"
+        return _reply(content, finish_reason, {"prompt_tokens": count_message_tokens(messages), "completion_tokens": count_tokens(content)})
+
+    def complete(self, messages, max_tokens):
+        time.sleep(self.latency)
+        return self._respond(messages, max_tokens)
+
+    def stream(self, messages, on_delta, max_tokens):
+        output = self.complete(messages, max_tokens)
+        if "choices" in output:
+            content = output["choices"][0]["message"]["content"]
+            for i in range(0, len(content), 16):
+                on_delta(content[i:i + 16])
+        return output
+
+    async def acomplete(self, messages, max_tokens):
+        await asyncio.sleep(self.latency)
+        return self._respond(messages, max_tokens)
+
+
+# --- ROUTING ---
+class _Lost(Exception):
+    # Raised inside a hedged stream that another backend already won
+    pass
+
+
+class LatencyRouter:
+    """Sends each request to the fastest healthy backend, with failover and hedged requests.
+
+    Keeps a moving average of latency (time to first token for streams, full time otherwise)
+    and of the error rate per backend. Requests go to the fastest backend whose error rate is
+    under `max_error_rate`; a backend over it sits out `cooldown` seconds and is then probed
+    again. If the first choice hasn't answered after `hedge_factor` times its usual latency, the
+    next backend is tried in parallel and whichever answers first wins. Errors fail over to the
+    next backend, except mid-stream once text has been shown.
+    """
+
+    host = "router"
+
+    def __init__(self, backends, alpha=0.2, max_error_rate=0.5, cooldown=30.0, hedge=True, hedge_factor=2.0, min_hedge_ms=250.0, max_workers=32):
+        self.backends = list(backends)
+        if len({b.name for b in self.backends}) < len(self.backends):
+            raise ValueError("Routed backends need distinct names")
+        self.model = "router:" + ",".join(b.model for b in self.backends)
+        self.name = "router"
+        # The preferred backend; only its replies are cached (see Engine._cacheable)
+        self.primary = self.backends[0].name
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.hedge = hedge
+        self.hedge_factor = hedge_factor
+        self.min_hedge_ms = min_hedge_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resonate-route")
+        self._lock = threading.Lock()
+        self._stats = {b.name: {"complete_ms": None, "stream_ms": None, "error_rate": 0.0, "calls": 0, "errors": 0, "wins": 0, "failed_at": 0.0} for b in self.backends}
+
+    # --- HEALTH ---
+    def _record(self, backend, kind, ms, ok):
+        with self._lock:
+            stats = self._stats[backend.name]
+            stats["calls"] += 1
+            stats["error_rate"] += self.alpha * ((0.0 if ok else 1.0) - stats["error_rate"])
+            if ok:
+                key = f"{kind}_ms"
+                stats[key] = ms if stats[key] is None else stats[key] + self.alpha * (ms - stats[key])
+            else:
+                stats["errors"] += 1
+                stats["failed_at"] = time.time()
+
+    def _healthy(self, stats, now):
+        return stats["error_rate"] <= self.max_error_rate or now - stats["failed_at"] > self.cooldown
+
+    def ranked(self, kind="complete"):
+        # Healthy before unhealthy, then fastest first; backends with no samples yet go first so they get measured
+        now = time.time()
+        with self._lock:
+            order = sorted(
+                enumerate(self.backends),
+                key=lambda item: (not self._healthy(self._stats[item[1].name], now), self._stats[item[1].name][f"{kind}_ms"] or 0.0, item[0]),
+            )
+        return [backend for _, backend in order]
+
+    def _hedge_delay(self, backend, kind):
+        with self._lock:
+            typical = self._stats[backend.name][f"{kind}_ms"]
+        if not self.hedge or typical is None:
+            return None
+        return max(self.min_hedge_ms, typical * self.hedge_factor) / 1000
+
+    def _attempt(self, backend, kind, call, marks):
+        # marks[name] is when a stream's first delta arrived; streams are timed to that point
+        started = time.perf_counter()
+        lost = False
+        try:
+            output = call()
+        except _Lost:
+            output, lost = {"error": "lost hedge"}, True
+        except Exception as e:
+            output = {"error": str(e)}
+        ended = marks.get(backend.name) or time.perf_counter()
+        self._record(backend, kind, (ended - started) * 1000, lost or "choices" in output)
+        return output, lost
+
+    def _won(self, backend, output):
+        with self._lock:
+            self._stats[backend.name]["wins"] += 1
+        tracer.incr(f"router.won.{backend.name}")
+        return dict(output, backend=backend.name)
+
+    # --- CALLS ---
+    def _race(self, kind, call, first=None, marks=None):
+        # call(backend) runs on the pool; returns the first successful output, or the last error
+        order = self.ranked(kind)
+        marks = {} if marks is None else marks
+        pending, output = {}, {"error": "No inference backend configured"}
+        hedged = False
+
+        def launch():
+            backend = order.pop(0)
+            # Copied per attempt so routed spans stay under the caller's trace
+            pending[self._pool.submit(contextvars.copy_context().run, self._attempt, backend, kind, lambda: call(backend), marks)] = backend
+
+        launch()
+        while pending:
+            delay = None
+            if order and not hedged and (first is None or not first.is_set()):
+                delay = self._hedge_delay(next(iter(pending.values())), kind)
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slow tail: race the next backend against the one still running
+                hedged = True
+                tracer.incr("router.hedged")
+                launch()
+                continue
+            for future in done:
+                backend = pending.pop(future)
+                result, lost = future.result()
+                if lost:
+                    continue
+                if "choices" in result:
+                    return self._won(backend, result)
+                output = result
+                if first is not None and first.is_set() and first.winner is backend:
+                    # Text from this backend is already on screen; starting over elsewhere would repeat it
+                    return output
+            if not pending and order:
+                tracer.incr("router.failover")
+                launch()
+        return output
+
+    def complete(self, messages, max_tokens):
+        return self._race("complete", lambda backend: backend.complete(messages, max_tokens))
+
+    def stream(self, messages, on_delta, max_tokens):
+        first = threading.Event()
+        first.winner = None
+        lock = threading.Lock()
+        marks = {}
+
+        def call(backend):
+            def relay(delta):
+                # Only the first backend to produce text is relayed; a hedged loser is cut off
+                with lock:
+                    marks.setdefault(backend.name, time.perf_counter())
+                    if first.winner is None:
+                        first.winner = backend
+                        first.set()
+                if first.winner is not backend:
+                    raise _Lost()
+                on_delta(delta)
+            return backend.stream(messages, relay, max_tokens)
+
+        return self._race("stream", call, first, marks)
+
+    async def acomplete(self, messages, max_tokens):
+        order = self.ranked()
+        pending, output = {}, {"error": "No inference backend configured"}
+        hedged = False
+
+        async def attempt(backend):
+            started = time.perf_counter()
+            try:
+                result = await backend.acomplete(messages, max_tokens)
+            except Exception as e:
+                result = {"error": str(e)}
+            self._record(backend, "complete", (time.perf_counter() - started) * 1000, "choices" in result)
+            return result
+
+        def launch():
+            backend = order.pop(0)
+            pending[asyncio.ensure_future(attempt(backend))] = backend
+
+        launch()
+        try:
+            while pending:
+                delay = self._hedge_delay(next(iter(pending.values())), "complete") if order and not hedged else None
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    tracer.incr("router.hedged")
+                    launch()
+                    continue
+                for task in done:
+                    backend = pending.pop(task)
+                    result = task.result()
+                    if "choices" in result:
+                        return self._won(backend, result)
+                    output = result
+                if not pending and order:
+                    tracer.incr("router.failover")
+                    launch()
+            return output
+        finally:
+            # Async losers can simply be cancelled
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            return [
+                dict(stats, backend=name, healthy=self._healthy(stats, now))
+                for name, stats in self._stats.items()
+            ]
+
+
+def build_backend(specs, client, router_url=ROUTER_URL, model=TEXT_MODEL):
+    """Backend from a comma-separated spec: "hf", "fake", "llama:/path/model.gguf" or an OpenAI-compatible URL.
+
+    One spec gives that backend; several give a LatencyRouter over them, in that order of preference.
+    """
+    backends = []
+    for spec in [s.strip() for s in (specs or "hf").split(",") if s.strip()]:
+        if spec == "hf":
+            backends.append(HttpBackend(client, router_url, model, name="hf"))
+        elif spec == "fake":
+            backends.append(FakeBackend())
+        elif spec.startswith("llama:"):
+            backends.append(LlamaCppBackend(spec[len("llama:"):]))
+        elif spec.startswith(("http://", "https://")):
+            # Own client: the Hugging Face token must not be sent to other hosts
+            backends.append(HttpBackend(HttpClient(), spec, model))
+        else:
+            raise ValueError(f"Unknown backend {spec!r} (expected hf, fake, llama:<path.gguf> or a URL)")
+    return backends[0] if len(backends) == 1 else LatencyRouter(backends)
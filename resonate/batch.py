@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import threading
+import time
+
+MATRIX_FIELDS = ["tone", "platform", "emoji_level", "length", "vibe", "target_lang"]
+
+
+def build_matrix(tones, platforms, emoji_levels, lengths, vibes, target_langs):
+    # Cartesian product of the chosen options, one dict per variant
+    combos = itertools.product(tones, platforms, emoji_levels, lengths, vibes, target_langs)
+    return [dict(zip(MATRIX_FIELDS, combo)) for combo in combos]
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, with `burst` headroom.
+
+    Callers reserve their slot under a thread lock and sleep outside it, so one limiter can be
+    shared by batches running on different threads and event loops (each asyncio.run is its own).
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Seconds to wait before this slot; tokens go negative while callers are queued
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class HostLimiters:
+    """One RateLimiter per host, kept for as long as this object lives.
+
+    The engine holds one, so every batch, long document and CLI window aimed at the same host
+    draws from the same bucket instead of each starting with a full one.
+    """
+
+    def __init__(self):
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, host, rate, burst=1):
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = RateLimiter(rate, burst)
+            else:
+                # The latest caller's settings win; the bucket's current level carries over
+                limiter.rate, limiter.burst = rate, burst
+            return limiter
+
+
+class Cancelled(Exception):
+    pass
+
+
+async def run_batch(jobs, worker, max_workers=4, rate=2.0, burst=2, host=None, limiters=None, on_result=None, should_cancel=None):
+    """Run `await worker(job)` for every job with bounded, rate-limited concurrency.
+
+    At most `max_workers` calls run at once. Each call first takes a token from the bucket of
+    its host (`host(job)`, one shared bucket when omitted) in `limiters`; pass a long-lived
+    HostLimiters to share buckets across batches, otherwise this batch gets its own.
+    `on_result(index, job, result)` fires as each call completes, in completion order.
+    Once `should_cancel()` is true, jobs that haven't started are skipped: their result
+    stays None and on_result isn't called for them. Calls already in flight finish.
+    """
+    workers = asyncio.Semaphore(max_workers)
+    limiters = limiters if limiters is not None else HostLimiters()
+    results = [None] * len(jobs)
+
+    async def run_one(index, job):
+        limiter = limiters.get(host(job) if host else None, rate, burst)
+        if should_cancel is not None and should_cancel():
+            return index, job, Cancelled()
+        async with workers:
+            await limiter.acquire()
+            # Checked again after the wait: the user may have given up while this job sat in line
+            if should_cancel is not None and should_cancel():
+                return index, job, Cancelled()
+            try:
+                result = await worker(job)
+            except Exception as e:
+                result = e
+        return index, job, result
+
+    for task in asyncio.as_completed([run_one(i, job) for i, job in enumerate(jobs)]):
+        index, job, result = await task
+        if isinstance(result, Cancelled):
+            continue
+        results[index] = result
+        if on_result is not None:
+            on_result(index, job, result)
+    return results
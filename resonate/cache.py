@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# --- KEYING ---
+def normalize_text(text):
+    # Line endings, trailing spaces and blank lines at either end don't change what the model reads.
+    # Applied by prepare_transformation before the prompt is built, so the key and the request agree.
+    lines = [line.rstrip() for line in str(text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return "\n".join(lines).strip("\n")
+
+
+def make_cache_key(inputs, payload):
+    # The payload holds the messages exactly as sent; inputs add what the prompt doesn't spell out
+    blob = json.dumps({"inputs": inputs, "payload": payload}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# --- STORAGE TIERS ---
+class DiskTier:
+    """SQLite-backed tier that survives Streamlit restarts.
+
+    Expired rows are purged on open and every `compact_every` writes, when the least recently
+    used rows beyond `max_rows` are dropped too, so the file can't grow without bound.
+    """
+
+    def __init__(self, path, ttl=None, max_rows=20000, compact_every=200):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.compact_every = compact_every
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        # Files from before LRU trimming and per-session clearing lack these columns
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "used" not in columns:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN used REAL NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE responses SET used = created")
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_owner ON responses (owner)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.compact()
+
+    def get(self, key):
+        entry = self.entry(key)
+        return entry[0] if entry is not None else None
+
+    def entry(self, key):
+        # (value, owner), or None when missing or expired; a hit counts as a use for LRU trimming
+        with self._lock:
+            row = self._conn.execute("SELECT value, created, owner FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created, owner = row
+            now = time.time()
+            expired = self.ttl is not None and now - created > self.ttl
+            if expired:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            else:
+                self._conn.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return None if expired else (json.loads(value), owner)
+
+    def set(self, key, value, owner=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, used, owner) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now, owner),
+            )
+            self._conn.commit()
+            self._writes += 1
+        if self.compact_every and self._writes % self.compact_every == 0:
+            self.compact()
+
+    def purge_expired(self):
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+            return cur.rowcount
+
+    def trim(self):
+        # Least recently used rows beyond max_rows go
+        if not self.max_rows:
+            return 0
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def compact(self):
+        return self.purge_expired() + self.trim()
+
+    def clear(self, owner=None):
+        with self._lock:
+            if owner is None:
+                self._conn.execute("DELETE FROM responses")
+            else:
+                self._conn.execute("DELETE FROM responses WHERE owner = ?", (owner,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """In-process LRU (entry + byte limits, TTL) with an optional disk tier behind it."""
+
+    def __init__(self, max_entries=256, max_bytes=8 * 1024 * 1024, ttl=24 * 3600, disk_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk = DiskTier(disk_path, ttl=ttl) if disk_path else None
+        self._items = OrderedDict()  # key -> (value, size, created)
+        self._owners = {}  # key -> who stored it, for clear(owner)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    @staticmethod
+    def _sizeof(value):
+        return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def _drop(self, key):
+        _, size, _ = self._items.pop(key)
+        self._owners.pop(key, None)
+        self._bytes -= size
+
+    def _put_memory(self, key, value, owner=None):
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return  # Too large for memory, disk tier still has it
+        if key in self._items:
+            self._drop(key)
+        self._items[key] = (value, size, time.time())
+        if owner is not None:
+            self._owners[key] = owner
+        self._bytes += size
+        while len(self._items) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._items))
+            self._drop(oldest)
+            self.stats["evictions"] += 1
+
+    def get(self, key, peek=False):
+        # peek: look without counting towards hit/miss stats (re-checks after a wait)
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                value, _, created = entry
+                if self.ttl is not None and time.time() - created > self.ttl:
+                    self._drop(key)
+                    self.stats["expired"] += 1
+                else:
+                    self._items.move_to_end(key)
+                    if not peek:
+                        self.stats["hits"] += 1
+                    return value
+
+        if self.disk is not None:
+            entry = self.disk.entry(key)
+            if entry is not None:
+                value, owner = entry
+                with self._lock:
+                    if not peek:
+                        self.stats["disk_hits"] += 1
+                    self._put_memory(key, value, owner)
+                return value
+
+        if not peek:
+            with self._lock:
+                self.stats["misses"] += 1
+        return None
+
+    def set(self, key, value, owner=None):
+        # owner (a session id) only matters to clear(owner)
+        with self._lock:
+            self._put_memory(key, value, owner)
+        if self.disk is not None:
+            self.disk.set(key, value, owner)
+
+    def clear(self, owner=None):
+        """Drop everything, or with `owner` only what that session stored."""
+        with self._lock:
+            if owner is None:
+                self._items.clear()
+                self._owners.clear()
+                self._bytes = 0
+            else:
+                for key in [k for k, o in self._owners.items() if o == owner]:
+                    self._drop(key)
+        if self.disk is not None:
+            self.disk.clear(owner)
+
+    def snapshot(self):
+        with self._lock:
+            info = dict(self.stats)
+            info["entries"] = len(self._items)
+            info["bytes"] = self._bytes
+        info["disk_entries"] = len(self.disk) if self.disk is not None else 0
+        lookups = info["hits"] + info["disk_hits"] + info["misses"]
+        info["hit_rate"] = (info["hits"] + info["disk_hits"]) / lookups if lookups else 0.0
+        return info
@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+
+from .batch import run_batch
+from .engine import Engine, finish_transformation
+from .files import read_path
+from .keywords import keyword_hits, parse_keywords
+from .prompts import EMOJI_LEVELS, LANGUAGES, LENGTHS, PERSONAS, PLATFORMS, VIBES, prepare_transformation
+from .tracing import tracer
+
+SUPPORTED_SUFFIXES = (".txt", ".md", ".docx", ".pdf")
+OPTION_CHOICES = {
+    "tone": PERSONAS,
+    "platform": PLATFORMS,
+    "emoji_level": EMOJI_LEVELS,
+    "length": LENGTHS,
+    "vibe": VIBES,
+    "target_lang": LANGUAGES,
+}
+
+
+def resolve_option(field, value):
+    # Lets "professional" or "x (twitter)" stand in for the emoji-suffixed UI labels
+    choices = OPTION_CHOICES[field]
+    if value in choices:
+        return value
+    matches = [c for c in choices if c.lower().startswith(value.strip().lower())]
+    if len(matches) == 1:
+        return matches[0]
+    raise ValueError(f"Unknown {field} {value!r}; expected one of: {', '.join(choices)}")
+
+
+def iter_records(source):
+    # Directory -> one record per supported file (read lazily by the worker), JSONL -> one per line
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(SUPPORTED_SUFFIXES):
+                    path = os.path.join(root, name)
+                    yield {"id": os.path.relpath(path, source), "path": path}
+        return
+
+    with open(source, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"text": record}
+            record.setdefault("id", str(line_no))
+            record["id"] = str(record["id"])
+            yield record
+
+
+def load_checkpoint(output_path):
+    # Ids already written without an error are skipped on resume; failures get retried
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue  # Partially written line from an interrupted run
+            if "error" not in row:
+                done.add(str(row.get("id")))
+    return done
+
+
+async def transform_record(engine, record, defaults):
+    options = dict(defaults)
+    for field in OPTION_CHOICES:
+        if record.get(field):
+            options[field] = resolve_option(field, record[field])
+    with tracer.span("transform", run=True, id=record["id"], platform=options["platform"]):
+        text = record["text"] if "text" in record else await asyncio.to_thread(read_path, record["path"])
+        messages, inputs = prepare_transformation(
+            text, options["tone"], options["platform"], options["emoji_level"], options["length"],
+            options["vibe"], options["target_lang"], options["custom_prompt"], options["target_keywords"], options["llm_scores"]
+        )
+        output = await engine.acached_query_ai(messages, inputs)
+        if "choices" not in output:
+            return dict(options, error=output.get("error"))
+        res, data = finish_transformation(output, llm_scores=options["llm_scores"])
+        result = dict(options, transformed=res, metrics=data)
+        keywords = parse_keywords(options["target_keywords"])
+        if keywords:
+            result["keyword_hits"] = {hit["keyword"]: hit["count"] for hit in keyword_hits(res, keywords)}
+        return result
+
+
+def run(args, engine=None):
+    engine = engine or Engine.from_env(cache_path=args.cache, backend=args.backends)
+    if args.trace or args.metrics:
+        tracer.configure(args.trace or tracer.export_path, args.metrics or tracer.metrics_path)
+    defaults = {
+        "tone": resolve_option("tone", args.tone),
+        "platform": resolve_option("platform", args.platform),
+        "emoji_level": resolve_option("emoji_level", args.emoji),
+        "length": resolve_option("length", args.length),
+        "vibe": resolve_option("vibe", args.vibe),
+        "target_lang": resolve_option("target_lang", args.lang),
+        "custom_prompt": args.custom_prompt,
+        "target_keywords": args.keywords,
+        "llm_scores": args.llm_scores,
+    }
+    done = load_checkpoint(args.output) if args.resume else set()
+    if not args.resume and os.path.exists(args.output):
+        open(args.output, "w").close()
+
+    stats = {"ok": 0, "failed": 0, "skipped": 0}
+    records = iter_records(args.input)
+    with open(args.output, "a", encoding="utf-8") as out:
+        def write(index, record, result):
+            if isinstance(result, Exception):
+                result = {"error": str(result)}
+            row = {"id": record["id"]}
+            if "path" in record:
+                row["source"] = record["path"]
+            row.update(result)
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            out.flush()  # Every finished record is a checkpoint
+            stats["failed" if "error" in result else "ok"] += 1
+            if not args.quiet:
+                print(f"[{stats['ok'] + stats['failed']}] {record['id']}: {'error' if 'error' in result else 'ok'}", file=sys.stderr)
+
+        # Work through the input a window at a time so memory stays flat on huge corpora
+        while True:
+            window = list(itertools.islice(records, args.window))
+            if not window:
+                break
+            todo = [r for r in window if r["id"] not in done]
+            stats["skipped"] += len(window) - len(todo)
+            if todo:
+                asyncio.run(run_batch(
+                    todo, lambda record: transform_record(engine, record, defaults),
+                    max_workers=args.workers, rate=args.rate,
+                    host=engine.host, limiters=engine.limiters, on_result=write
+                ))
+
+    tracer.flush()
+    counters = tracer.snapshot()["counters"]
+    print(f"Done: {stats['ok']} ok, {stats['failed']} failed, {stats['skipped']} skipped (already in {args.output})", file=sys.stderr)
+    if not args.quiet:
+        print(f"Tokens: {counters.get('tokens.prompt', 0):.0f} prompt + {counters.get('tokens.completion', 0):.0f} completion, "
+              f"cache hits {counters.get('cache.hits', 0):.0f}, HTTP retries {counters.get('http.retries', 0):.0f}, "
+              f"cut at max_tokens {counters.get('tokens.truncated', 0):.0f}", file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m resonate", description="Run Resonate AI transformations over a directory or JSONL file.")
+    parser.add_argument("input", help="Directory of .txt/.md/.docx/.pdf files, or a JSONL file of {\"id\", \"text\", ...} records")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file to write results to (also the resume checkpoint)")
+    parser.add_argument("--tone", default=PERSONAS[0])
+    parser.add_argument("--platform", default=PLATFORMS[0])
+    parser.add_argument("--emoji", default=EMOJI_LEVELS[1])
+    parser.add_argument("--length", default=LENGTHS[0])
+    parser.add_argument("--vibe", default=VIBES[0])
+    parser.add_argument("--lang", default=LANGUAGES[0])
+    parser.add_argument("--custom-prompt", default="")
+    parser.add_argument("--keywords", default="")
+    parser.add_argument("--llm-scores", action="store_true", help="Ask the model for [SCORES] instead of scoring locally")
+    parser.add_argument("-j", "--workers", type=int, default=4, help="Concurrent requests (default: 4)")
+    parser.add_argument("--rate", type=float, default=2.0, help="Max requests per second, 0 for unlimited (default: 2)")
+    parser.add_argument("--window", type=int, default=256, help="Records read ahead per scheduling window (default: 256)")
+    parser.add_argument("--backends", default=None, help="hf, fake, llama:<path.gguf> or OpenAI-compatible URLs, comma separated (default: $BACKENDS or hf)")
+    parser.add_argument("--cache", default=None, help="Response cache SQLite path (default: $RESPONSE_CACHE_PATH)")
+    parser.add_argument("--trace", default=None, help="Append one JSON line per span to this file (default: $RESONATE_TRACE_PATH)")
+    parser.add_argument("--metrics", default=None, help="Write Prometheus-text metrics to this file (default: $RESONATE_METRICS_PATH)")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", help="Start over instead of skipping ids already in the output")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return run(args)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
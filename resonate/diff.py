@@ -0,0 +1,220 @@
+import bisect
+import hashlib
+import re
+
+from .cache import ResponseCache
+from .tracing import tracer
+
+# Sentences per rendered section; the UI shows a few sections at a time
+SECTION_SENTENCES = 30
+# Myers gives up past this many edits in one gap and calls the gap a plain replacement
+MAX_EDIT_COST = 400
+
+# A sentence keeps its trailing whitespace, and a line break ends one, so "".join() round-trips
+SENTENCE = re.compile(r'[^\n]*?(?:[.!?]+["\')\]]*(?=\s|$)|\n|$)[^\S\n]*\n*')
+WORD = re.compile(r'\S+\s*|\s+')
+
+# Diffs of the same pair are reused across reruns and sessions
+_diff_cache = ResponseCache(max_entries=32, max_bytes=16 * 1024 * 1024, ttl=None)
+
+
+def split_sentences(text):
+    return [s for s in SENTENCE.findall(text or "") if s]
+
+
+def _key(piece):
+    # Compare on content, so reflowed whitespace doesn't count as a change
+    return " ".join(piece.split())
+
+
+# --- MATCHING ---
+def _myers(a, b, alo, ahi, blo, bhi, out):
+    # Classic O(ND) shortest edit script over a[alo:ahi] / b[blo:bhi]; False if it costs too much
+    n, m = ahi - alo, bhi - blo
+    v = {1: 0}
+    trace = []
+    for d in range(min(n + m, MAX_EDIT_COST) + 1):
+        trace.append(dict(v))
+        for k in range(-d, d + 1, 2):
+            x = v[k + 1] if k == -d or (k != d and v[k - 1] < v[k + 1]) else v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x, y = x + 1, y + 1
+            v[k] = x
+            if x >= n and y >= m:
+                break
+        else:
+            continue
+        break
+    else:
+        return False
+
+    # Walk the trace backwards, collecting the diagonal (matching) moves
+    matches = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        prev_k = k + 1 if k == -d or (k != d and v[k - 1] < v[k + 1]) else k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x, y = x - 1, y - 1
+            matches.append((alo + x, blo + y))
+        x, y = prev_x, prev_y
+    out.extend(reversed(matches))
+    return True
+
+
+def _unique_anchors(a, b, alo, ahi, blo, bhi):
+    # Patience step: lines that occur exactly once on each side, longest run in the same order
+    counts = {}
+    for i in range(alo, ahi):
+        seen = counts.setdefault(a[i], [0, i, 0, -1])
+        seen[0] += 1
+    for j in range(blo, bhi):
+        seen = counts.get(b[j])
+        if seen is not None:
+            seen[2] += 1
+            seen[3] = j
+    pairs = sorted((i, j) for count_a, i, count_b, j in counts.values() if count_a == 1 and count_b == 1)
+    if not pairs:
+        return []
+    # Longest increasing subsequence of b-indices (patience sorting)
+    tails, tail_at, back = [], [], [None] * len(pairs)
+    for n, (_, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, j)
+        back[n] = tail_at[pos - 1] if pos else None
+        if pos == len(tails):
+            tails.append(j)
+            tail_at.append(n)
+        else:
+            tails[pos] = j
+            tail_at[pos] = n
+    chain, n = [], tail_at[-1]
+    while n is not None:
+        chain.append(pairs[n])
+        n = back[n]
+    return chain[::-1]
+
+
+def _patience(a, b, alo, ahi, blo, bhi, out):
+    suffix = []
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        out.append((alo, blo))
+        alo, blo = alo + 1, blo + 1
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi, bhi = ahi - 1, bhi - 1
+        suffix.append((ahi, bhi))
+    if alo < ahi and blo < bhi:
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            for i, j in anchors:
+                _patience(a, b, alo, i, blo, j, out)
+                out.append((i, j))
+                alo, blo = i + 1, j + 1
+            _patience(a, b, alo, ahi, blo, bhi, out)
+        else:
+            # No unique anchors left (repeated lines): fall back to Myers on the gap
+            _myers(a, b, alo, ahi, blo, bhi, out)
+    out.extend(reversed(suffix))
+
+
+def diff_opcodes(a, b):
+    """difflib-style opcodes [tag, i1, i2, j1, j2] from a patience diff with Myers for the gaps."""
+    matches = []
+    _patience(a, b, 0, len(a), 0, len(b), matches)
+    opcodes, i, j = [], 0, 0
+    for mi, mj in matches + [(len(a), len(b))]:
+        if i < mi or j < mj:
+            tag = "replace" if i < mi and j < mj else "delete" if i < mi else "insert"
+            opcodes.append([tag, i, mi, j, mj])
+        if mi < len(a) and mj < len(b):
+            if opcodes and opcodes[-1][0] == "equal":
+                opcodes[-1][2], opcodes[-1][4] = mi + 1, mj + 1
+            else:
+                opcodes.append(["equal", mi, mi + 1, mj, mj + 1])
+        i, j = mi + 1, mj + 1
+    return opcodes
+
+
+# --- SECTIONS ---
+def _sections(opcodes, size):
+    # Cut long opcodes into size-sentence pieces so every section renders in bounded time
+    sections, current, filled = [], [], 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        while True:
+            room = size - filled
+            span = max(i2 - i1, j2 - j1)
+            if span <= room:
+                current.append([tag, i1, i2, j1, j2])
+                filled += span
+                break
+            # Split proportionally on both sides, never past either side's end; a side that's
+            # already used up stays empty instead of borrowing sentences from the next opcode
+            if tag == "replace":
+                ci = min(i2, i1 + max(int(i1 < i2), (i2 - i1) * room // span))
+                cj = min(j2, j1 + max(int(j1 < j2), (j2 - j1) * room // span))
+            else:
+                ci, cj = i1 + min(i2 - i1, room), j1 + min(j2 - j1, room)
+            current.append([tag, i1, ci, j1, cj])
+            sections.append(current)
+            current, filled = [], 0
+            i1, j1 = ci, cj
+        if filled >= size:
+            sections.append(current)
+            current, filled = [], 0
+    if current:
+        sections.append(current)
+    return sections
+
+
+def diff_texts(original, result, section_size=SECTION_SENTENCES):
+    """Sentence-level diff of two texts, split into sections; memoized per (original, result) hash."""
+    key = hashlib.sha256(f"{section_size}\0{original or ''}\0{result or ''}".encode("utf-8")).hexdigest()
+    cached = _diff_cache.get(key)
+    if cached is not None:
+        return cached
+    a, b = split_sentences(original), split_sentences(result)
+    with tracer.span("diff.sentences", left=len(a), right=len(b)):
+        opcodes = diff_opcodes([_key(s) for s in a], [_key(s) for s in b])
+    stats = {"kept": 0, "changed": 0, "removed": 0, "added": 0}
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            stats["kept"] += i2 - i1
+        elif tag == "replace":
+            stats["changed"] += max(i2 - i1, j2 - j1)
+        elif tag == "delete":
+            stats["removed"] += i2 - i1
+        else:
+            stats["added"] += j2 - j1
+    diff = {"key": key, "left": a, "right": b, "sections": _sections(opcodes, section_size), "stats": stats}
+    _diff_cache.set(key, diff)
+    return diff
+
+
+def section_segments(diff, index, words=True):
+    """(left, right) lists of [text, tag] for one section; replaced sentences get a word-level pass."""
+    key = f"{diff['key']}:{index}:{int(words)}"
+    cached = _diff_cache.get(key)
+    if cached is not None:
+        return cached
+    left, right = [], []
+    with tracer.span("diff.section", words=words):
+        for tag, i1, i2, j1, j2 in diff["sections"][index]:
+            old, new = "".join(diff["left"][i1:i2]), "".join(diff["right"][j1:j2])
+            if tag == "replace" and words:
+                a, b = WORD.findall(old), WORD.findall(new)
+                for wtag, wi1, wi2, wj1, wj2 in diff_opcodes([_key(w) for w in a], [_key(w) for w in b]):
+                    if wi1 < wi2:
+                        left.append(["".join(a[wi1:wi2]), "equal" if wtag == "equal" else "delete"])
+                    if wj1 < wj2:
+                        right.append(["".join(b[wj1:wj2]), "equal" if wtag == "equal" else "insert"])
+            else:
+                if old:
+                    left.append([old, "equal" if tag == "equal" else "delete"])
+                if new:
+                    right.append([new, "equal" if tag == "equal" else "insert"])
+    segments = (left, right)
+    _diff_cache.set(key, segments)
+    return segments
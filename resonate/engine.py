@@ -0,0 +1,374 @@
+import asyncio
+import contextlib
+import os
+import time
+
+from .backends import ROUTER_URL, TEXT_MODEL, HttpBackend, build_backend
+from .batch import Cancelled, HostLimiters, run_batch
+from .cache import ResponseCache, make_cache_key
+from .fairqueue import QuotaExceeded
+from .http_client import HttpClient
+from .longdoc import DEFAULT_CHUNK_TOKENS, aggregate_scores, split_into_chunks, with_continuity
+from .prompts import MAX_OUTPUT_TOKENS, prepare_transformation
+from .singleflight import SingleFlight
+from .streaming import SCORES_MARKER, ScoresStreamParser, extract_scores
+from .tokens import count_message_tokens, count_tokens
+from .tracing import tracer
+
+# --- DEFAULTS ---
+# TEXT_MODEL and ROUTER_URL live in backends.py and are re-exported here
+TTS_URL = "https://api-inference.huggingface.co/models/facebook/mms-tts-eng"
+# Failed long-document parts get this many more tries before the whole document fails
+CHUNK_RETRIES = 1
+
+
+class DocumentFailed(Exception):
+    def __init__(self, failed, total, error):
+        self.failed = failed
+        self.total = total
+        super().__init__(f"{len(failed)} of {total} parts failed ({error}). Parts that worked are cached, so running it again only redoes the rest.")
+
+
+def finish_transformation(output, parser=None, llm_scores=False):
+    with tracer.span("scores.extract", llm_scores=llm_scores) as span:
+        try:
+            if "choices" in output:
+                full_res = output["choices"][0]["message"]["content"].strip()
+
+                if llm_scores:
+                    # The stream parser already split off the [SCORES] line as it arrived
+                    if parser is not None:
+                        text_part, data_part = parser.finish()
+                        if data_part:
+                            span.set(source="stream")
+                            return text_part, data_part
+
+                    # Delimiter split with regex fallback on the assembled text
+                    text_part, data_part = extract_scores(full_res)
+                    if data_part:
+                        span.set(source="llm")
+                        return text_part, data_part
+                else:
+                    # Not asked for, but drop a stray [SCORES] line if the model adds one anyway
+                    full_res = full_res.split(SCORES_MARKER)[0].strip()
+
+                # Imported here so importing the engine doesn't pull in NumPy/pandas before the first run
+                from .scoring import score_text
+
+                span.set(source="local")
+                return full_res, score_text(full_res)
+            span.fail(output.get("error"))
+            return f"⚠️ {output.get('error')}", "0,0,0,0,0"
+        except Exception as e:
+            span.fail(e)
+            return f"❌ Transformation Failed: {str(e)}", "0,0,0,0,0"
+
+
+class Engine:
+    """Everything needed to run a transformation, with no Streamlit dependency.
+
+    Holds the pooled HTTP client, the response cache and the single-flight table, so create
+    one per process (the app wraps it in st.cache_resource, the CLI builds one per run).
+    Pass a FairScheduler to share upstream capacity fairly between users, and a backend
+    (see backends.py) to run completions somewhere other than the Hugging Face router.
+    """
+
+    def __init__(self, api_token, model=TEXT_MODEL, router_url=ROUTER_URL, tts_url=TTS_URL,
+                 cache_path=None, client=None, cache=None, flights=None, scheduler=None, backend=None):
+        self.router_url = router_url
+        self.tts_url = tts_url
+        self.client = client or HttpClient(headers={"Authorization": f"Bearer {api_token}"})
+        if isinstance(backend, str):
+            backend = build_backend(backend, self.client, router_url, model)
+        self.backend = backend or HttpBackend(self.client, router_url, model, name="hf")
+        # Part of every cache key, so replies from different backends are never mixed up.
+        # A router's key covers all its backends, so _cacheable keeps only the primary's replies.
+        self.model = self.backend.model
+        self.cache = cache or ResponseCache(disk_path=cache_path or None)
+        self.flights = flights or SingleFlight()
+        # Rate buckets per host, shared by every batch and long document this engine runs
+        self.limiters = HostLimiters()
+        self.scheduler = scheduler
+
+    @classmethod
+    def from_env(cls, **overrides):
+        # Same settings as .streamlit/secrets.toml, read from environment variables
+        settings = {
+            "api_token": os.environ.get("HUGGING_FACE_API_KEY", ""),
+            "router_url": os.environ.get("HF_ROUTER_URL", ROUTER_URL),
+            "tts_url": os.environ.get("HF_TTS_URL", TTS_URL),
+            "cache_path": os.environ.get("RESPONSE_CACHE_PATH", ".cache/responses.sqlite"),
+            "backend": os.environ.get("BACKENDS") or None,
+        }
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**settings)
+
+    # --- AI LOGIC ---
+    def build_payload(self, messages, max_tokens=None):
+        # What a request means, for cache keys; each backend builds its own wire payload from the same messages.
+        # prepare_transformation sizes max_tokens to the format; anything else gets the old ceiling
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens or MAX_OUTPUT_TOKENS,
+            "temperature": 0.7
+        }
+
+    @staticmethod
+    def _trace_output(span, messages, output):
+        # Errors stay in the return value as before, but the span records them
+        if "choices" not in output:
+            span.fail(output.get("error"))
+            return
+        if output.get("backend"):
+            # The router says which backend answered
+            span.set(backend=output["backend"])
+        if output["choices"][0].get("finish_reason") == "length":
+            # Hit max_tokens: the budget for this format was too tight
+            span.set(truncated=True)
+            tracer.incr("tokens.truncated")
+        usage = output.get("usage") or {}
+        if "prompt_tokens" in usage or "completion_tokens" in usage:
+            tracer.add_tokens(usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0)
+        else:
+            # Backend didn't report usage: count locally
+            tracer.add_tokens(count_message_tokens(messages), count_tokens(output["choices"][0]["message"]["content"]), estimated=True)
+
+    def query_ai(self, messages, max_tokens=None):
+        with tracer.span("ai.request", model=self.model, stream=False) as span:
+            try:
+                output = self.backend.complete(messages, max_tokens or MAX_OUTPUT_TOKENS)
+            except Exception as e:
+                output = {"error": str(e)}
+            self._trace_output(span, messages, output)
+            return output
+
+    def query_ai_stream(self, messages, on_delta, max_tokens=None):
+        # Same return shape as query_ai, but tokens are pushed to on_delta as they arrive
+        with tracer.span("ai.request", model=self.model, stream=True) as span:
+            started = time.perf_counter()
+
+            def relay(delta):
+                if "ttft_ms" not in span.attrs:
+                    span.set(ttft_ms=round((time.perf_counter() - started) * 1000, 1))
+                on_delta(delta)
+
+            try:
+                output = self.backend.stream(messages, relay, max_tokens or MAX_OUTPUT_TOKENS)
+            except Exception as e:
+                output = {"error": str(e)}
+            self._trace_output(span, messages, output)
+            return output
+
+    async def aquery_ai(self, messages, max_tokens=None):
+        with tracer.span("ai.request", model=self.model, stream=False) as span:
+            try:
+                output = await self.backend.acomplete(messages, max_tokens or MAX_OUTPUT_TOKENS)
+            except Exception as e:
+                output = {"error": str(e)}
+            self._trace_output(span, messages, output)
+            return output
+
+    def _cache_get(self, key):
+        output = self.cache.get(key)
+        tracer.incr("cache.hits" if output is not None else "cache.misses")
+        return output
+
+    def _cacheable(self, output):
+        # Only successful completions are worth remembering, and under a router only the primary's:
+        # a hedge or failover reply (fake, a local GGUF...) must not be replayed for later identical requests
+        if "choices" not in output:
+            return False
+        primary = getattr(self.backend, "primary", None)
+        return primary is None or output.get("backend", primary) == primary
+
+    def _charge(self, user):
+        if self.scheduler is not None:
+            self.scheduler.charge(user)
+
+    def _slot(self, user):
+        return self.scheduler.slot(user) if self.scheduler is not None else contextlib.nullcontext()
+
+    def _aslot(self, user):
+        return self.scheduler.aslot(user) if self.scheduler is not None else contextlib.nullcontext()
+
+    def cached_query_ai(self, messages, inputs, on_delta=None, user=None):
+        max_tokens = inputs.get("max_tokens")
+        key = make_cache_key(inputs, self.build_payload(messages, max_tokens))
+        output = self._cache_get(key)
+        if output is not None:
+            if on_delta is not None:
+                on_delta(output["choices"][0]["message"]["content"])
+            return output
+
+        def call(publish):
+            # An identical call may have landed between our lookup and taking the lead
+            output = self.cache.get(key, peek=True)
+            if output is not None:
+                return output
+            # Only the leader is charged; followers ride along on its upstream call
+            self._charge(user)
+            with self._slot(user):
+                if on_delta is not None:
+                    def relay(delta):
+                        publish(delta)
+                        on_delta(delta)
+                    output = self.query_ai_stream(messages, relay, max_tokens)
+                else:
+                    output = self.query_ai(messages, max_tokens)
+            if self._cacheable(output):
+                self.cache.set(key, output, owner=user)
+            return output
+
+        # Concurrent identical requests (any session) wait on one upstream call
+        while True:
+            try:
+                output, forwarded = self.flights.run(key, call, on_delta, lookup=lambda: self.cache.get(key, peek=True))
+                break
+            except QuotaExceeded as e:
+                if e.user == user:
+                    return {"error": str(e)}
+                # The leader we joined was over its own quota, not ours: go again
+            except Exception as e:
+                return {"error": str(e)}
+        if forwarded == 0 and on_delta is not None and "choices" in output:
+            on_delta(output["choices"][0]["message"]["content"])
+        return output
+
+    async def acached_query_ai(self, messages, inputs, user=None):
+        max_tokens = inputs.get("max_tokens")
+        key = make_cache_key(inputs, self.build_payload(messages, max_tokens))
+        output = self._cache_get(key)
+        if output is not None:
+            return output
+
+        async def call():
+            output = self.cache.get(key, peek=True)
+            if output is not None:
+                return output
+            self._charge(user)
+            async with self._aslot(user):
+                output = await self.aquery_ai(messages, max_tokens)
+            if self._cacheable(output):
+                self.cache.set(key, output, owner=user)
+            return output
+
+        while True:
+            try:
+                return await self.flights.arun(key, call, lookup=lambda: self.cache.get(key, peek=True))
+            except QuotaExceeded as e:
+                if e.user == user:
+                    return {"error": str(e)}
+            except Exception as e:
+                return {"error": str(e)}
+
+    def query_audio(self, text):
+        # Neural TTS Model (Much more natural than gTTS)
+        with tracer.span("tts.request", chars=len(text)) as span:
+            try:
+                response = self.client.post(self.tts_url, json={"inputs": text})
+                if response.status_code == 200:
+                    return response.content
+                span.fail(f"API Error {response.status_code}")
+                return None
+            except Exception as e:
+                span.fail(e)
+                return None
+
+    async def aquery_audio(self, text):
+        with tracer.span("tts.request", chars=len(text)) as span:
+            try:
+                response = await self.client.apost(self.tts_url, json={"inputs": text})
+                if response.status_code == 200:
+                    return response.content
+                span.fail(f"API Error {response.status_code}")
+                return None
+            except Exception as e:
+                span.fail(e)
+                return None
+
+    # --- TRANSFORMATIONS ---
+    def execute_transformation(self, text, tone, platform, emoji_level, length, vibe, target_lang, custom_prompt, target_keywords, on_token=None, llm_scores=False, user=None):
+        with tracer.span("transform", run=True, platform=platform, stream=on_token is not None):
+            messages, inputs = prepare_transformation(text, tone, platform, emoji_level, length, vibe, target_lang, custom_prompt, target_keywords, llm_scores)
+            parser = None
+            on_delta = None
+            if on_token is not None:
+                parser = ScoresStreamParser()
+                on_delta = lambda delta: on_token(parser.feed(delta))
+            output = self.cached_query_ai(messages, inputs, on_delta=on_delta, user=user)
+            return finish_transformation(output, parser, llm_scores)
+
+    async def aexecute_transformation(self, text, tone, platform, emoji_level, length, vibe, target_lang, custom_prompt, target_keywords, llm_scores=False, user=None):
+        with tracer.span("transform", run=True, platform=platform, stream=False):
+            messages, inputs = prepare_transformation(text, tone, platform, emoji_level, length, vibe, target_lang, custom_prompt, target_keywords, llm_scores)
+            return finish_transformation(await self.acached_query_ai(messages, inputs, user=user), llm_scores=llm_scores)
+
+    def host(self, job=None):
+        # Per-host politeness bucket for batch fan-out; a LatencyRouter spreads load itself and counts as one
+        return self.backend.host
+
+    def execute_batch(self, text, variants, custom_prompt, target_keywords, max_workers=4, rate=2.0, on_result=None, llm_scores=False, user=None, should_cancel=None):
+        # Fan a matrix of variants out concurrently; on_result(index, variant, (res, data)) fires as each lands.
+        # The host's rate bucket lives on the engine, so concurrent batches from other sessions share it
+        async def worker(variant):
+            return await self.aexecute_transformation(
+                text, variant["tone"], variant["platform"], variant["emoji_level"], variant["length"],
+                variant["vibe"], variant["target_lang"], custom_prompt, target_keywords, llm_scores, user
+            )
+
+        def handle(index, variant, result):
+            if isinstance(result, Exception):
+                result = (f"❌ Transformation Failed: {str(result)}", "0,0,0,0,0")
+            if on_result is not None:
+                on_result(index, variant, result)
+
+        with tracer.span("batch", variants=len(variants), workers=max_workers):
+            return asyncio.run(run_batch(variants, worker, max_workers=max_workers, rate=rate, host=self.host, limiters=self.limiters, on_result=handle, should_cancel=should_cancel))
+
+    def execute_long_document(self, text, tone, platform, emoji_level, length, vibe, target_lang, custom_prompt, target_keywords,
+                              max_chunk_tokens=DEFAULT_CHUNK_TOKENS, max_workers=4, rate=2.0, on_chunk=None, llm_scores=False, user=None, should_cancel=None):
+        # Map: transform token-budgeted chunks concurrently. Reduce: stitch in order + length-weighted scores.
+        chunks = split_into_chunks(text, max_chunk_tokens)
+        if not chunks:
+            return "", "0,0,0,0,0"
+
+        async def worker(index):
+            messages, inputs = prepare_transformation(chunks[index], tone, platform, emoji_level, length, vibe, target_lang, custom_prompt, target_keywords, llm_scores)
+            messages, inputs = with_continuity(messages, inputs, index, len(chunks), chunks[index - 1] if index else None)
+            output = await self.acached_query_ai(messages, inputs, user=user)
+            if "choices" not in output:
+                raise RuntimeError(output.get("error") or "no reply")
+            return finish_transformation(output, llm_scores=llm_scores)
+
+        results = [None] * len(chunks)
+        errors = {}
+
+        def handle(_, index, result):
+            # Jobs are chunk indices; the position argument only matches them on the first pass
+            if isinstance(result, Exception):
+                errors[index] = str(result)
+                return
+            errors.pop(index, None)
+            results[index] = result
+            if on_chunk is not None:
+                on_chunk(index, len(chunks), *result)
+
+        # One run for the whole document, so the panel reports its total tokens
+        with tracer.span("transform.long", run=True, platform=platform, chunks=len(chunks)):
+            pending = list(range(len(chunks)))
+            for attempt in range(1 + CHUNK_RETRIES):
+                if attempt:
+                    tracer.incr("longdoc.retried", len(pending))
+                asyncio.run(run_batch(pending, worker, max_workers=max_workers, rate=rate, host=self.host, limiters=self.limiters, on_result=handle, should_cancel=should_cancel))
+                pending = sorted(errors)
+                if not pending:
+                    break
+            if any(result is None and index not in errors for index, result in enumerate(results)):
+                # Cancelled part way: a document with holes in it is no result at all
+                raise Cancelled("Cancelled before every chunk was transformed")
+            if errors:
+                # Nor is one stitched around failed parts, which would be saved and shown as a success
+                raise DocumentFailed(sorted(errors), len(chunks), errors[min(errors)])
+            stitched = "\n\n".join(res for res, _ in results)
+            return stitched, aggregate_scores([data for _, data in results], [len(c) for c in chunks])
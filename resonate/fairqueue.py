@@ -0,0 +1,128 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+
+from .tracing import tracer
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, user, retry_after):
+        self.user = user
+        self.retry_after = retry_after
+        super().__init__(f"Quota exceeded; try again in {math.ceil(retry_after)}s")
+
+
+class FairScheduler:
+    """Admits upstream calls round-robin across users, with per-user concurrency caps and quotas.
+
+    Every user gets their own FIFO; when a slot frees up the next user in rotation with
+    spare per-user capacity goes first, so a big batch from one session can't starve a
+    single request from another. Waiters hold a Future rather than a thread, so the same
+    scheduler serves blocking callers and asyncio tasks alike.
+    """
+
+    def __init__(self, max_concurrent=8, per_user_concurrent=4, quota=None, quota_window=3600.0):
+        self.max_concurrent = max_concurrent
+        self.per_user_concurrent = per_user_concurrent or max_concurrent
+        self.quota = quota
+        self.quota_window = quota_window
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()  # user -> deque of waiting Futures, in rotation order
+        self._active = defaultdict(int)
+        self._charges = defaultdict(deque)
+
+    # --- QUOTAS ---
+    def _expire(self, user, now):
+        charges = self._charges[user]
+        while charges and charges[0] <= now - self.quota_window:
+            charges.popleft()
+        return charges
+
+    def charge(self, user):
+        # Count one upstream call against the user's rolling-window quota, or raise
+        if not self.quota:
+            return
+        now = time.time()
+        with self._lock:
+            charges = self._expire(user, now)
+            if len(charges) >= self.quota:
+                tracer.incr("quota.rejected")
+                raise QuotaExceeded(user, charges[0] + self.quota_window - now)
+            charges.append(now)
+
+    def usage(self, user):
+        with self._lock:
+            used = len(self._expire(user, time.time()))
+        return used, self.quota
+
+    # --- ADMISSION ---
+    def _dispatch(self):
+        total = sum(self._active.values())
+        while total < self.max_concurrent:
+            # (user may legitimately be None for anonymous callers, so no next(..., None) here)
+            for user, waiters in self._queues.items():
+                if waiters and self._active.get(user, 0) < self.per_user_concurrent:
+                    break
+            else:
+                return
+            waiter = waiters.popleft()
+            # Rotate: whoever was just served goes to the back of the line
+            self._queues.move_to_end(user)
+            if not waiters:
+                del self._queues[user]
+            if not waiter.set_running_or_notify_cancel():
+                continue  # Waiter gave up (cancelled task)
+            self._active[user] += 1
+            total += 1
+            waiter.set_result(None)
+
+    def _request(self, user):
+        waiter = Future()
+        with self._lock:
+            self._queues.setdefault(user, deque()).append(waiter)
+            self._dispatch()
+        return waiter
+
+    def _release(self, user):
+        with self._lock:
+            self._active[user] -= 1
+            if not self._active[user]:
+                del self._active[user]
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, user):
+        with tracer.span("queue.wait"):
+            self._request(user).result()
+        try:
+            yield
+        finally:
+            self._release(user)
+
+    @asynccontextmanager
+    async def aslot(self, user):
+        waiter = self._request(user)
+        try:
+            with tracer.span("queue.wait"):
+                await asyncio.wrap_future(waiter)
+        except asyncio.CancelledError:
+            # Cancelled just as the slot was granted: hand it straight back
+            if waiter.done() and not waiter.cancelled():
+                self._release(user)
+            raise
+        try:
+            yield
+        finally:
+            self._release(user)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "active": sum(self._active.values()),
+                "queued": sum(len(q) for q in self._queues.values()),
+                "users_waiting": sum(1 for q in self._queues.values() if q),
+            }
@@ -0,0 +1,161 @@
+import codecs
+import hashlib
+import os
+
+from .cache import ResponseCache
+from .tracing import tracer
+
+try:
+    from charset_normalizer import from_bytes
+except ImportError:
+    from_bytes = None
+
+# --- LIMITS ---
+MAX_CHARS = 1_000_000       # Text kept from any document
+MAX_TXT_BYTES = 20 * 1024 * 1024
+MAX_PDF_PAGES = 300
+READ_BLOCK = 64 * 1024
+
+# Parsed documents keyed by content hash, shared by every session in the process
+_parse_cache = ResponseCache(max_entries=32, max_bytes=64 * 1024 * 1024, ttl=None)
+
+
+def content_hash(fileobj):
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(1024 * 1024), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def detect_encoding(sample):
+    for bom, encoding in ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")):
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # A multi-byte char may be cut at the end of the sample, so ignore a short tail
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    if from_bytes is not None:
+        matches = from_bytes(sample)
+        best = matches.best()
+        if best is not None:
+            # Single-byte code pages often tie; prefer Western European when it's one of the best
+            tied = [m.encoding for m in matches if m.chaos == best.chaos and m.coherence == best.coherence]
+            return "cp1252" if "cp1252" in tied else best.encoding
+    return "cp1252"
+
+
+# --- STREAMING PARSERS ---
+# Each parser flags state["truncated"] when it stops at a ceiling
+def iter_txt(fileobj, max_bytes=MAX_TXT_BYTES, state=None):
+    sample = fileobj.read(READ_BLOCK)
+    encoding = detect_encoding(sample)
+    # Strict while the encoding is only a guess from the first block. A later block that doesn't
+    # fit (a cp1252 "é" deep in a mostly-ASCII file) gets the rest of the file re-detected from there.
+    decoder = codecs.getincrementaldecoder(encoding)()
+    strict = True
+
+    def decode(block, final=False):
+        nonlocal decoder, strict
+        if not strict:
+            return decoder.decode(block, final)
+        try:
+            return decoder.decode(block, final)
+        except UnicodeDecodeError as e:
+            # The decoder is left as it was: e.start counts from its buffered bytes, then the block
+            buffered = decoder.getstate()[0]
+            cut = e.start - len(buffered)
+            head = decoder.decode(block[:cut]) if cut > 0 else ""
+            rest = block[cut:] if cut > 0 else buffered + block
+            decoder = codecs.getincrementaldecoder(detect_encoding(rest))(errors="replace")
+            strict = False
+            tracer.incr("file.redetected")
+            return head + decoder.decode(rest, final)
+
+    read = 0
+    block = sample
+    while block:
+        read += len(block)
+        if read > max_bytes:
+            block = block[:len(block) - (read - max_bytes)]
+            yield decode(block, final=True)
+            if state is not None:
+                state["truncated"] = True
+            return
+        yield decode(block)
+        block = fileobj.read(READ_BLOCK)
+    yield decode(b"", final=True)
+
+
+def iter_docx(fileobj, state=None):
+    from docx import Document
+
+    for para in Document(fileobj).paragraphs:
+        yield para.text + "\n"
+
+
+def iter_pdf(fileobj, max_pages=MAX_PDF_PAGES, state=None):
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(fileobj)
+    for index, page in enumerate(reader.pages):
+        if index >= max_pages:
+            if state is not None:
+                state["truncated"] = True
+            return
+        yield (page.extract_text() or "") + "\n\n"
+
+
+def iter_document(fileobj, name, max_bytes=MAX_TXT_BYTES, max_pages=MAX_PDF_PAGES, state=None):
+    lower = name.lower()
+    if lower.endswith(".docx"):
+        return iter_docx(fileobj, state)
+    if lower.endswith(".pdf"):
+        return iter_pdf(fileobj, max_pages, state)
+    return iter_txt(fileobj, max_bytes, state)
+
+
+def ingest(fileobj, name=None, max_chars=MAX_CHARS, max_bytes=MAX_TXT_BYTES, max_pages=MAX_PDF_PAGES, digest=None):
+    """Parse a document piece by piece, stopping early at the limits.
+
+    Returns {"text", "truncated", "pieces", "hash"}; results are cached by content hash,
+    so pass `digest` when the caller already knows it to skip re-hashing.
+    """
+    name = name or getattr(fileobj, "name", "")
+    digest = digest or content_hash(fileobj)
+    key = f"{digest}:{os.path.splitext(name)[1].lower()}:{max_chars}:{max_bytes}:{max_pages}"
+    cached = _parse_cache.get(key)
+    if cached is not None:
+        return cached
+
+    with tracer.span("file.parse", ext=os.path.splitext(name)[1].lower()) as span:
+        fileobj.seek(0)
+        state = {"truncated": False}
+        parts, size, pieces = [], 0, 0
+        for piece in iter_document(fileobj, name, max_bytes, max_pages, state):
+            pieces += 1
+            if size + len(piece) > max_chars:
+                parts.append(piece[:max_chars - size])
+                state["truncated"] = True
+                break
+            parts.append(piece)
+            size += len(piece)
+
+        result = {"text": "".join(parts).strip(), "truncated": state["truncated"], "pieces": pieces, "hash": digest}
+        span.set(chars=len(result["text"]), pieces=pieces, truncated=state["truncated"])
+    _parse_cache.set(key, result)
+    return result
+
+
+def read_file(uploaded_file):
+    # Accepts a Streamlit upload or any binary file object with a .name
+    return ingest(uploaded_file)["text"]
+
+
+def read_path(path):
+    with open(path, "rb") as f:
+        return read_file(f)
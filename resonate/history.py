@@ -0,0 +1,171 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+PREVIEW_CHARS = 120
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    created REAL NOT NULL,
+    persona TEXT, platform TEXT, vibe TEXT, language TEXT,
+    style TEXT NOT NULL,
+    original TEXT NOT NULL,
+    transformed TEXT NOT NULL,
+    metrics TEXT
+);
+CREATE INDEX IF NOT EXISTS history_session_created ON history (session_id, created);
+CREATE INDEX IF NOT EXISTS history_created ON history (created);
+CREATE INDEX IF NOT EXISTS history_persona ON history (persona);
+CREATE INDEX IF NOT EXISTS history_platform ON history (platform);
+"""
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5 (
+    original, transformed, content='history', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts (rowid, original, transformed) VALUES (new.id, new.original, new.transformed);
+END;
+CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts (history_fts, rowid, original, transformed) VALUES ('delete', old.id, old.original, old.transformed);
+END;
+"""
+
+
+def fts_query(text):
+    # Quote each term so user input can't trip FTS5 syntax; prefix-match the last one as you type
+    terms = re.findall(r"\w+", text)
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class HistoryStore:
+    """SQLite-backed transformation history with FTS5 search and a retention policy.
+
+    Rows are scoped by session_id; the sidebar only ever loads one page of previews,
+    and full texts are fetched by id when needed.
+    """
+
+    def __init__(self, path, max_rows_per_session=500, max_age_days=30, compact_every=50):
+        self.path = path or ":memory:"
+        self.max_rows_per_session = max_rows_per_session
+        self.max_age_days = max_age_days
+        self.compact_every = compact_every
+        folder = os.path.dirname(self.path) if self.path != ":memory:" else ""
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._inserts = 0
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            try:
+                self._conn.executescript(FTS_SCHEMA)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: search falls back to LIKE
+                self.has_fts = False
+            self._conn.commit()
+
+    def add(self, session_id, original, transformed, metrics, style, persona=None, platform=None, vibe=None, language=None):
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO history (session_id, created, persona, platform, vibe, language, style, original, transformed, metrics) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, time.time(), persona, platform, vibe, language, style, original, transformed, metrics),
+            )
+            self._conn.commit()
+            self._inserts += 1
+            row_id = cur.lastrowid
+        if self.compact_every and self._inserts % self.compact_every == 0:
+            self.compact()
+        else:
+            self._trim_session(session_id)
+        return row_id
+
+    def get(self, row_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM history WHERE id = ?", (row_id,)).fetchone()
+        return dict(row) if row else None
+
+    def _where(self, session_id, query, persona=None, platform=None):
+        clauses, params = ["h.session_id = ?"], [session_id]
+        if persona:
+            clauses.append("h.persona = ?")
+            params.append(persona)
+        if platform:
+            clauses.append("h.platform = ?")
+            params.append(platform)
+        join = ""
+        match = fts_query(query) if query else None
+        if match and self.has_fts:
+            join = "JOIN history_fts f ON f.rowid = h.id"
+            clauses.append("history_fts MATCH ?")
+            params.append(match)
+        elif query:
+            clauses.append("(h.original LIKE ? OR h.transformed LIKE ?)")
+            params += [f"%{query}%", f"%{query}%"]
+        return join, " AND ".join(clauses), params
+
+    def count(self, session_id, query=None, persona=None, platform=None):
+        join, where, params = self._where(session_id, query, persona, platform)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM history h {join} WHERE {where}", params).fetchone()[0]
+
+    def page(self, session_id, offset=0, limit=10, query=None, persona=None, platform=None):
+        # Newest first, previews only
+        join, where, params = self._where(session_id, query, persona, platform)
+        sql = (f"SELECT h.id, h.created, h.style, h.metrics, substr(h.transformed, 1, {PREVIEW_CHARS}) AS preview "
+               f"FROM history h {join} WHERE {where} ORDER BY h.created DESC, h.id DESC LIMIT ? OFFSET ?")
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit, offset]).fetchall()
+        return [dict(r) for r in rows]
+
+    def transformed_texts(self, session_id, limit=200):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT transformed FROM history WHERE session_id = ? ORDER BY created DESC, id DESC LIMIT ?",
+                (session_id, limit),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def _trim_session(self, session_id):
+        if not self.max_rows_per_session:
+            return
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM history WHERE session_id = ? AND id NOT IN "
+                "(SELECT id FROM history WHERE session_id = ? ORDER BY created DESC, id DESC LIMIT ?)",
+                (session_id, session_id, self.max_rows_per_session),
+            )
+            self._conn.commit()
+
+    def compact(self):
+        """Apply the retention policy to every session and merge FTS segments."""
+        with self._lock:
+            removed = 0
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self._conn.execute("DELETE FROM history WHERE created < ?", (cutoff,)).rowcount
+            if self.max_rows_per_session:
+                removed += self._conn.execute(
+                    "DELETE FROM history WHERE id IN (SELECT id FROM ("
+                    "SELECT id, ROW_NUMBER() OVER (PARTITION BY session_id ORDER BY created DESC, id DESC) AS rn FROM history"
+                    ") WHERE rn > ?)",
+                    (self.max_rows_per_session,),
+                ).rowcount
+            if self.has_fts:
+                self._conn.execute("INSERT INTO history_fts (history_fts) VALUES ('optimize')")
+            self._conn.commit()
+        return removed
+
+    def clear(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM history WHERE session_id = ?", (session_id,))
+            self._conn.commit()
@@ -0,0 +1,90 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .tracing import tracer
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    # Retry-After is either delay-seconds or an HTTP-date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpClient:
+    """Pooled keep-alive session with retry/backoff and an asyncio front-end."""
+
+    def __init__(self, headers=None, pool_size=10, max_retries=3, backoff_base=0.5, backoff_max=20.0,
+                 connect_timeout=5.0, read_timeout=60.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        # Retries are handled below so Retry-After and jitter behave the same for every status
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter: uniform in [0, base * 2^attempt]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        # Covers every attempt; for streamed responses it ends at the headers (time to first byte)
+        with tracer.span("http.post", host=urlparse(url).netloc) as span:
+            attempt = 0
+            while True:
+                try:
+                    response = self.session.post(url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if attempt >= self.max_retries:
+                        span.set(attempts=attempt + 1)
+                        raise
+                    tracer.incr("http.retries")
+                    span.set(last_retry=type(e).__name__)
+                    time.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    delay = self._backoff(attempt, parse_retry_after(response.headers.get("Retry-After")))
+                    response.close()
+                    tracer.incr("http.retries")
+                    span.set(last_retry=response.status_code)
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+
+                response.attempts = attempt + 1
+                span.set(status_code=response.status_code, attempts=response.attempts)
+                if response.status_code >= 400:
+                    span.fail(f"HTTP {response.status_code}")
+                return response
+
+    async def apost(self, url, **kwargs):
+        # requests is blocking, so run it on a worker thread and keep the event loop free
+        return await asyncio.to_thread(self.post, url, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,161 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .tracing import tracer
+
+ACTIVE = ("queued", "running")
+
+
+class TooManyJobs(Exception):
+    def __init__(self, user, limit):
+        self.user = user
+        self.limit = limit
+        super().__init__(f"{limit} transformations are already running; wait for one to finish or cancel it")
+
+
+class Job:
+    """One background transformation (or batch of them): status, live progress and, once finished, its result."""
+
+    def __init__(self, user, label, kind="transform"):
+        self.id = uuid.uuid4().hex[:12]
+        self.user = user
+        self.label = label
+        self.kind = kind
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.history_id = None
+        self.future = None
+        self._parts = []
+        self._items = []
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    # Called from the worker thread. These never raise on cancel: a running call may be shared
+    # with other sessions through single-flight, so it is left to finish and only our copy is dropped.
+    def stream(self, delta):
+        if delta and not self.cancelled:
+            self._parts.append(delta)
+
+    def add_item(self, item):
+        # Finished pieces of a multi-part job (batch variants), so the UI can show them before the whole job is done
+        if not self.cancelled:
+            with self._lock:
+                self._items.append(item)
+
+    def report(self, progress):
+        if not self.cancelled:
+            self.progress = progress
+
+    def snapshot(self):
+        with self._lock:
+            items = list(self._items)
+        return {
+            "id": self.id, "label": self.label, "kind": self.kind, "status": self.status, "created": self.created,
+            "started": self.started, "finished": self.finished, "progress": self.progress,
+            "partial": "".join(self._parts), "items": items, "result": self.result, "error": self.error, "history_id": self.history_id,
+        }
+
+
+class JobQueue:
+    """Runs transformations on a thread pool so they outlive the Streamlit rerun that submitted them.
+
+    Jobs are keyed by user (the session id), so a rerun, a widget change or a page refresh
+    can pick up the same jobs by polling. Finished jobs are kept per user up to `keep_finished`.
+    """
+
+    def __init__(self, max_workers=8, max_per_user=3, keep_finished=20):
+        self.max_per_user = max_per_user
+        self.keep_finished = keep_finished
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resonate-job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()  # id -> Job, in submission order
+
+    def submit(self, user, fn, label="", on_done=None, kind="transform"):
+        """Queue fn(job) and return the job id at once; on_done(job, result) runs on success, its return value is the history id.
+
+        `kind` is just carried along ("transform" / "batch") so the UI knows what the result looks like.
+        """
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.user == user and job.status in ACTIVE)
+            if self.max_per_user and running >= self.max_per_user:
+                tracer.incr("jobs.rejected")
+                raise TooManyJobs(user, self.max_per_user)
+            job = Job(user, label, kind)
+            self._jobs[job.id] = job
+            self._prune(user)
+        tracer.incr("jobs.submitted")
+        job.future = self._pool.submit(self._run, job, fn, on_done)
+        return job.id
+
+    def _run(self, job, fn, on_done):
+        with self._lock:
+            if job.cancelled:
+                return
+            job.started = time.time()
+            job.status = "running"
+        with tracer.span("job", wait_ms=round((job.started - job.created) * 1000, 1)) as span:
+            try:
+                result = fn(job)
+                if not job.cancelled and on_done is not None:
+                    job.history_id = on_done(job, result)
+                job.result = result
+            except Exception as e:
+                span.fail(e)
+                job.error = str(e)
+        with self._lock:
+            if job.cancelled:
+                job.result = None
+                return
+            job.finished = time.time()
+            job.status = "failed" if job.error else "done"
+        tracer.incr(f"jobs.{job.status}")
+
+    def _prune(self, user):
+        # Oldest finished jobs go first; queued and running ones are never dropped
+        finished = [job.id for job in self._jobs.values() if job.user == user and job.status not in ACTIVE]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def cancel(self, job_id, user=None):
+        """Drop a job: a queued one never starts, a running one finishes in the background and is discarded."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (user is not None and job.user != user) or job.status not in ACTIVE:
+                return False
+            job._cancel.set()
+            if job.future is not None:
+                job.future.cancel()
+            job.status = "cancelled"
+            job.finished = time.time()
+        tracer.incr("jobs.cancelled")
+        return True
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return job.snapshot() if job is not None else None
+
+    def jobs(self, user):
+        # Newest first
+        with self._lock:
+            mine = [job for job in self._jobs.values() if job.user == user]
+        return [job.snapshot() for job in reversed(mine)]
+
+    def snapshot(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "done", "failed", "cancelled")}
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,162 @@
+import functools
+import re
+from collections import deque
+
+from .tracing import tracer
+
+# Apostrophes stay inside a word ("company's"); hyphens split ("AI-driven" has "AI" in it)
+WORD = re.compile(r"\w+(?:['’]\w+)*")
+_DOUBLED = re.compile(r"([bdfgklmnprtvz])\1$")
+# Words ending in "s" that aren't plurals of anything: "news" isn't more than one "new"
+_NOT_PLURAL = frozenset({
+    "news", "does", "goes", "this", "thus", "plus", "lens", "always", "perhaps", "whereas", "towards",
+    "afterwards", "besides", "sometimes", "series", "species", "canvas", "atlas", "chaos", "ethos",
+})
+
+
+def light_stem(word):
+    """Conservative English suffix stripping, so "campaigns" / "campaigning" match "campaign"."""
+    if len(word) > 3:
+        word = _strip_suffix(word)
+    # A silent e goes on both sides, so "love" meets "lov(ed)" and "bus" meets "buse(s)"
+    if word.endswith("e") and len(word) > 2:
+        word = word[:-1]
+    return word
+
+
+def _strip_suffix(word):
+    if word.endswith(("'s", "’s")):
+        word = word[:-2]
+    if word in _NOT_PLURAL:
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "ches", "shes", "zes")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    if word.endswith("eed") and len(word) > 4:
+        # "agreed" is "agree" + d, not "agre" + ed
+        return word[:-1]
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return _DOUBLED.sub(r"\1", word[:-len(suffix)])
+    return word
+
+
+@functools.lru_cache(maxsize=65536)
+def normalize_word(word, stem=True):
+    # Case and apostrophe style don't count; memoized since prose reuses the same words constantly
+    word = word.casefold().replace("’", "'")
+    return light_stem(word) if stem else word
+
+
+def parse_keywords(raw):
+    # "AI, growth, , Growth" -> ["AI", "growth"]: comma separated, blanks and repeats dropped
+    seen, keywords = set(), []
+    for keyword in (raw or "").split(","):
+        keyword = " ".join(keyword.split())
+        if keyword and keyword.casefold() not in seen:
+            seen.add(keyword.casefold())
+            keywords.append(keyword)
+    return keywords
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over normalized words, for one keyword set.
+
+    Keywords (including multi-word phrases) become word sequences, so a scan is one pass
+    over the text's words however many keywords there are, and a match can never start
+    or end inside a word ("AI" won't hit "said").
+    """
+
+    def __init__(self, keywords, stem=True):
+        self.keywords = list(keywords)
+        self.stem = stem
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for index, keyword in enumerate(self.keywords):
+            words = [normalize_word(w, stem) for w in WORD.findall(keyword)]
+            if words:
+                self._add(words, index)
+        self._link()
+
+    def _add(self, words, index):
+        state = 0
+        for word in words:
+            nxt = self._goto[state].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][word] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((index, len(words)))
+
+    def _link(self):
+        # Breadth-first failure links; each state also reports the matches of its fallback
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(word, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """Every match as (keyword index, start, end) character offsets, in text order."""
+        matches = []
+        spans = []
+        state = 0
+        for match in WORD.finditer(text or ""):
+            spans.append(match.span())
+            word = normalize_word(match.group(), self.stem)
+            while state and word not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(word, 0)
+            for index, length in self._out[state]:
+                matches.append((index, spans[-length][0], spans[-1][1]))
+        return matches
+
+    def hits(self, text):
+        """Per keyword (in input order): {"keyword", "count", "positions"}."""
+        found = [[] for _ in self.keywords]
+        for index, start, end in self.find(text):
+            found[index].append((start, end))
+        return [{"keyword": kw, "count": len(pos), "positions": pos} for kw, pos in zip(self.keywords, found)]
+
+
+@functools.lru_cache(maxsize=64)
+def _compiled(keywords, stem):
+    return KeywordMatcher(keywords, stem)
+
+
+def compile_keywords(keywords, stem=True):
+    # One automaton per keyword set, reused across reruns, sessions and batch variants
+    return _compiled(tuple(keywords), stem)
+
+
+def keyword_hits(text, keywords, stem=True):
+    if not keywords:
+        return []
+    return compile_keywords(keywords, stem).hits(text)
+
+
+def score_many(texts, keywords, stem=True):
+    """Keyword counts for many texts with one compiled automaton, as a DataFrame (one row per text)."""
+    import pandas as pd
+
+    matcher = compile_keywords(keywords, stem)
+    with tracer.span("keywords.batch", texts=len(texts), keywords=len(keywords)):
+        rows = []
+        for text in texts:
+            counts = [hit["count"] for hit in matcher.hits(text)]
+            row = dict(zip(keywords, counts))
+            row["hit_rate"] = sum(1 for c in counts if c) / len(counts) if counts else 0.0
+            rows.append(row)
+        return pd.DataFrame(rows, columns=list(keywords) + ["hit_rate"])
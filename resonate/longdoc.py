@@ -0,0 +1,113 @@
+import re
+
+from .tokens import count_tokens
+
+DEFAULT_CHUNK_TOKENS = 600
+# Latin terminators need a space after them ("3.5" isn't a sentence end); CJK ones don't get one
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+|(?<=[。！？｡])\s*')
+
+
+def _split_chars(word, max_tokens):
+    # No whitespace to break on (CJK, a long URL): cut by characters, as many as fit
+    start = 0
+    while start < len(word):
+        size = max_tokens * 4
+        while size > 1 and count_tokens(word[start:start + size]) > max_tokens:
+            size = size * 3 // 4
+        yield word[start:start + size]
+        start += size
+
+
+def _split_oversized(piece, max_tokens):
+    # Paragraph too big on its own: fall back to sentences, then to words
+    sentences = [s for s in SENTENCE_END.split(piece) if s]
+    for sentence in sentences:
+        if count_tokens(sentence) <= max_tokens:
+            yield sentence
+            continue
+        current, size = [], 0
+        for word in sentence.split():
+            cost = count_tokens(word) + 1
+            if cost > max_tokens:
+                if current:
+                    yield " ".join(current)
+                    current, size = [], 0
+                yield from _split_chars(word, max_tokens)
+                continue
+            if current and size + cost > max_tokens:
+                yield " ".join(current)
+                current, size = [], 0
+            current.append(word)
+            size += cost
+        if current:
+            yield " ".join(current)
+
+
+def _pack(pieces, max_tokens, joiner):
+    # Pieces are counted once and summed (plus a token for the joiner) rather than recounting the growing chunk
+    chunk, size = "", 0
+    for piece in pieces:
+        cost = count_tokens(piece)
+        if chunk and size + 1 + cost > max_tokens:
+            yield chunk
+            chunk, size = "", 0
+        chunk = f"{chunk}{joiner}{piece}" if chunk else piece
+        size += cost + (1 if size else 0)
+    if chunk:
+        yield chunk
+
+
+def split_into_chunks(text, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """Pack paragraphs (then sentences) into chunks of at most ~max_tokens each."""
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n|\n', text) if p.strip()]
+    chunks, run = [], []
+    for para in paragraphs:
+        if count_tokens(para) <= max_tokens:
+            run.append(para)
+            continue
+        # Oversized paragraph: close the current run and re-pack its sentences on their own,
+        # letting the last partial chunk carry on into the following paragraphs
+        chunks.extend(_pack(run, max_tokens, "\n\n"))
+        pieces = list(_pack(_split_oversized(para, max_tokens), max_tokens, " "))
+        chunks.extend(pieces[:-1])
+        run = pieces[-1:]
+    chunks.extend(_pack(run, max_tokens, "\n\n"))
+    return chunks
+
+
+def tail_sentences(text, count=2):
+    sentences = [s for s in SENTENCE_END.split(text.strip()) if s]
+    return " ".join(sentences[-count:])
+
+
+def with_continuity(messages, inputs, index, total, previous_chunk=None):
+    # Chunks run concurrently, so continuity comes from the end of the previous *original* chunk
+    if total <= 1:
+        return messages, inputs
+    notes = [f"This is part {index + 1} of {total} of one longer document; it will be joined with the other parts."]
+    if index > 0:
+        notes.append("Do not add an opening, greeting, subject line or hook.")
+    if index < total - 1:
+        notes.append("Do not add a closing, sign-off, hashtags or call to action.")
+    if previous_chunk:
+        notes.append(f"For continuity, the previous part ended with: \"{tail_sentences(previous_chunk)}\"")
+    # Notes go with the draft so every chunk shares the same cacheable system prompt
+    user = dict(messages[-1], content=" ".join(notes) + "\n\n" + messages[-1]["content"])
+    inputs = dict(inputs, part=index, parts=total, previous=tail_sentences(previous_chunk) if previous_chunk else "")
+    return messages[:-1] + [user], inputs
+
+
+def aggregate_scores(score_strs, weights):
+    """Length-weighted mean of "a,b,c,d,e" score strings; None entries (failed chunks) are skipped."""
+    totals, weight_sum = [0.0] * 5, 0
+    for score_str, weight in zip(score_strs, weights):
+        if not score_str:
+            continue
+        scores = [int(x) for x in score_str.split(",")[:5]]
+        if len(scores) < 5:
+            continue
+        totals = [t + s * weight for t, s in zip(totals, scores)]
+        weight_sum += weight
+    if not weight_sum:
+        return "0,0,0,0,0"
+    return ",".join(str(round(t / weight_sum)) for t in totals)
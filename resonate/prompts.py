@@ -0,0 +1,142 @@
+import itertools
+
+from .cache import normalize_text
+from .tokens import CONTEXT_TOKENS, count_tokens
+
+# --- OPTIONS ---
+PERSONAS = ["Professional 👔", "Grammar Medic 🩹", "Simplifier (ELI5) 👶", "Brutally Honest 🎯", "Hype Man 🚀", "Scientific / Academic 🧪", "Storyteller / Creative 📖", "Motivational Coach 🏆", "Angry Customer 😤", "Passive Aggressive 🙃", "Legal/Formal ⚖️", "Gen Z / Slang 🧢", "Shakespearean 🎭", "Pirate 🏴‍☠️"]
+PLATFORMS = ["Standard Text 📄", "WhatsApp 🟢", "LinkedIn 🔵", "Instagram 📸", "X (Twitter) 🐦", "Email 📧", "Slack / Discord 💬", "Reddit 🤖", "YouTube Script 🎬", "SMS 📱"]
+EMOJI_LEVELS = ["None 🚫", "Sparse 🤏", "Heavy ✨"]
+LENGTHS = ["Concise", "Detailed"]
+VIBES = ["Neutral", "Inspiring", "Cynical", "Grateful", "Sarcastic"]
+LANGUAGES = ["English", "Spanish", "French", "German", "Hindi", "Japanese", "Chinese", "Arabic", "Portuguese", "Russian"]
+
+# --- INSTRUCTIONS ---
+TONE_RULES = {
+    "Professional 👔": "Rewrite to be corporate-ready and sophisticated.",
+    "Grammar Medic 🩹": "Correct grammar, spelling, and flow only.",
+    "Brutally Honest 🎯": "Remove all fluff. Just facts.",
+    "Hype Man 🚀": "Make it high-energy and exciting.",
+    "Simplifier (ELI5) 👶": "Explain like I'm 5 years old.",
+    "Scientific / Academic 🧪": "Use technical, objective language.",
+    "Storyteller / Creative 📖": "Add descriptive flair.",
+    "Motivational Coach 🏆": "Focus on growth and energy.",
+    "Angry Customer 😤": "Demanding, dissatisfied tone.",
+    "Passive Aggressive 🙃": "Politely annoying.",
+    "Legal/Formal ⚖️": "Strict legal terminology.",
+    "Gen Z / Slang 🧢": "Modern slang.",
+    "Shakespearean 🎭": "William Shakespeare style.",
+    "Pirate 🏴‍☠️": "Gritty pirate captain style."
+}
+
+PLATFORM_RULES = {
+    "Standard Text 📄": "Paragraphs.",
+    "WhatsApp 🟢": "Use *bold* for emphasis. Chatty.",
+    "LinkedIn 🔵": "Professional spacing + 3 hashtags.",
+    "Instagram 📸": "Vibrant + hashtag block.",
+    "X (Twitter) 🐦": "Concise hook + 2 hashtags.",
+    "Email 📧": "Subject, Greeting, Body, Sign-off.",
+    "Slack / Discord 💬": "Fast-paced formatting.",
+    "Reddit 🤖": "Markdown + TL;DR.",
+    "YouTube Script 🎬": "Hook, Intro, Body, CTA.",
+    "SMS 📱": "Maximum brevity."
+}
+
+EMOJI_RULES = {"None 🚫": "No emojis.", "Sparse 🤏": "Max 2 emojis.", "Heavy ✨": "Generous emojis."}
+
+SCORES_RULE = "IMPORTANT: On a new line at the very end, add exactly this: [SCORES] followed by 5 comma-separated numbers (0-100) representing (Clarity, Energy, Professionalism, Creativity, Emotion). Example: [SCORES] 85,70,90,65,80"
+
+
+# --- TEMPLATES ---
+# System prompts are compiled once per (persona, platform, emoji, length) at import. The shared
+# preamble comes first and per-request details last, so repeat calls send a byte-identical
+# prefix that providers with prompt caching can reuse instead of re-reading.
+def _compile(tone, platform, emoji_level, length):
+    return (
+        "You are Resonate AI. Rewrite the user's text as instructed. Output ONLY the transformed text."
+        f" Task: {TONE_RULES.get(tone, '')} Format: {PLATFORM_RULES.get(platform, '')}"
+        f" {EMOJI_RULES.get(emoji_level, '')} Length: {length}."
+    )
+
+
+PROMPT_TEMPLATES = {key: _compile(*key) for key in itertools.product(PERSONAS, PLATFORMS, EMOJI_LEVELS, LENGTHS)}
+
+
+# --- OUTPUT BUDGETS ---
+# max_tokens per platform as (Concise, Detailed), instead of a flat 1000 for an SMS and a script alike
+OUTPUT_BUDGETS = {
+    "Standard Text 📄": (300, 700),
+    "WhatsApp 🟢": (150, 350),
+    "LinkedIn 🔵": (300, 600),
+    "Instagram 📸": (200, 450),
+    "X (Twitter) 🐦": (90, 180),
+    "Email 📧": (300, 650),
+    "Slack / Discord 💬": (150, 400),
+    "Reddit 🤖": (350, 800),
+    "YouTube Script 🎬": (450, 1000),
+    "SMS 📱": (60, 120),
+}
+# Length is set by the format here, however long the draft; everything else scales with the draft
+FIXED_FORMATS = {"X (Twitter) 🐦", "SMS 📱"}
+# Reply tokens per draft token for a rewrite of the same text
+REWRITE_RATIOS = {"Concise": 0.8, "Detailed": 1.3}
+# The same words cost more tokens outside Latin scripts
+LANGUAGE_FACTORS = {"Hindi": 2.0, "Arabic": 1.6, "Russian": 1.5, "Japanese": 1.5, "Chinese": 1.3}
+MAX_OUTPUT_TOKENS = 1000
+SCORES_TOKENS = 24
+# System prompt, keywords and chat-template overhead around the draft
+PROMPT_OVERHEAD_TOKENS = 160
+
+
+def _needed_tokens(platform, length, target_lang, draft_tokens):
+    concise, detailed = OUTPUT_BUDGETS.get(platform, (MAX_OUTPUT_TOKENS, MAX_OUTPUT_TOKENS))
+    needed = detailed if length == "Detailed" else concise
+    if platform not in FIXED_FORMATS:
+        needed = max(needed, int(draft_tokens * REWRITE_RATIOS.get(length, 1.0)) + 32)
+    return int(needed * LANGUAGE_FACTORS.get(target_lang, 1.0))
+
+
+def output_budget(platform, length, target_lang="English", draft_tokens=0, llm_scores=False):
+    """max_tokens for a reply in this format, never more than the old flat MAX_OUTPUT_TOKENS."""
+    budget = min(_needed_tokens(platform, length, target_lang, draft_tokens), MAX_OUTPUT_TOKENS)
+    return budget + (SCORES_TOKENS if llm_scores else 0)
+
+
+def budget_warnings(text, platform, length, target_lang="English"):
+    # Plain-language notes for the UI when a draft is likely to be cut off
+    draft_tokens = count_tokens(text)
+    warnings = []
+    needed = _needed_tokens(platform, length, target_lang, draft_tokens)
+    if needed > MAX_OUTPUT_TOKENS:
+        warnings.append(f"This draft is ~{draft_tokens} tokens; a {length.lower()} rewrite may be cut off at {MAX_OUTPUT_TOKENS} tokens. Long-document mode avoids that.")
+    if draft_tokens + PROMPT_OVERHEAD_TOKENS + min(needed, MAX_OUTPUT_TOKENS) > CONTEXT_TOKENS:
+        warnings.append(f"This draft is ~{draft_tokens} tokens, more than the model's {CONTEXT_TOKENS}-token context can take with a reply. Use long-document mode.")
+    return warnings
+
+
+# --- PROMPT BUILDING ---
+def prepare_transformation(text, tone, platform, emoji_level, length, vibe, target_lang, custom_prompt, target_keywords, llm_scores=False):
+    # Cosmetic whitespace is dropped from what's sent, so "Hello world." and "Hello world.  \r\n" share a cache entry
+    text, custom_prompt, target_keywords = normalize_text(text), normalize_text(custom_prompt), normalize_text(target_keywords)
+    system = PROMPT_TEMPLATES.get((tone, platform, emoji_level, length)) or _compile(tone, platform, emoji_level, length)
+    details = [f"Write it in {target_lang}.", f"Atmosphere: {vibe}."]
+    if custom_prompt:
+        details.append(f"Additional constraint: {custom_prompt}.")
+    if target_keywords:
+        details.append(f"MANDATORY: You must naturally include these exact keywords: {target_keywords}.")
+    # Scores are computed locally by default; only spend output tokens on them when asked
+    if llm_scores:
+        details.append(SCORES_RULE)
+
+    messages = [
+        {"role": "system", "content": f"{system} {' '.join(details)}"},
+        {"role": "user", "content": f"Text: \"{text}\""}
+    ]
+
+    inputs = {
+        "text": text, "tone": tone, "platform": platform, "emoji_level": emoji_level, "length": length,
+        "vibe": vibe, "target_lang": target_lang, "custom_prompt": custom_prompt, "target_keywords": target_keywords,
+        "llm_scores": llm_scores,
+        "max_tokens": output_budget(platform, length, target_lang, count_tokens(text), llm_scores),
+    }
+    return messages, inputs
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from .analysis import analyze_many
+
+SCORE_DIMENSIONS = ["Clarity", "Energy", "Professionalism", "Creativity", "Emotion"]
+
+
+def _lexicon(words):
+    # Whole-word, case-insensitive alternation for Series.str.count
+    return r'(?i)\b(?:' + "|".join(words) + r')\b'
+
+
+ENERGY_WORDS = _lexicon([
+    "amazing", "awesome", "incredible", "huge", "massive", "exciting", "excited", "let's go", "boost", "unleash",
+    "power", "powerful", "fast", "now", "today", "explode", "epic", "thrilled", "unstoppable", "game[- ]changer",
+    "win", "crush", "fire", "ready", "go", "big", "launch", "ignite", "supercharge", "skyrocket",
+])
+FORMAL_WORDS = _lexicon([
+    "therefore", "furthermore", "moreover", "however", "consequently", "accordingly", "regarding", "pursuant",
+    "hereby", "sincerely", "respectfully", "kindly", "please", "ensure", "objective", "strategy", "stakeholders?",
+    "implement(?:ation)?", "deliverables?", "analysis", "recommend(?:ation)?", "evaluate", "facilitate", "regards",
+])
+INFORMAL_WORDS = _lexicon([
+    "lol", "omg", "gonna", "wanna", "gotta", "kinda", "sorta", "yeah", "yep", "nope", "dude", "bro", "fam",
+    "lit", "vibe", "vibes", "no cap", "bet", "lowkey", "highkey", "slay", "ya", "ain't", "y'all", "tbh", "ngl",
+])
+FIGURATIVE_WORDS = _lexicon([
+    "like a", "as if", "as though", "imagine", "picture", "dream", "journey", "spark", "canvas", "symphony",
+    "tapestry", "horizon", "whisper", "storm", "ocean", "magic", "wild", "soar", "bloom", "thou", "thee", "arr",
+])
+EMOTION_WORDS = _lexicon([
+    "love", "hate", "joy", "happy", "sad", "angry", "furious", "fear", "afraid", "grateful", "thankful", "proud",
+    "heart", "hope", "frustrated", "disappointed", "thrilled", "delighted", "upset", "excited", "passion(?:ate)?",
+    "feel", "feeling", "worried", "overjoyed", "devastated", "annoyed", "blessed",
+])
+# Real characters rather than \U escapes, so the pattern also works with pyarrow-backed strings
+EMOJI = "[\U0001F300-\U0001FAFF\u2600-\u27BF]"
+
+
+# Densities are taken over at least this many words, so one "!" in a ten-word reply isn't "10 per 100 words"
+MIN_DENSITY_WORDS = 50
+# Densities ease off towards this ceiling (nearly linear below it), so no single feature pins a score at 0 or 100
+DENSITY_CEILING = 15.0
+
+
+def _per_100_words(counts, words):
+    density = counts / np.maximum(words, MIN_DENSITY_WORDS) * 100
+    return DENSITY_CEILING * np.tanh(density / DENSITY_CEILING)
+
+
+def text_features(texts):
+    """Raw per-text features as a DataFrame; lexicon counts are vectorized over the whole batch."""
+    s = pd.Series(list(texts), dtype="object").fillna("").astype(str)
+    xray = analyze_many(s.tolist())
+    words = s.str.count(r"\b[\w']+\b").to_numpy(dtype=float)
+    sentences = np.maximum(s.str.count(r'[.!?]+(?:\s|$)').to_numpy(dtype=float), 1)
+    unique_words = s.str.lower().str.findall(r"\b[\w']+\b").map(lambda ws: len(set(ws))).to_numpy(dtype=float)
+
+    return pd.DataFrame({
+        "words": words,
+        "words_per_sentence": words / sentences,
+        "grade_level": xray["grade_level"].to_numpy(dtype=float),
+        "polarity": xray["polarity"].to_numpy(dtype=float),
+        "subjectivity": xray["subjectivity"].to_numpy(dtype=float),
+        # Root type-token ratio stays comparable across short and long texts
+        "lexical_diversity": unique_words / np.sqrt(np.maximum(words, 1)),
+        "exclaims": _per_100_words(s.str.count("!").to_numpy(dtype=float), words),
+        "questions": _per_100_words(s.str.count(r"\?").to_numpy(dtype=float), words),
+        "caps_words": _per_100_words(s.str.count(r"\b[A-Z]{2,}\b").to_numpy(dtype=float), words),
+        "emojis": _per_100_words(s.str.count(EMOJI).to_numpy(dtype=float), words),
+        "contractions": _per_100_words(s.str.count(r"(?i)\b\w+'(?:s|t|re|ve|ll|d|m)\b").to_numpy(dtype=float), words),
+        "energy": _per_100_words(s.str.count(ENERGY_WORDS).to_numpy(dtype=float), words),
+        "formal": _per_100_words(s.str.count(FORMAL_WORDS).to_numpy(dtype=float), words),
+        "informal": _per_100_words(s.str.count(INFORMAL_WORDS).to_numpy(dtype=float), words),
+        "figurative": _per_100_words(s.str.count(FIGURATIVE_WORDS).to_numpy(dtype=float), words),
+        "emotion": _per_100_words(s.str.count(EMOTION_WORDS).to_numpy(dtype=float), words),
+        "second_person": _per_100_words(s.str.count(r"(?i)\b(?:you|your|you're)\b").to_numpy(dtype=float), words),
+    })
+
+
+def score_frame(texts):
+    """Deterministic 0-100 scores for each text, one column per radar dimension."""
+    f = text_features(texts)
+    # Up to grade 9 reads easily; penalize harder text and run-on sentences
+    clarity = 95 - 6 * np.clip(f["grade_level"] - 9, 0, None) - 1.5 * np.clip(f["words_per_sentence"] - 20, 0, None)
+    energy = (35 + 9 * f["exclaims"] + 6 * f["energy"] + 4 * f["caps_words"] + 4 * f["emojis"]
+              + 2 * f["second_person"] + 25 * np.abs(f["polarity"]))
+    professionalism = (70 + 5 * f["formal"] - 8 * f["informal"] - 5 * f["emojis"] - 4 * f["exclaims"]
+                       - 1.5 * f["contractions"] - 3 * f["caps_words"] - 3 * np.clip(6 - f["grade_level"], 0, None))
+    creativity = 15 + 7 * f["lexical_diversity"] + 8 * f["figurative"] + 25 * f["subjectivity"] + 2 * f["questions"]
+    emotion = 20 + 45 * np.abs(f["polarity"]) + 25 * f["subjectivity"] + 7 * f["emotion"] + 3 * f["exclaims"]
+
+    scores = pd.DataFrame({
+        "Clarity": clarity, "Energy": energy, "Professionalism": professionalism,
+        "Creativity": creativity, "Emotion": emotion,
+    })
+    scores = scores.clip(0, 100).round().astype(int)
+    # Nothing to score: keep the "no data" sentinel the UI already understands
+    scores.loc[f["words"].to_numpy() == 0, :] = 0
+    return scores
+
+
+def score_texts(texts):
+    return [",".join(str(v) for v in row) for row in score_frame(texts).itertuples(index=False)]
+
+
+def score_text(text):
+    return score_texts([text])[0]
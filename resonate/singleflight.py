@@ -0,0 +1,181 @@
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from .tracing import tracer
+
+_DONE = object()
+
+
+class Flight:
+    """One in-flight call that any number of identical requests can wait on."""
+
+    def __init__(self):
+        self.future = Future()
+        self._lock = threading.Lock()
+        self._deltas = []
+        self._queues = []
+        self._closed = False
+
+    def publish(self, delta):
+        # Streamed text is relayed to waiters through queues, so each one renders on its own thread
+        with self._lock:
+            self._deltas.append(delta)
+            for q in self._queues:
+                q.put(delta)
+
+    def subscribe(self):
+        q = queue.SimpleQueue()
+        with self._lock:
+            for delta in self._deltas:
+                q.put(delta)
+            if self._closed:
+                q.put(_DONE)
+            else:
+                self._queues.append(q)
+        return q
+
+    def close(self, output=None, error=None):
+        with self._lock:
+            self._closed = True
+            for q in self._queues:
+                q.put(_DONE)
+            self._queues = []
+        if self.future.done():
+            return
+        if error is not None:
+            self.future.set_exception(error)
+        else:
+            self.future.set_result(output)
+
+    def wait(self, on_delta=None):
+        # Returns (output, number of deltas forwarded to on_delta)
+        forwarded = 0
+        if on_delta is not None:
+            q = self.subscribe()
+            while True:
+                delta = q.get()
+                if delta is _DONE:
+                    break
+                on_delta(delta)
+                forwarded += 1
+        return self.future.result(), forwarded
+
+
+class SqliteLeases:
+    """Cross-process claim on a key, so worker processes sharing one SQLite result store coalesce too."""
+
+    def __init__(self, path, ttl=120.0):
+        self.ttl = ttl
+        self.owner = f"{os.getpid()}-{id(self)}"
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # Autocommit: every statement is its own transaction, and INSERT OR IGNORE decides the race
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0, isolation_level=None)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+        self._lock = threading.Lock()
+
+    def claim(self, key):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+            cur = self._conn.execute("INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)", (key, self.owner, now + self.ttl))
+        return cur.rowcount == 1
+
+    def held(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT expires FROM leases WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] >= time.time()
+
+    def release(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+
+class SingleFlight:
+    """Collapses concurrent identical calls into one, across threads and event loops.
+
+    The first caller for a key makes the call; anyone arriving while it runs waits for that
+    result instead. With `lease_path`, processes sharing that SQLite file defer to each other
+    too and pick the leader's result up from the shared store via `lookup`.
+    """
+
+    def __init__(self, lease_path=None, lease_ttl=120.0, poll=0.1):
+        self.poll = poll
+        self.leases = SqliteLeases(lease_path, lease_ttl) if lease_path else None
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+    def _join(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = Flight()
+            return flight, True
+
+    def _land(self, key, flight, output=None, error=None):
+        with self._lock:
+            self._flights.pop(key, None)
+        if self.leases is not None:
+            self.leases.release(key)
+        flight.close(output, error)
+
+    def _claim_or_wait(self, key, lookup):
+        # Another worker process holds the lease: poll the shared store until its result lands
+        if self.leases is None or lookup is None or self.leases.claim(key):
+            return None
+        while self.leases.held(key):
+            time.sleep(self.poll)
+            output = lookup()
+            if output is not None:
+                tracer.incr("singleflight.remote")
+                return output
+        # Lease released or expired without a stored result (the call failed): make our own
+        return lookup()
+
+    def run(self, key, fn, on_delta=None, lookup=None):
+        """Run fn(publish) once per concurrent key; returns (output, forwarded).
+
+        forwarded is None for the caller that ran fn, otherwise the number of streamed
+        deltas relayed to its on_delta (0 means the caller still needs the full text).
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            tracer.incr("singleflight.joined")
+            return flight.wait(on_delta)
+        try:
+            output = self._claim_or_wait(key, lookup)
+            forwarded = 0
+            if output is None:
+                output, forwarded = fn(flight.publish), None
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, output)
+        return output, forwarded
+
+    async def arun(self, key, fn, lookup=None):
+        flight, leader = self._join(key)
+        if not leader:
+            tracer.incr("singleflight.joined")
+            # Shielded so a cancelled waiter doesn't cancel the shared future for everyone else
+            return await asyncio.shield(asyncio.wrap_future(flight.future))
+        try:
+            output = await asyncio.to_thread(self._claim_or_wait, key, lookup) if self.leases is not None else None
+            if output is None:
+                output = await fn()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, output)
+        return output
@@ -0,0 +1,88 @@
+import json
+import re
+
+SCORES_MARKER = "[SCORES]"
+
+
+def iter_sse_events(response):
+    # Chat-completions stream: "data: {json}" lines, terminated by "data: [DONE]"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        try:
+            yield json.loads(data)
+        except ValueError:
+            continue
+
+
+def iter_sse_deltas(response, usage=None, finish=None):
+    # With stream_options.include_usage the final event carries token counts; copied into `usage` if given.
+    # The choice's finish_reason ("stop" / "length") lands in finish["reason"] the same way.
+    for event in iter_sse_events(response):
+        if usage is not None and event.get("usage"):
+            usage.update(event["usage"])
+        choices = event.get("choices") or []
+        if choices:
+            if finish is not None and choices[0].get("finish_reason"):
+                finish["reason"] = choices[0]["finish_reason"]
+            content = (choices[0].get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+def extract_scores(full_res):
+    # Returns (text, "a,b,c,d,e") or (full_res, None) when no scores can be recovered
+    if SCORES_MARKER in full_res:
+        parts = full_res.split(SCORES_MARKER)
+        text_part = parts[0].strip()
+        scores = re.findall(r'\d+', parts[1].strip())
+        if len(scores) >= 5:
+            return text_part, ",".join(scores[:5])
+
+    # Fallback regex search if delimiter is missing but scores are present
+    score_match = re.search(r'(\d{1,3}(?:,\s*)?){5}', full_res)
+    if score_match:
+        matched_str = score_match.group(0)
+        scores = re.findall(r'\d+', matched_str)
+        if len(scores) >= 5:
+            text_part = full_res.replace(matched_str, "").replace(SCORES_MARKER, "").strip()
+            return text_part, ",".join(scores[:5])
+
+    return full_res, None
+
+
+class ScoresStreamParser:
+    """Feeds streamed deltas through, holding back the trailing [SCORES] line."""
+
+    def __init__(self):
+        self.raw = ""
+        self._emitted = 0
+        self._marker_at = -1
+
+    def _safe_end(self):
+        if self._marker_at >= 0:
+            return self._marker_at
+        # Hold back any suffix that could still turn into the marker
+        for keep in range(min(len(SCORES_MARKER) - 1, len(self.raw)), 0, -1):
+            if SCORES_MARKER.startswith(self.raw[-keep:]):
+                return len(self.raw) - keep
+        return len(self.raw)
+
+    def feed(self, delta):
+        self.raw += delta
+        if self._marker_at < 0:
+            self._marker_at = self.raw.find(SCORES_MARKER)
+        end = self._safe_end()
+        chunk = self.raw[self._emitted:end] if end > self._emitted else ""
+        self._emitted = max(self._emitted, end)
+        return chunk
+
+    def finish(self):
+        if self._marker_at >= 0:
+            scores = re.findall(r'\d+', self.raw[self._marker_at + len(SCORES_MARKER):])
+            if len(scores) >= 5:
+                return self.raw[:self._marker_at].strip(), ",".join(scores[:5])
+        return self.raw.strip(), None
@@ -0,0 +1,54 @@
+import functools
+import re
+
+# Llama 3 uses a tiktoken BPE whose first 100k merges match cl100k_base, so counts line up closely
+ENCODING = "cl100k_base"
+# Meta-Llama-3-8B-Instruct context window
+CONTEXT_TOKENS = 8192
+
+# Fallback when tiktoken isn't installed: ASCII words cost ~1 token plus one per extra 6 letters,
+# accented Latin a little more, other scripts about a token per two characters, CJK one per character
+_PIECE = re.compile(r"\w+|[^\w\s]")
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]")
+_encoder = None
+
+
+def _encoding():
+    global _encoder
+    if _encoder is None:
+        # Imported on first count rather than at startup; tiktoken is optional and slow to load
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(ENCODING)
+        except Exception:
+            # Not installed, or BPE file not cached and no network: stay on the heuristic for this process
+            _encoder = False
+    return _encoder or None
+
+
+def _heuristic(text):
+    count = len(_CJK.findall(text))
+    for piece in _PIECE.findall(_CJK.sub(" ", text)):
+        if piece.isascii():
+            count += 1 + (len(piece) - 1) // 6
+        elif max(piece) <= "\u024f":
+            count += 1 + (len(piece) - 1) // 4
+        else:
+            count += 1 + len(piece) // 2
+    return count
+
+
+@functools.lru_cache(maxsize=64)
+def count_tokens(text):
+    """Local token count for prompt budgeting (exact-ish with tiktoken, heuristic otherwise)."""
+    if not text:
+        return 0
+    encoder = _encoding()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return _heuristic(text)
+
+
+def count_message_tokens(messages):
+    # Chat template adds a few tokens per message (role header + end-of-turn)
+    return sum(count_tokens(m["content"]) + 4 for m in messages)
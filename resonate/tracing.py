@@ -0,0 +1,202 @@
+import atexit
+import contextvars
+import itertools
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar("resonate_span", default=None)
+_ids = itertools.count(1)
+
+
+def percentile(values, q):
+    # Nearest-rank; the windows are a few hundred samples at most
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "trace_id", "run", "attrs", "started", "duration_ms", "status", "tokens")
+
+    def __init__(self, name, parent=None, attrs=None, run=False):
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        # Token usage rolls up to the nearest enclosing run (one user-visible transformation)
+        self.run = self if run else (parent.run if parent else None)
+        self.attrs = dict(attrs or {})
+        self.started = time.time()
+        self.duration_ms = None
+        self.status = "ok"
+        self.tokens = {"prompt": 0, "completion": 0}
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def fail(self, error):
+        # For errors the caller handles itself (e.g. query_ai returning {"error": ...})
+        self.status = "error"
+        self.attrs["error"] = str(error)
+
+    def to_dict(self):
+        return {
+            "name": self.name, "span_id": self.span_id, "parent_id": self.parent_id, "trace_id": self.trace_id,
+            "start": round(self.started, 6), "duration_ms": round(self.duration_ms or 0.0, 3),
+            "status": self.status, "attrs": self.attrs,
+        }
+
+
+class Tracer:
+    """Span recorder with per-name latency windows, counters and token usage per run.
+
+    Spans nest through a context variable, so work fanned out with asyncio or to_thread is
+    attributed to the run that started it. Finished spans can be appended to a JSONL file
+    and the aggregates written as Prometheus text.
+    """
+
+    def __init__(self, window=500, export_path=None, metrics_path=None, flush_every=32):
+        self.window = window
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._pending = []
+        self.export_path = self.metrics_path = None
+        self.reset()
+        self.configure(export_path, metrics_path)
+        atexit.register(self.flush)
+
+    def configure(self, export_path=None, metrics_path=None):
+        self.flush()
+        for path in (export_path, metrics_path):
+            folder = os.path.dirname(path) if path else ""
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+        self.export_path = export_path or None
+        self.metrics_path = metrics_path or None
+
+    def reset(self):
+        with self._lock:
+            self._durations = defaultdict(lambda: deque(maxlen=self.window))
+            self._totals = defaultdict(lambda: [0, 0.0, 0])  # count, total ms, errors
+            self.counters = defaultdict(float)
+            self.runs = deque(maxlen=self.window)
+
+    # --- RECORDING ---
+    @contextmanager
+    def span(self, name, run=False, **attrs):
+        current = Span(name, _current.get(), attrs, run=run)
+        token = _current.set(current)
+        started = time.perf_counter()
+        try:
+            yield current
+        except Exception as e:
+            current.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current.reset(token)
+            current.duration_ms = (time.perf_counter() - started) * 1000
+            self._finish(current)
+
+    def record(self, name, duration_ms, **attrs):
+        # For timings measured elsewhere, such as a whole Streamlit rerun
+        done = Span(name, None, attrs)
+        done.duration_ms = duration_ms
+        self._finish(done)
+
+    def current(self):
+        return _current.get()
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def add_tokens(self, prompt, completion, estimated=False):
+        current = _current.get()
+        with self._lock:
+            self.counters["tokens.prompt"] += prompt
+            self.counters["tokens.completion"] += completion
+            if current is not None:
+                current.attrs.update(prompt_tokens=prompt, completion_tokens=completion, tokens_estimated=estimated)
+                if current.run is not None:
+                    current.run.tokens["prompt"] += prompt
+                    current.run.tokens["completion"] += completion
+
+    def _finish(self, span):
+        with self._lock:
+            self._durations[span.name].append(span.duration_ms)
+            totals = self._totals[span.name]
+            totals[0] += 1
+            totals[1] += span.duration_ms
+            totals[2] += span.status != "ok"
+            if span.run is span:
+                self.runs.append({
+                    "name": span.name, "started": span.started, "ms": span.duration_ms, "status": span.status,
+                    "prompt_tokens": span.tokens["prompt"], "completion_tokens": span.tokens["completion"],
+                })
+            if self.export_path:
+                self._pending.append(span.to_dict())
+            flush = len(self._pending) >= self.flush_every or (span.run is span and self.metrics_path)
+        if flush:
+            self.flush()
+
+    # --- REPORTING ---
+    def snapshot(self):
+        with self._lock:
+            spans = {
+                name: {
+                    "count": totals[0], "errors": totals[2], "total_ms": totals[1],
+                    "p50_ms": percentile(self._durations[name], 50), "p95_ms": percentile(self._durations[name], 95),
+                }
+                for name, totals in self._totals.items()
+            }
+            return {"spans": spans, "counters": dict(self.counters), "runs": list(self.runs)}
+
+    def prometheus(self):
+        snap = self.snapshot()
+        lines = [
+            "# HELP resonate_span_duration_ms Span latency over the recent window.",
+            "# TYPE resonate_span_duration_ms summary",
+        ]
+        for name, s in sorted(snap["spans"].items()):
+            lines += [
+                f'resonate_span_duration_ms{{span="{name}",quantile="0.5"}} {s["p50_ms"]:.3f}',
+                f'resonate_span_duration_ms{{span="{name}",quantile="0.95"}} {s["p95_ms"]:.3f}',
+                f'resonate_span_duration_ms_sum{{span="{name}"}} {s["total_ms"]:.3f}',
+                f'resonate_span_duration_ms_count{{span="{name}"}} {s["count"]}',
+            ]
+        lines += ["# HELP resonate_span_errors_total Spans that ended in an error.", "# TYPE resonate_span_errors_total counter"]
+        lines += [f'resonate_span_errors_total{{span="{name}"}} {s["errors"]}' for name, s in sorted(snap["spans"].items())]
+        for name, value in sorted(snap["counters"].items()):
+            metric = f"resonate_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        with self._io_lock:
+            if pending and self.export_path:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in pending)
+            if self.metrics_path:
+                # Write-then-rename so a scraper never reads a half-written file
+                tmp = self.metrics_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(self.prometheus())
+                os.replace(tmp, self.metrics_path)
+
+
+# Process-wide tracer; paths default to the environment so the CLI and app can opt in without code changes
+tracer = Tracer(export_path=os.environ.get("RESONATE_TRACE_PATH"), metrics_path=os.environ.get("RESONATE_METRICS_PATH"))
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import io
+import threading
+import wave
+from collections import OrderedDict
+
+from .batch import run_batch
+from .longdoc import split_into_chunks
+
+SPEECH_CHUNK_CHARS = 300
+# English prose runs about four characters a token, which is how split_into_chunks measures
+SPEECH_CHARS_PER_TOKEN = 4
+NEURAL = "mms-tts"
+GTTS = "gtts"
+GTTS_VOICE = ("en", "co.uk")
+
+
+class AudioCache:
+    """Byte-bounded LRU of synthesized chunks keyed by (text hash, voice, engine)."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text, voice, engine):
+        return (hashlib.sha256(text.encode("utf-8")).hexdigest(), voice, engine)
+
+    def get(self, key):
+        with self._lock:
+            audio = self._items.get(key)
+            if audio is not None:
+                self._items.move_to_end(key)
+            return audio
+
+    def set(self, key, audio):
+        if len(audio) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._bytes -= len(self._items.pop(key))
+            self._items[key] = audio
+            self._bytes += len(audio)
+            while self._bytes > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                self._bytes -= len(old)
+
+
+_audio_cache = AudioCache()
+
+
+def split_for_speech(text, max_chars=SPEECH_CHUNK_CHARS):
+    # Sentence-bounded pieces small enough that the first one comes back quickly
+    return split_into_chunks(text, max_tokens=max(1, max_chars // SPEECH_CHARS_PER_TOKEN))
+
+
+# --- STITCHING (container-level, no re-encoding) ---
+def stitch_wav(segments):
+    out = io.BytesIO()
+    params = None
+    with wave.open(out, "wb") as writer:
+        for segment in segments:
+            with wave.open(io.BytesIO(segment), "rb") as reader:
+                if params is None:
+                    params = reader.getparams()
+                    writer.setparams(params)
+                writer.writeframes(reader.readframes(reader.getnframes()))
+    return out.getvalue()
+
+
+def _strip_id3(segment):
+    # MP3 frames concatenate cleanly, but a leading ID3v2 tag mid-stream would confuse players
+    if segment[:3] == b"ID3" and len(segment) > 10:
+        size = (segment[6] << 21) | (segment[7] << 14) | (segment[8] << 7) | segment[9]
+        return segment[10 + size:]
+    return segment
+
+
+def stitch_mp3(segments):
+    return b"".join(seg if i == 0 else _strip_id3(seg) for i, seg in enumerate(segments))
+
+
+def is_wav(audio):
+    return audio[:4] == b"RIFF" and audio[8:12] == b"WAVE"
+
+
+def audio_mime(audio):
+    # Sniffed from the bytes: the HF mms-tts endpoint answers with FLAC, the mock and some deployments with WAV
+    if is_wav(audio):
+        return "audio/wav"
+    if audio[:4] == b"fLaC":
+        return "audio/flac"
+    if audio[:4] == b"OggS":
+        return "audio/ogg"
+    if audio[:3] == b"ID3" or audio[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    return "application/octet-stream"
+
+
+def stitch(segments, engine):
+    if engine == GTTS:
+        return stitch_mp3(segments), "audio/mpeg"
+    if len(segments) == 1:
+        return segments[0], audio_mime(segments[0])
+    if all(is_wav(s) for s in segments):
+        return stitch_wav(segments), "audio/wav"
+    # Other containers (FLAC) can't be joined without re-encoding
+    return None, None
+
+
+def _gtts_bytes(text):
+    from gtts import gTTS
+
+    lang, tld = GTTS_VOICE
+    buf = io.BytesIO()
+    gTTS(text=text, lang=lang, tld=tld).write_to_fp(buf)
+    return buf.getvalue()
+
+
+async def _synthesize_chunk(engine, text, tts_engine, cache):
+    voice = "mms-tts-eng" if tts_engine == NEURAL else "-".join(GTTS_VOICE)
+    key = cache.key(text, voice, tts_engine)
+    audio = cache.get(key)
+    if audio is None:
+        if tts_engine == NEURAL:
+            audio = await engine.aquery_audio(text)
+        else:
+            audio = await asyncio.to_thread(_gtts_bytes, text)
+        if audio:
+            cache.set(key, audio)
+    return audio
+
+
+async def _run_engine(engine, chunks, indices, tts_engine, cache, max_workers, on_audio):
+    # Synthesizes chunks[i] for i in indices; on_audio(index, audio) fires as each lands
+    segments = {}
+
+    def handle(_, index, audio):
+        if isinstance(audio, Exception):
+            audio = None
+        segments[index] = audio
+        if audio:
+            on_audio(index, audio)
+
+    await run_batch(list(indices), lambda i: _synthesize_chunk(engine, chunks[i], tts_engine, cache),
+                    max_workers=max_workers, rate=0, on_result=handle)
+    return [segments.get(i) for i in indices]
+
+
+async def asynthesize(engine, text, max_workers=4, on_chunk=None, cache=None):
+    """Synthesize text chunk by chunk, concurrently, as a list of parts that play in order.
+
+    WAV chunks are stitched into one part. Other containers (FLAC from the HF endpoint) can't
+    be joined without re-encoding, so their chunks come back as sequential parts. gTTS covers
+    the whole text if the neural voice fails, so one narration never switches voice half way.
+    on_chunk(index, total, audio, mime) fires as each chunk lands, so playback can start early;
+    no index is reported twice, whichever engine ends up narrating.
+    Returns (parts, mime) or (None, None).
+    """
+    cache = cache or _audio_cache
+    chunks = split_for_speech(text)
+    if not chunks:
+        return None, None
+    played = set()
+
+    def notify(index, audio, mime):
+        if on_chunk is not None and index not in played:
+            played.add(index)
+            on_chunk(index, len(chunks), audio, mime)
+
+    segments = await _run_engine(engine, chunks, range(len(chunks)), NEURAL, cache, max_workers,
+                                 lambda i, audio: notify(i, audio, audio_mime(audio)))
+    if all(segments):
+        try:
+            audio, mime = stitch(segments, NEURAL)
+        except (wave.Error, EOFError):
+            audio = mime = None  # Malformed container; gTTS below
+        else:
+            if audio:
+                return [audio], mime
+            return segments, audio_mime(segments[0])
+
+    segments = await _run_engine(engine, chunks, range(len(chunks)), GTTS, cache, max_workers,
+                                 lambda i, audio: notify(i, audio, "audio/mpeg"))
+    if all(segments):
+        audio, mime = stitch(segments, GTTS)
+        return [audio], mime
+    return None, None
+
+
+def synthesize(engine, text, max_workers=4, on_chunk=None, cache=None):
+    return asyncio.run(asynthesize(engine, text, max_workers=max_workers, on_chunk=on_chunk, cache=cache))
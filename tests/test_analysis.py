@@ -0,0 +1,53 @@
+import uuid
+
+from resonate import analysis
+from resonate.analysis import ANALYSIS_FIELDS, analyze, analyze_async, analyze_many, heuristic_grade, summarize
+
+
+def unique_text():
+    # The X-Ray cache is process-wide, so every test brings its own text
+    return f"The launch went well and the team is happy. Ticket {uuid.uuid4().hex}."
+
+
+def counting(monkeypatch):
+    calls = []
+    compute = analysis._compute
+    monkeypatch.setattr(analysis, "_compute", lambda text: calls.append(text) or compute(text))
+    return calls
+
+
+def test_analyze_is_computed_once_per_text(monkeypatch):
+    calls = counting(monkeypatch)
+    text = unique_text()
+    first = analyze(text)
+    assert set(first) == set(ANALYSIS_FIELDS)
+    assert analyze(text) == first and len(calls) == 1
+    analyze(text + " ")
+    assert len(calls) == 2
+
+
+def test_analyze_async_hit_is_already_done(monkeypatch):
+    calls = counting(monkeypatch)
+    text = unique_text()
+    miss = analyze_async(text)
+    assert miss.result(timeout=5) == analyze(text)
+    hit = analyze_async(text)
+    assert hit.done() and hit.result() == miss.result()
+    assert len(calls) == 1
+
+
+def test_analyze_many_dedupes(monkeypatch):
+    calls = counting(monkeypatch)
+    a, b = unique_text(), unique_text()
+    df = analyze_many([a, b, a, a])
+    assert list(df.columns) == ANALYSIS_FIELDS and len(df) == 4
+    assert sorted(calls) == sorted([a, b])
+    assert df.iloc[0].equals(df.iloc[2])
+    assert summarize(df)["texts"] == 4 and summarize(df.iloc[0:0]) == {}
+
+
+def test_heuristic_grade():
+    assert heuristic_grade("") == 0.0
+    assert heuristic_grade("The cat sat. The dog ran.") < heuristic_grade(
+        "Institutional considerations necessitate comprehensive organizational restructuring."
+    )
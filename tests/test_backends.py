@@ -0,0 +1,69 @@
+from resonate import Engine
+from resonate.backends import FakeBackend, LatencyRouter, build_backend
+from resonate.tracing import tracer
+
+MESSAGES = [{"role": "system", "content": "Rewrite it."}, {"role": "user", "content": 'Text: "Hello world."'}]
+
+
+class TracedBackend(FakeBackend):
+    # Remembers the span each call ran under
+    def __init__(self, name, **kwargs):
+        super().__init__(name, **kwargs)
+        self.spans = []
+
+    def complete(self, messages, max_tokens):
+        self.spans.append(tracer.current())
+        return super().complete(messages, max_tokens)
+
+
+def test_fake_backend_is_deterministic():
+    first = FakeBackend().complete(MESSAGES, 100)
+    again = FakeBackend().complete(MESSAGES, 100)
+    assert first == again
+    assert first["choices"][0]["message"]["content"].endswith("Hello world.")
+
+
+def test_fake_backend_honours_max_tokens():
+    output = FakeBackend().complete([MESSAGES[0], {"role": "user", "content": "word " * 500}], 10)
+    assert output["choices"][0]["finish_reason"] == "length"
+
+
+def test_router_fails_over_to_the_next_backend():
+    router = LatencyRouter([FakeBackend("down", error_rate=1.0), FakeBackend("up")], hedge=False)
+    assert router.complete(MESSAGES, 100)["backend"] == "up"
+    stats = {s["backend"]: s for s in router.snapshot()}
+    assert stats["down"]["errors"] == 1 and stats["up"]["wins"] == 1
+
+
+def test_router_hedges_a_slow_backend():
+    router = LatencyRouter([FakeBackend("slow", latency=0.5), FakeBackend("quick")], min_hedge_ms=50)
+    router._stats["slow"]["complete_ms"] = 10.0
+    assert router.complete(MESSAGES, 100)["backend"] == "quick"
+
+
+def test_routed_calls_stay_under_the_callers_span():
+    backend = TracedBackend("traced")
+    router = LatencyRouter([backend, FakeBackend("spare")], hedge=False)
+    with tracer.span("run", run=True) as run:
+        router.complete(MESSAGES, 100)
+    assert backend.spans[0] is run
+
+
+def test_build_backend_gives_a_router_for_several_specs():
+    assert isinstance(build_backend("fake", client=None), FakeBackend)
+    with_fallback = build_backend("fake, llama:/models/tiny.gguf", client=None)
+    assert isinstance(with_fallback, LatencyRouter) and with_fallback.primary == "fake"
+
+
+def test_only_the_primary_backends_replies_are_cached():
+    primary = TracedBackend("primary", error_rate=1.0)
+    router = LatencyRouter([primary, FakeBackend("fallback")], hedge=False)
+    engine = Engine("x", backend=router, cache_path=None)
+    inputs = {"text": "Hello world."}
+    assert engine.cached_query_ai(MESSAGES, inputs)["backend"] == "fallback"
+    # The fallback's reply wasn't kept, so the recovered primary is asked again and its reply is
+    primary.error_rate = 0.0
+    router._stats["primary"].update(error_rate=0.0, complete_ms=None)
+    assert engine.cached_query_ai(MESSAGES, inputs)["backend"] == "primary"
+    assert engine.cached_query_ai(MESSAGES, inputs)["backend"] == "primary"
+    assert len(primary.spans) == 2
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from resonate import Engine
+from resonate.backends import FakeBackend
+from resonate.batch import Cancelled, HostLimiters, build_matrix, run_batch
+
+
+def test_build_matrix_is_the_cartesian_product():
+    variants = build_matrix(["a", "b"], ["x"], ["none"], ["short", "long"], ["calm"], ["English"])
+    assert len(variants) == 4
+    assert variants[0] == {"tone": "a", "platform": "x", "emoji_level": "none", "length": "short", "vibe": "calm", "target_lang": "English"}
+
+
+def test_results_come_back_in_job_order():
+    async def worker(n):
+        await asyncio.sleep(0.01 * (5 - n))
+        return n * n
+
+    landed = []
+    results = asyncio.run(run_batch(list(range(5)), worker, max_workers=5, rate=0, on_result=lambda i, job, r: landed.append(i)))
+    assert results == [0, 1, 4, 9, 16]
+    assert landed == [4, 3, 2, 1, 0]
+
+
+def test_host_bucket_is_shared_across_batches_and_threads():
+    limiters, started = HostLimiters(), []
+
+    async def worker(n):
+        started.append(time.monotonic())
+
+    def batch():
+        asyncio.run(run_batch(list(range(3)), worker, max_workers=3, rate=20, burst=1, host=lambda n: "api", limiters=limiters))
+
+    # Two batches at once, each on its own thread and event loop, still get one bucket between them
+    threads = [threading.Thread(target=batch) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batch()
+    started.sort()
+    assert len(started) == 9
+    assert started[-1] - started[0] >= 8 / 20 - 0.02
+
+
+def test_engine_batches_share_its_limiters():
+    engine = Engine("", backend=FakeBackend("fake"))
+    variants = build_matrix(["Professional 👔"], ["General"], ["Minimal"], ["Short"], ["Neutral"], ["English"])
+    engine.execute_batch("Hello world.", variants, "", "", max_workers=1, rate=50)
+    limiter = engine.limiters.get(engine.host(), 50, 2)
+    engine.execute_batch("Hello again.", variants, "", "", max_workers=1, rate=50)
+    assert engine.limiters.get(engine.host(), 50, 2) is limiter
+
+
+def test_cancel_skips_jobs_that_have_not_started():
+    calls = []
+    cancelled = []
+
+    async def worker(n):
+        calls.append(n)
+        if len(calls) == 2:
+            cancelled.append(True)
+        return n
+
+    landed = []
+    results = asyncio.run(run_batch(list(range(6)), worker, max_workers=1, rate=0,
+                                    on_result=lambda i, job, r: landed.append(i), should_cancel=lambda: bool(cancelled)))
+    assert len(calls) == 2
+    assert [r for r in results if r is not None] == sorted(calls)
+    assert sorted(landed) == sorted(calls)
+
+
+class CountingBackend(FakeBackend):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def acomplete(self, messages, max_tokens):
+        self.calls += 1
+        return await super().acomplete(messages, max_tokens)
+
+
+def test_a_cancelled_batch_makes_no_further_upstream_calls():
+    backend = CountingBackend()
+    engine = Engine("x", backend=backend, cache_path=None)
+    variants = build_matrix(["Professional 👔", "Gen Z / Slang 🧢"], ["Standard Text 📄"], ["None 🚫"], ["Concise"], ["Neutral"], ["English"])
+    landed = []
+    # Cancelled as soon as the first request went out, like a click on ✖ mid-batch
+    engine.execute_batch("Hello world.", variants, "", "", max_workers=1, rate=0, on_result=lambda *a: landed.append(a),
+                         should_cancel=lambda: backend.calls > 0)
+    assert backend.calls == 1 and len(landed) == 1
+
+
+def test_a_cancelled_long_document_is_not_stitched():
+    backend = CountingBackend()
+    engine = Engine("x", backend=backend, cache_path=None)
+    text = "\n\n".join(f"Paragraph {i} has a few words in it." for i in range(6))
+    with pytest.raises(Cancelled):
+        engine.execute_long_document(text, "Professional 👔", "Standard Text 📄", "None 🚫", "Concise", "Neutral", "English", "", "",
+                                     max_chunk_tokens=10, max_workers=1, rate=0, should_cancel=lambda: backend.calls > 0)
+    assert backend.calls == 1
@@ -0,0 +1,102 @@
+import sqlite3
+import time
+
+from resonate import Engine
+from resonate.backends import FakeBackend
+from resonate.cache import DiskTier, ResponseCache
+from resonate.prompts import prepare_transformation
+
+ARGS = ("Professional 👔", "Standard Text 📄", "None 🚫", "Concise", "Neutral", "English", "", "")
+
+
+class CountingBackend(FakeBackend):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def complete(self, messages, max_tokens):
+        self.calls += 1
+        return super().complete(messages, max_tokens)
+
+
+def test_cosmetic_whitespace_hits_the_cache():
+    backend = CountingBackend()
+    engine = Engine("x", backend=backend, cache_path=None)
+    first = engine.execute_transformation("Hello world.", *ARGS)
+    again = engine.execute_transformation("Hello world.  \r\n", *ARGS)
+    assert backend.calls == 1
+    assert first == again
+
+
+def test_the_prompt_is_built_from_the_normalized_text():
+    messages, inputs = prepare_transformation("  Line one.  \r\nLine two.\t\r\n\r\n", *ARGS)
+    assert inputs["text"] == "  Line one.\nLine two."
+    assert messages[-1]["content"] == 'Text: "  Line one.\nLine two."'
+
+
+def test_real_edits_still_miss():
+    backend = CountingBackend()
+    engine = Engine("x", backend=backend, cache_path=None)
+    engine.execute_transformation("Hello world.", *ARGS)
+    engine.execute_transformation("Hello, world.", *ARGS)
+    assert backend.calls == 2
+
+
+def test_expired_rows_are_purged_when_the_file_is_opened(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    disk = DiskTier(path, ttl=60)
+    disk.set("old", {"n": 1})
+    disk.set("new", {"n": 2})
+    disk._conn.execute("UPDATE responses SET created = created - 3600 WHERE key = 'old'")
+    disk._conn.commit()
+    assert len(DiskTier(path, ttl=60)) == 1
+
+
+def test_expired_rows_are_purged_every_few_writes(tmp_path):
+    disk = DiskTier(str(tmp_path / "responses.sqlite"), ttl=60, compact_every=3)
+    disk.set("old", {"n": 0})
+    disk._conn.execute("UPDATE responses SET created = created - 3600")
+    disk._conn.commit()
+    disk.set("a", {"n": 1})
+    assert len(disk) == 2
+    disk.set("b", {"n": 2})
+    assert len(disk) == 2 and disk.get("a") == {"n": 1}
+
+
+def test_disk_tier_keeps_the_most_recently_used_rows(tmp_path):
+    disk = DiskTier(str(tmp_path / "responses.sqlite"), max_rows=3, compact_every=1)
+    for n in range(3):
+        disk.set(f"k{n}", n)
+        time.sleep(0.01)
+    assert disk.get("k0") == 0  # Used again, so k1 is now the oldest
+    time.sleep(0.01)
+    disk.set("k3", 3)
+    assert len(disk) == 3
+    assert disk.get("k1") is None and disk.get("k0") == 0
+
+
+def test_old_cache_files_are_upgraded(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)")
+    conn.execute("INSERT INTO responses VALUES ('k', '\"v\"', ?)", (time.time(),))
+    conn.commit()
+    conn.close()
+    disk = DiskTier(path)
+    assert disk.get("k") == "v"
+    disk.set("k2", "v2", owner="me")
+    assert len(disk) == 2
+
+
+def test_clearing_for_one_session_leaves_the_others(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path / "responses.sqlite"))
+    cache.set("mine", 1, owner="me")
+    cache.set("theirs", 2, owner="you")
+    cache.clear(owner="me")
+    assert cache.get("mine") is None and cache.get("theirs") == 2
+    # Entries reloaded from disk remember who stored them
+    fresh = ResponseCache(disk_path=str(tmp_path / "responses.sqlite"))
+    fresh.set("again", 3, owner="me")
+    assert fresh.get("theirs") == 2
+    fresh.clear(owner="you")
+    assert fresh.get("theirs") is None and fresh.get("again") == 3
@@ -0,0 +1,71 @@
+import json
+
+from resonate import Engine
+from resonate.backends import FakeBackend
+from resonate.cli import build_parser, load_checkpoint, run
+
+
+class PickyBackend(FakeBackend):
+    # Fails any draft that says FAIL, until healed
+    def __init__(self):
+        super().__init__()
+        self.healed = False
+        self.drafts = []
+
+    def _respond(self, messages, max_tokens):
+        draft = messages[-1]["content"]
+        self.drafts.append(draft)
+        if "FAIL" in draft and not self.healed:
+            return {"error": "API Error 503"}
+        return super()._respond(messages, max_tokens)
+
+
+def write_input(tmp_path, texts):
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps({"id": f"r{i}", "text": t}) + "\n" for i, t in enumerate(texts)), encoding="utf-8")
+    return source
+
+
+def rows(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def run_cli(engine, *argv):
+    return run(build_parser().parse_args([*argv, "-q", "--rate", "0"]), engine=engine)
+
+
+def test_resume_skips_finished_ids_and_retries_failures(tmp_path):
+    source = write_input(tmp_path, ["First draft.", "Please FAIL this one.", "Third draft."])
+    output = tmp_path / "out.jsonl"
+    backend = PickyBackend()
+    engine = Engine("", backend=backend)
+
+    assert run_cli(engine, str(source), "-o", str(output)) == 1
+    first = {row["id"]: row for row in rows(output)}
+    assert "error" in first["r1"] and "error" not in first["r0"]
+    # Scored locally: five comma-separated numbers without asking the model for them
+    assert len(first["r0"]["metrics"].split(",")) == 5 and "[SCORES]" not in backend.drafts[0]
+    assert load_checkpoint(str(output)) == {"r0", "r2"}
+
+    backend.healed, backend.drafts = True, []
+    assert run_cli(engine, str(source), "-o", str(output)) == 0
+    assert len(backend.drafts) == 1 and "FAIL" in backend.drafts[0]
+    assert load_checkpoint(str(output)) == {"r0", "r1", "r2"}
+    assert len(rows(output)) == 4
+
+
+def test_no_resume_starts_over(tmp_path):
+    source = write_input(tmp_path, ["Only draft."])
+    output = tmp_path / "out.jsonl"
+    output.write_text(json.dumps({"id": "r0", "transformed": "stale"}) + "\n", encoding="utf-8")
+    backend = PickyBackend()
+    assert run_cli(Engine("", backend=backend), str(source), "-o", str(output), "--no-resume") == 0
+    assert len(backend.drafts) == 1
+    assert [row["id"] for row in rows(output)] == ["r0"] and rows(output)[0]["transformed"] != "stale"
+
+
+def test_checkpoint_ignores_a_half_written_line(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text('{"id": "a", "transformed": "x"}\n{"id": 7}\n{"id": "b", "error": "503"}\n{"id": "c", "transf', encoding="utf-8")
+    assert load_checkpoint(str(output)) == {"a", "7"}
+    assert load_checkpoint(str(tmp_path / "missing.jsonl")) == set()
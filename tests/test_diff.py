@@ -0,0 +1,86 @@
+import random
+
+from resonate.diff import _sections, diff_opcodes, diff_texts, section_segments, split_sentences
+
+
+def assert_sections_in_range(opcodes, sections):
+    # Every piece of every section must sit inside the opcode it came from, in order
+    pieces = [piece for section in sections for piece in section]
+    pos = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        i, j = i1, j1
+        while i < i2 or j < j2:
+            ptag, pi1, pi2, pj1, pj2 = pieces[pos]
+            assert ptag == tag
+            assert (pi1, pj1) == (i, j)
+            assert i1 <= pi1 <= pi2 <= i2 and j1 <= pj1 <= pj2 <= j2
+            i, j, pos = pi2, pj2, pos + 1
+    assert pos == len(pieces)
+
+
+def test_uneven_replace_stays_inside_its_opcode():
+    new = " ".join(f"New sentence number {n}." for n in range(100))
+    original = "Intro stays. One old sentence here. Tail stays."
+    result = f"Intro stays. {new} Tail stays."
+    diff = diff_texts(original, result)
+    opcodes = diff_opcodes(diff["left"], diff["right"])
+    assert_sections_in_range(opcodes, diff["sections"])
+
+    # "Tail stays." is kept exactly once and never shown as deleted
+    deleted, kept = [], []
+    for index in range(len(diff["sections"])):
+        left, _ = section_segments(diff, index, words=False)
+        deleted += [text for text, tag in left if tag == "delete"]
+        kept += [text for text, tag in left if tag == "equal"]
+    assert not any("Tail stays." in text for text in deleted)
+    assert sum("Tail stays." in text for text in kept) == 1
+
+
+def test_sections_cover_every_opcode():
+    a = [f"a{n}" for n in range(7)] + ["same"] * 3
+    b = [f"b{n}" for n in range(95)] + ["same"] * 3
+    for size in (1, 4, 30):
+        opcodes = diff_opcodes(a, b)
+        assert_sections_in_range(opcodes, _sections(opcodes, size))
+
+
+def test_sentences_round_trip():
+    text = "Hi there! Is this ok? Yes.\nNew line... \"Quoted.\" (Aside.)  Trailing"
+    assert "".join(split_sentences(text)) == text
+    assert split_sentences("") == []
+
+
+def test_opcodes_rebuild_the_new_side():
+    rng = random.Random(3)
+    for _ in range(50):
+        a = [rng.choice("abcdef") for _ in range(rng.randint(0, 40))]
+        b = [rng.choice("abcdef") for _ in range(rng.randint(0, 40))]
+        rebuilt, i, j = [], 0, 0
+        for tag, i1, i2, j1, j2 in diff_opcodes(a, b):
+            assert (i1, j1) == (i, j)
+            if tag == "equal":
+                assert a[i1:i2] == b[j1:j2]
+            rebuilt += b[j1:j2]
+            i, j = i2, j2
+        assert (i, j) == (len(a), len(b)) and rebuilt == b
+
+
+def test_long_texts_render_back_section_by_section():
+    original = " ".join(f"Sentence {n} says something." for n in range(200))
+    result = original.replace("Sentence 50 says", "Sentence fifty now says").replace("Sentence 120 says something. ", "")
+    diff = diff_texts(original, result, section_size=30)
+    assert diff["stats"] == {"kept": 198, "changed": 1, "removed": 1, "added": 0}
+    assert len(diff["sections"]) > 1
+    left = right = ""
+    for index in range(len(diff["sections"])):
+        lsegs, rsegs = section_segments(diff, index)
+        left += "".join(text for text, _ in lsegs)
+        right += "".join(text for text, _ in rsegs)
+    assert (left, right) == (original, result)
+
+
+def test_diffs_are_memoized_and_ignore_reflowed_whitespace():
+    original, result = "One. Two. Three.", "One.  Two.\nThree."
+    diff = diff_texts(original, result)
+    assert diff_texts(original, result) is diff
+    assert diff["stats"]["kept"] == 3 and diff["stats"]["changed"] == 0
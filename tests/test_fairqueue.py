@@ -0,0 +1,55 @@
+import pytest
+
+from resonate.fairqueue import FairScheduler, QuotaExceeded
+
+
+def test_per_user_cap_leaves_room_for_others():
+    scheduler = FairScheduler(max_concurrent=4, per_user_concurrent=2)
+    greedy = [scheduler._request("greedy") for _ in range(3)]
+    other = scheduler._request("other")
+    assert [w.done() for w in greedy] == [True, True, False]
+    assert other.done()
+    assert scheduler.snapshot() == {"active": 3, "queued": 1, "users_waiting": 1}
+    # A freed slot goes to the waiting request, not past the cap
+    scheduler._release("greedy")
+    assert greedy[2].done()
+
+
+def test_slots_rotate_between_users():
+    scheduler = FairScheduler(max_concurrent=1)
+    served = []
+    running = scheduler._request("a")
+    for name in ("a1", "a2", "b1"):
+        scheduler._request(name[0]).add_done_callback(lambda _, name=name: served.append(name))
+    assert running.done() and not served
+    for user in ("a", "a", "b", "a"):
+        scheduler._release(user)
+    # b's one request isn't stuck behind a's second
+    assert served == ["a1", "b1", "a2"]
+
+
+def test_slot_context_manager_releases_on_error():
+    scheduler = FairScheduler(max_concurrent=1)
+    with pytest.raises(ValueError):
+        with scheduler.slot("me"):
+            raise ValueError("boom")
+    assert scheduler.snapshot()["active"] == 0
+
+
+def test_quota_rejects_past_the_window_limit():
+    scheduler = FairScheduler(quota=2, quota_window=60.0)
+    scheduler.charge("me")
+    scheduler.charge("me")
+    with pytest.raises(QuotaExceeded) as err:
+        scheduler.charge("me")
+    assert err.value.user == "me" and 0 < err.value.retry_after <= 60
+    assert scheduler.usage("me") == (2, 2)
+    # Quotas are per user
+    scheduler.charge("you")
+
+
+def test_no_quota_means_no_limit():
+    scheduler = FairScheduler()
+    for _ in range(100):
+        scheduler.charge("me")
+    assert scheduler.usage("me") == (0, None)
@@ -0,0 +1,45 @@
+import codecs
+import io
+
+from resonate.files import READ_BLOCK, ingest
+
+
+def parse(data, name="doc.txt", **kwargs):
+    return ingest(io.BytesIO(data), name, **kwargs)["text"]
+
+
+def test_utf8_and_boms():
+    assert parse("naïve café 😀".encode("utf-8")) == "naïve café 😀"
+    assert parse(codecs.BOM_UTF8 + "café".encode("utf-8")) == "café"
+    assert parse("Grüße".encode("utf-16")) == "Grüße"
+
+
+def test_cp1252_file():
+    assert parse("Déjà vu — “quoted”".encode("cp1252")) == "Déjà vu — “quoted”"
+
+
+def test_utf8_char_split_across_blocks():
+    text = "a" * (READ_BLOCK - 1) + "é" + " and more"
+    assert parse(text.encode("utf-8")) == text
+
+
+def test_non_utf8_bytes_after_the_first_block_are_redetected():
+    # Looks like UTF-8 for the first 64 KB, then turns out to be cp1252
+    head = "plain text, " * (READ_BLOCK // 12 + 10)
+    tail = "Le café était très crème brûlée. " * 20
+    text = parse(head.encode("ascii") + tail.encode("cp1252"))
+    assert "�" not in text
+    assert text == (head + tail).strip()
+
+
+def test_redetect_keeps_utf8_decoded_before_the_bad_byte():
+    head = "naïve " * (READ_BLOCK // 6 + 10)
+    tail = "Ça coûte 5€."
+    text = parse(head.encode("utf-8") + tail.encode("cp1252"))
+    assert text.startswith("naïve naïve") and text.count("naïve") == head.count("naïve")
+    assert text.endswith("Ça coûte 5€.")
+
+
+def test_txt_stops_at_the_byte_limit():
+    result = ingest(io.BytesIO(b"x" * 1000), "big.txt", max_bytes=100)
+    assert result["truncated"] and len(result["text"]) == 100
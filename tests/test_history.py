@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from resonate.history import PREVIEW_CHARS, HistoryStore, fts_query
+
+
+def fill(store, session, texts, **kwargs):
+    return [store.add(session, f"draft {text}", text, "1,2,3,4,5", "Style", **kwargs) for text in texts]
+
+
+def test_fts_query_quotes_terms():
+    assert fts_query('growth AND "AI') == '"growth" "AND" "AI"*'
+    assert fts_query("  ?! ") is None
+
+
+def test_search_is_scoped_to_the_session():
+    store = HistoryStore(None)
+    fill(store, "me", ["Quarterly growth was strong", "Team offsite recap", "Hiring plan for growth"])
+    fill(store, "you", ["Growth everywhere"])
+    assert store.count("me") == 3
+    assert store.count("me", query="growth") == 2
+    # Prefix match on the last term, as the user types
+    assert store.count("me", query="quart") == 1
+    assert store.count("me", query="draft offsite") == 1
+    assert store.count("me", query='") OR 1=1 --') == 0
+
+
+def test_search_without_fts_falls_back_to_like():
+    store = HistoryStore(None)
+    store.has_fts = False
+    fill(store, "me", ["Quarterly growth", "Offsite"])
+    assert store.count("me", query="growth") == 1
+
+
+def test_pages_are_newest_first_with_previews():
+    store = HistoryStore(None)
+    ids = fill(store, "me", [f"entry {n} " + "x" * 300 for n in range(7)])
+    first, second = store.page("me", 0, 5), store.page("me", 5, 5)
+    assert [row["id"] for row in first + second] == ids[::-1]
+    assert len(first[0]["preview"]) == PREVIEW_CHARS
+    assert store.get(ids[0])["transformed"].startswith("entry 0 ")
+
+
+def test_filters():
+    store = HistoryStore(None)
+    fill(store, "me", ["one"], persona="Pirate 🏴‍☠️", platform="SMS 📱")
+    fill(store, "me", ["two"], persona="Pirate 🏴‍☠️", platform="Email 📧")
+    assert store.count("me", persona="Pirate 🏴‍☠️") == 2
+    assert [row["preview"] for row in store.page("me", platform="Email 📧")] == ["two"]
+
+
+def test_retention(monkeypatch):
+    store = HistoryStore(None, max_rows_per_session=3, max_age_days=1, compact_every=0)
+    ids = fill(store, "me", [f"n{n}" for n in range(5)])
+    assert [row["id"] for row in store.page("me")] == ids[:1:-1]
+    # Deleted rows leave the search index too
+    assert store.count("me", query="n0") == 0
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 2 * 86400)
+    assert store.compact() == 3
+    assert store.count("me") == 0
+
+
+@pytest.mark.parametrize("compact_every", [0, 2])
+def test_clear(compact_every):
+    store = HistoryStore(None, compact_every=compact_every)
+    fill(store, "me", ["a", "b"])
+    fill(store, "you", ["c"])
+    store.clear("me")
+    assert store.count("me") == 0 and store.count("you", query="c") == 1
@@ -0,0 +1,101 @@
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from resonate.http_client import HttpClient, parse_retry_after
+
+
+class Scripted(BaseHTTPRequestHandler):
+    # Answers with the server's script in order: (status, headers, delay); 200 once it runs out
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with self.server.lock:
+            self.server.seen.append((time.monotonic(), self.client_address[1]))
+            status, headers, delay = self.server.script.pop(0) if self.server.script else (200, {}, 0)
+        time.sleep(delay)
+        body = b'{"ok": true}'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Scripted)
+    srv.daemon_threads = True
+    srv.script, srv.seen, srv.lock = [], [], threading.Lock()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    srv.url = f"http://127.0.0.1:{srv.server_port}/v1/chat/completions"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def client(**kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    return HttpClient(**kwargs)
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retryable_statuses_are_retried(server, status):
+    server.script = [(status, {}, 0), (status, {}, 0)]
+    response = client().post(server.url, json={})
+    assert response.status_code == 200 and response.attempts == 3
+    assert len(server.seen) == 3
+
+
+def test_retry_after_sets_the_delay(server):
+    server.script = [(429, {"Retry-After": "0.3"}, 0)]
+    response = client().post(server.url, json={})
+    assert response.status_code == 200
+    (first, _), (second, _) = server.seen
+    assert second - first >= 0.3
+
+
+def test_retries_stop_at_the_limit(server):
+    server.script = [(503, {}, 0)] * 5
+    response = client(max_retries=2).post(server.url, json={})
+    assert response.status_code == 503 and response.attempts == 3
+    assert len(server.seen) == 3
+
+
+def test_other_client_errors_are_not_retried(server):
+    server.script = [(400, {}, 0)]
+    response = client().post(server.url, json={})
+    assert response.status_code == 400 and response.attempts == 1
+    assert len(server.seen) == 1
+
+
+def test_read_timeouts_are_retried_then_raised(server):
+    server.script = [(200, {}, 0.5)] * 3
+    with pytest.raises(requests.Timeout):
+        client(max_retries=1, read_timeout=0.1).post(server.url, json={})
+    assert len(server.seen) == 2
+
+
+def test_connections_are_reused(server):
+    http = client()
+    for _ in range(5):
+        assert http.post(server.url, json={}).status_code == 200
+    # One keep-alive connection, so every request came from the same client port
+    assert len({port for _, port in server.seen}) == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("-5") == 0.0
+    assert 50 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after("soon") is None and parse_retry_after(None) is None
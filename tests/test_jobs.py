@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+
+from resonate.jobs import JobQueue, TooManyJobs
+
+
+def wait_for(queue, job_id, timeout=5):
+    queue._jobs[job_id].future.result(timeout=timeout)
+    return queue.get(job_id)
+
+
+def test_items_show_up_while_the_job_runs():
+    queue = JobQueue(max_workers=1)
+    first_in, finish = threading.Event(), threading.Event()
+
+    def batch(job):
+        job.add_item({"n": 1})
+        first_in.set()
+        finish.wait(5)
+        job.add_item({"n": 2})
+        return "done"
+
+    job_id = queue.submit("me", batch, kind="batch")
+    first_in.wait(5)
+    running = queue.get(job_id)
+    assert running["status"] == "running" and running["items"] == [{"n": 1}]
+    finish.set()
+    done = wait_for(queue, job_id)
+    assert done["kind"] == "batch" and done["items"] == [{"n": 1}, {"n": 2}]
+
+
+def blocker():
+    release = threading.Event()
+
+    def job(j):
+        j.report("working")
+        j.stream("par")
+        j.stream("tial")
+        release.wait(5)
+        return "ok"
+
+    return release, job
+
+
+def test_polling_sees_progress_and_the_result():
+    queue = JobQueue(max_workers=1)
+    release, job = blocker()
+    saved = []
+    job_id = queue.submit("me", job, label="first", on_done=lambda j, result: saved.append(result) or 42)
+    while queue.get(job_id)["partial"] != "partial":
+        threading.Event().wait(0.01)
+    running = queue.get(job_id)
+    assert running["status"] == "running" and running["progress"] == "working" and running["result"] is None
+    release.set()
+    done = wait_for(queue, job_id)
+    assert done["status"] == "done" and done["result"] == "ok" and done["history_id"] == 42 and saved == ["ok"]
+
+
+def test_jobs_are_listed_newest_first_per_user():
+    queue = JobQueue(max_workers=2)
+    ids = [queue.submit("me", lambda j: n, label=str(n)) for n in range(3)]
+    other = queue.submit("you", lambda j: "x")
+    for job_id in ids + [other]:
+        wait_for(queue, job_id)
+    assert [job["id"] for job in queue.jobs("me")] == ids[::-1]
+    assert [job["id"] for job in queue.jobs("you")] == [other]
+    assert queue.snapshot()["done"] == 4
+
+
+def test_cancel_a_queued_job():
+    queue = JobQueue(max_workers=1)
+    release, job = blocker()
+    running = queue.submit("me", job)
+    ran = []
+    queued = queue.submit("me", lambda j: ran.append(1))
+    assert not queue.cancel(queued, user="you")
+    assert queue.cancel(queued, user="me")
+    assert queue.get(queued)["status"] == "cancelled" and not queue.cancel(queued)
+    release.set()
+    wait_for(queue, running)
+    queue.shutdown()
+    assert ran == []
+
+
+def test_a_failed_job_reports_its_error():
+    queue = JobQueue()
+
+    def broken(job):
+        raise RuntimeError("backend down")
+
+    failed = wait_for(queue, queue.submit("me", broken))
+    assert failed["status"] == "failed" and failed["error"] == "backend down"
+
+
+def test_limits_per_user_and_pruning():
+    queue = JobQueue(max_workers=4, max_per_user=2, keep_finished=2)
+    release, job = blocker()
+    active = [queue.submit("me", job), queue.submit("me", job)]
+    with pytest.raises(TooManyJobs):
+        queue.submit("me", job)
+    queue.submit("you", lambda j: None)
+    release.set()
+    for job_id in active:
+        wait_for(queue, job_id)
+    finished = []
+    for _ in range(3):
+        finished.append(queue.submit("me", lambda j: None))
+        wait_for(queue, finished[-1])
+    latest = queue.submit("me", lambda j: None)
+    # Only the newest finished jobs are kept when another is submitted
+    assert {job["id"] for job in queue.jobs("me")} == {finished[-2], finished[-1], latest}
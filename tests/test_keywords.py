@@ -0,0 +1,48 @@
+import pytest
+
+from resonate.keywords import keyword_hits, light_stem, parse_keywords
+
+
+@pytest.mark.parametrize("word, base", [
+    ("campaigns", "campaign"), ("campaigning", "campaign"), ("companies", "company"), ("company's", "company"),
+    ("apps", "app"), ("launched", "launch"), ("boxes", "box"),
+    ("loved", "love"), ("loving", "love"), ("hoping", "hope"), ("coded", "code"), ("making", "make"),
+    ("buses", "bus"), ("gases", "gas"), ("agreed", "agree"), ("seeing", "see"),
+])
+def test_inflections_share_a_stem(word, base):
+    assert light_stem(word) == light_stem(base)
+
+
+@pytest.mark.parametrize("word", ["news", "does", "goes", "this", "series", "lens", "bus", "analysis"])
+def test_words_that_only_look_plural_keep_their_s(word):
+    assert light_stem(word) == word
+
+
+def count(text, keyword, stem=True):
+    return keyword_hits(text, [keyword], stem=stem)[0]["count"]
+
+
+def test_no_false_hits_from_a_trailing_s():
+    assert count("Big news today.", "new") == 0
+    assert count("It does work.", "doe") == 0
+    assert count("Two new campaigns.", "campaign") == 1
+
+
+def test_silent_e_words_match_their_inflections():
+    text = "We loved it and keep loving it. Hoping. Code coded coding."
+    assert [hit["count"] for hit in keyword_hits(text, ["love", "hope", "code"])] == [2, 1, 3]
+    assert count("Two buses and some gases.", "bus") == 1
+    assert count("Two buses and some gases.", "gas") == 1
+
+
+def test_stemming_can_be_turned_off():
+    assert count("Our campaigns are campaigning.", "campaign", stem=False) == 0
+    assert count("One campaign, Campaign two.", "campaign", stem=False) == 2
+
+
+def test_matches_never_start_inside_a_word():
+    assert count("She said it was AI-driven.", "AI") == 1
+
+
+def test_parse_keywords_drops_blanks_and_repeats():
+    assert parse_keywords("AI, growth, , Growth") == ["AI", "growth"]
@@ -0,0 +1,86 @@
+import pytest
+
+from resonate import Engine
+from resonate.backends import FakeBackend
+from resonate.engine import DocumentFailed
+from resonate.longdoc import aggregate_scores, split_into_chunks
+from resonate.tokens import count_tokens
+
+HINDI = "यह एक लंबा दस्तावेज़ है जिसमें कई वाक्य हैं और हर वाक्य कुछ नया कहता है। "
+
+
+def test_chunks_fit_the_token_budget_in_any_script():
+    for text in ("The quick brown fox jumps over the lazy dog. " * 400, HINDI * 200):
+        chunks = split_into_chunks(text, 300)
+        assert len(chunks) > 1
+        assert all(count_tokens(chunk) <= 300 for chunk in chunks)
+
+
+def test_paragraphs_stay_whole_when_they_fit():
+    text = "First paragraph.\n\nSecond paragraph.\n\nThird one."
+    assert split_into_chunks(text, 600) == ["First paragraph.\n\nSecond paragraph.\n\nThird one."]
+
+
+def test_nothing_is_lost_between_chunks():
+    text = " ".join(f"Sentence number {i} is here." for i in range(300))
+    assert " ".join(split_into_chunks(text, 100)).split() == text.split()
+
+
+def test_aggregate_scores_skips_failed_chunks():
+    assert aggregate_scores(["80,80,80,80,80", None, "40,40,40,40,40"], [3, 5, 1]) == "70,70,70,70,70"
+    assert aggregate_scores([None], [1]) == "0,0,0,0,0"
+
+
+def test_cjk_text_splits_on_its_own_sentence_ends():
+    text = "这是一个很长的文档中的一句话，用来测试分块。" * 400
+    chunks = split_into_chunks(text, 300)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 300 for chunk in chunks)
+    assert all(chunk.endswith("。") for chunk in chunks)
+    assert "".join("".join(chunks).split()) == text
+
+
+def test_text_without_any_break_is_cut_by_characters():
+    text = "长" * 3000
+    chunks = split_into_chunks(text, 200)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 200 for chunk in chunks)
+    assert "".join(chunks) == text
+
+
+class FlakyBackend(FakeBackend):
+    # Fails the part mentioning `marker` its first `failures` times
+    def __init__(self, marker, failures):
+        super().__init__()
+        self.marker = marker
+        self.failures = failures
+
+    async def acomplete(self, messages, max_tokens):
+        if self.marker in messages[-1]["content"] and self.failures:
+            self.failures -= 1
+            return {"error": "API Error 503"}
+        return await super().acomplete(messages, max_tokens)
+
+
+DOCUMENT = "\n\n".join(f"Paragraph {i} has a few words in it." for i in range(6))
+OPTIONS = ("Professional 👔", "Standard Text 📄", "None 🚫", "Concise", "Neutral", "English", "", "")
+
+
+def run_document(backend, **kwargs):
+    engine = Engine("x", backend=backend, cache_path=None)
+    return engine.execute_long_document(DOCUMENT, *OPTIONS, max_chunk_tokens=10, max_workers=2, rate=0, **kwargs)
+
+
+def test_a_failed_part_is_retried():
+    # Parts 2 and 3 both mention it (part 3 in its continuity note), so each fails once
+    res, _ = run_document(FlakyBackend("Paragraph 2", failures=2))
+    assert all(f"Text: \"Paragraph {i} " in res for i in range(6)) and "❌" not in res
+
+
+def test_a_part_that_keeps_failing_fails_the_document():
+    landed = []
+    with pytest.raises(DocumentFailed) as err:
+        run_document(FlakyBackend("Paragraph 2", failures=99), on_chunk=lambda index, *_: landed.append(index))
+    assert err.value.failed == [2, 3] and err.value.total == 6
+    assert "API Error 503" in str(err.value)
+    assert sorted(landed) == [0, 1, 4, 5]
@@ -0,0 +1,39 @@
+import itertools
+
+from resonate.prompts import (
+    EMOJI_LEVELS, LENGTHS, MAX_OUTPUT_TOKENS, PERSONAS, PLATFORMS, PROMPT_TEMPLATES, SCORES_RULE, SCORES_TOKENS,
+    output_budget, prepare_transformation,
+)
+
+OPTIONS = ("Professional 👔", "LinkedIn 🔵", "Sparse 🤏", "Concise", "Inspiring", "English")
+
+
+def test_every_combination_has_a_precompiled_template():
+    assert set(PROMPT_TEMPLATES) == set(itertools.product(PERSONAS, PLATFORMS, EMOJI_LEVELS, LENGTHS))
+
+
+def test_system_prompt_starts_with_the_template():
+    messages, inputs = prepare_transformation("Hello world.", *OPTIONS, "Keep it short", "growth, AI")
+    system = messages[0]["content"]
+    assert system.startswith(PROMPT_TEMPLATES[OPTIONS[:4]])
+    assert "Atmosphere: Inspiring." in system and "Additional constraint: Keep it short." in system
+    assert "growth, AI" in system
+    assert messages[1] == {"role": "user", "content": 'Text: "Hello world."'}
+    assert inputs["text"] == "Hello world." and inputs["max_tokens"] == output_budget("LinkedIn 🔵", "Concise", "English", 3)
+
+
+def test_scores_are_only_requested_when_asked():
+    local, local_inputs = prepare_transformation("Hello world.", *OPTIONS, "", "")
+    llm, llm_inputs = prepare_transformation("Hello world.", *OPTIONS, "", "", llm_scores=True)
+    assert SCORES_RULE not in local[0]["content"] and llm[0]["content"].endswith(SCORES_RULE)
+    assert llm_inputs["max_tokens"] == local_inputs["max_tokens"] + SCORES_TOKENS
+
+
+def test_cosmetic_whitespace_does_not_change_the_request():
+    assert prepare_transformation("Hello world.  \r\n\r\n", *OPTIONS, " ", "") == prepare_transformation("Hello world.", *OPTIONS, "", "")
+
+
+def test_output_budget_follows_the_format():
+    assert output_budget("SMS 📱", "Concise") < output_budget("YouTube Script 🎬", "Detailed")
+    assert output_budget("SMS 📱", "Concise", draft_tokens=5000) == output_budget("SMS 📱", "Concise")
+    assert output_budget("Standard Text 📄", "Detailed", "Hindi", draft_tokens=5000) == MAX_OUTPUT_TOKENS
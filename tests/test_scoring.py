@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("textblob")
+pytest.importorskip("textstat")
+
+from resonate.scoring import SCORE_DIMENSIONS, score_frame
+
+# (text, {dimension: (low, high)}): fixed references, loose enough to survive lexicon tweaks
+REFERENCES = [
+    ("Thanks for the update! I'll review the proposal tomorrow.",
+     {"Energy": (40, 75), "Professionalism": (40, 80)}),
+    ("Big news! We're launching today.",
+     {"Energy": (50, 90), "Professionalism": (30, 70)}),
+    ("Running late, be there in 10.",
+     {"Energy": (25, 60), "Professionalism": (35, 75)}),
+    ("The meeting is on Tuesday at 3 pm in room 4. Please bring the report.",
+     {"Clarity": (80, 100), "Energy": (20, 50), "Professionalism": (50, 85)}),
+    ("Dear stakeholders, regarding the quarterly analysis, we recommend a phased implementation. "
+     "Furthermore, we will ensure all deliverables are evaluated. Sincerely, the strategy team.",
+     {"Professionalism": (85, 100), "Energy": (30, 65)}),
+    ("OMG this is AMAZING!!! 🚀🔥 We are launching TODAY and it's gonna be epic, let's go!!! You will love it! 🎉",
+     {"Energy": (85, 100), "Professionalism": (0, 25)}),
+]
+
+
+@pytest.mark.parametrize("text,expected", REFERENCES)
+def test_reference_scores(text, expected):
+    scores = score_frame([text]).iloc[0]
+    for dimension, (low, high) in expected.items():
+        assert low <= scores[dimension] <= high, f"{dimension}={scores[dimension]} for {text!r}"
+
+
+def test_short_replies_stay_off_the_rails():
+    # One "!" in a ten-word reply mustn't pin anything to 0 or 100
+    scores = score_frame(["Thanks for the update! I'll review the proposal tomorrow.", "Big news! We're launching today."])
+    assert ((scores[SCORE_DIMENSIONS] > 0) & (scores[SCORE_DIMENSIONS] < 100)).all().all()
+
+
+def test_empty_text_is_the_no_data_sentinel():
+    assert score_frame([""]).iloc[0].tolist() == [0, 0, 0, 0, 0]
@@ -0,0 +1,105 @@
+import threading
+import time
+
+from resonate import Engine
+from resonate.backends import FakeBackend
+from resonate.fairqueue import FairScheduler
+from resonate.singleflight import SingleFlight
+
+MESSAGES = [{"role": "system", "content": "Rewrite it."}, {"role": "user", "content": 'Text: "Hello world, this is one shared draft."'}]
+INPUTS = {"text": "Hello world, this is one shared draft."}
+
+
+class CountingBackend(FakeBackend):
+    def __init__(self, latency=0.3):
+        super().__init__(latency=latency)
+        self.calls = 0
+
+    def complete(self, messages, max_tokens):
+        with self._lock:
+            self.calls += 1
+        return super().complete(messages, max_tokens)
+
+
+def run_together(n, fn):
+    # Starts n threads at once and returns their results in order
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        results[i] = fn(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    return results
+
+
+def test_concurrent_identical_calls_make_one_upstream_call():
+    backend = CountingBackend()
+    engine = Engine("x", backend=backend, cache_path=None)
+    outputs = run_together(8, lambda i: engine.cached_query_ai(MESSAGES, INPUTS, user=f"user-{i}"))
+    assert backend.calls == 1
+    assert all(output == outputs[0] for output in outputs)
+
+
+def test_streamed_deltas_reach_followers():
+    engine = Engine("x", backend=CountingBackend(), cache_path=None)
+    streams = [[] for _ in range(4)]
+    outputs = run_together(4, lambda i: engine.cached_query_ai(MESSAGES, INPUTS, on_delta=streams[i].append))
+    content = outputs[0]["choices"][0]["message"]["content"]
+    for parts in streams:
+        assert "".join(parts) == content
+
+
+def test_a_leader_exception_reaches_every_follower():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, errors = [], []
+
+    def failing(publish):
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise RuntimeError("upstream fell over")
+
+    def caller():
+        try:
+            flights.run("key", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=caller) for _ in range(3)]
+    for t in followers:
+        t.start()
+    time.sleep(0.2)
+    release.set()
+    for t in [leader] + followers:
+        t.join(timeout=5)
+    assert len(calls) == 1
+    assert errors == ["upstream fell over"] * 4
+    assert flights.in_flight() == 0
+
+
+def test_only_the_leader_is_charged():
+    scheduler = FairScheduler(quota=5)
+    engine = Engine("x", backend=CountingBackend(), cache_path=None, scheduler=scheduler)
+    run_together(4, lambda i: engine.cached_query_ai(MESSAGES, INPUTS, user=f"user-{i}"))
+    assert sum(scheduler.usage(f"user-{i}")[0] for i in range(4)) == 1
+
+
+def test_quota_rejection_comes_back_as_an_error():
+    scheduler = FairScheduler(quota=1)
+    engine = Engine("x", backend=CountingBackend(latency=0.0), cache_path=None, scheduler=scheduler)
+    assert "choices" in engine.cached_query_ai(MESSAGES, INPUTS, user="me")
+    other = [MESSAGES[0], {"role": "user", "content": 'Text: "Something else."'}]
+    output = engine.cached_query_ai(other, {"text": "Something else."}, user="me")
+    assert output["error"].startswith("Quota exceeded")
+    # Cache hits cost nothing
+    assert "choices" in engine.cached_query_ai(MESSAGES, INPUTS, user="me")
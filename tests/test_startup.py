@@ -0,0 +1,20 @@
+import json
+import subprocess
+import sys
+
+from benchmarks.startup import HEAVY_MODULES
+
+# Everything the app and CLI import up front; the NumPy-backed scorer is only loaded on first use
+EAGER = ("resonate", "resonate.cli", "resonate.jobs", "resonate.analysis", "resonate.history", "resonate.diff",
+         "resonate.files", "resonate.keywords", "resonate.longdoc", "resonate.tts")
+
+
+def test_importing_the_core_loads_no_heavy_modules():
+    script = (
+        f"import importlib, json, sys\n"
+        f"for name in {EAGER!r}:\n"
+        f"    importlib.import_module(name)\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=120, check=True).stdout
+    assert json.loads(out) == []
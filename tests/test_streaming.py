@@ -0,0 +1,71 @@
+from resonate.streaming import ScoresStreamParser, extract_scores, iter_sse_deltas
+
+
+class FakeStream:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+
+def stream(deltas):
+    parser = ScoresStreamParser()
+    shown = "".join(parser.feed(delta) for delta in deltas)
+    return parser, shown
+
+
+def test_marker_split_across_deltas_is_never_shown():
+    deltas = ["Big news", " today!\n[SC", "OR", "ES] 80, 7", "0, 65, 90, 55"]
+    parser, shown = stream(deltas)
+    assert shown == "Big news today!\n"
+    assert parser.finish() == ("Big news today!", "80,70,65,90,55")
+
+
+def test_marker_split_one_character_at_a_time():
+    raw = "Short and sweet. [SCORES] 1,2,3,4,5"
+    parser, shown = stream(list(raw))
+    assert "[" not in shown and shown.strip() == "Short and sweet."
+    assert parser.finish() == ("Short and sweet.", "1,2,3,4,5")
+
+
+def test_text_that_only_looks_like_the_marker_is_released():
+    parser, shown = stream(["Use [SC", "ALE] wisely"])
+    assert shown == "Use [SCALE] wisely"
+    assert parser.finish() == ("Use [SCALE] wisely", None)
+
+
+def test_missing_scores_line():
+    parser, shown = stream(["No scores ", "here at all."])
+    assert shown == "No scores here at all."
+    assert parser.finish() == ("No scores here at all.", None)
+
+
+def test_marker_without_enough_scores():
+    parser, shown = stream(["Text [SCORES] 10, 20"])
+    assert shown == "Text "
+    assert parser.finish() == ("Text [SCORES] 10, 20", None)
+    # The caller falls back to extract_scores, which finds nothing either
+    assert extract_scores(parser.raw)[1] is None
+
+
+def test_done_with_no_content():
+    usage, finish = {}, {}
+    lines = [
+        "",
+        ": keep-alive",
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+        'data: {"choices": [{"delta": {}, "finish_reason": "stop"}]}',
+        'data: {"choices": [], "usage": {"completion_tokens": 0}}',
+        "data: [DONE]",
+        'data: {"choices": [{"delta": {"content": "after done"}}]}',
+    ]
+    assert list(iter_sse_deltas(FakeStream(lines), usage, finish)) == []
+    assert finish == {"reason": "stop"} and usage == {"completion_tokens": 0}
+    parser = ScoresStreamParser()
+    assert parser.finish() == ("", None)
+
+
+def test_bad_json_lines_are_skipped():
+    lines = ["data: {not json", 'data: {"choices": [{"delta": {"content": "ok"}}]}', "data: [DONE]"]
+    assert list(iter_sse_deltas(FakeStream(lines))) == ["ok"]
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from resonate import Engine
+from resonate.backends import FakeBackend
+from resonate.tracing import Tracer, percentile, tracer
+
+
+def test_percentile():
+    assert percentile([], 95) == 0.0
+    assert percentile(list(range(1, 101)), 50) == 50 and percentile(list(range(1, 101)), 95) == 95
+
+
+def test_spans_nest_and_tokens_roll_up_to_the_run():
+    t = Tracer()
+
+    async def call():
+        # Fanned-out work still lands on the run that started it
+        with t.span("http"):
+            t.add_tokens(10, 4)
+
+    with t.span("transform", run=True) as run:
+        with t.span("prepare") as child:
+            assert child.parent_id == run.span_id and child.trace_id == run.span_id
+        asyncio.run(call())
+        asyncio.run(asyncio.to_thread(t.add_tokens, 1, 1))
+
+    snap = t.snapshot()
+    assert snap["runs"][-1]["prompt_tokens"] == 11 and snap["runs"][-1]["completion_tokens"] == 5
+    assert snap["counters"]["tokens.prompt"] == 11
+    assert {"transform", "prepare", "http"} <= set(snap["spans"])
+    assert t.current() is None
+
+
+def test_errors_are_counted_and_reraised():
+    t = Tracer()
+    with pytest.raises(ValueError):
+        with t.span("parse"):
+            raise ValueError("bad")
+    with t.span("query") as span:
+        span.fail("API Error 503")
+    spans = t.snapshot()["spans"]
+    assert spans["parse"]["errors"] == 1 and spans["query"]["errors"] == 1
+
+
+def test_export_and_prometheus(tmp_path):
+    trace, metrics = tmp_path / "spans.jsonl", tmp_path / "metrics.prom"
+    t = Tracer(export_path=str(trace), metrics_path=str(metrics), flush_every=100)
+    with t.span("transform", run=True, platform="SMS"):
+        t.incr("cache.hits")
+    # Metrics are rewritten when a run ends; spans wait for a flush
+    assert 'resonate_span_duration_ms_count{span="transform"} 1' in metrics.read_text()
+    assert "resonate_cache_hits_total 1" in metrics.read_text()
+    t.flush()
+    (row,) = [json.loads(line) for line in trace.read_text().splitlines()]
+    assert row["name"] == "transform" and row["attrs"] == {"platform": "SMS"}
+
+
+def test_engine_run_records_its_tokens():
+    engine = Engine("", backend=FakeBackend())
+    res, data = engine.execute_transformation("Tokens please.", "Professional 👔", "SMS 📱", "None 🚫", "Concise", "Neutral", "English", "", "")
+    assert res and data
+    run = list(tracer.runs)[-1]
+    assert run["name"] == "transform" and run["prompt_tokens"] > 0 and run["completion_tokens"] > 0
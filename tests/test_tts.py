@@ -0,0 +1,64 @@
+import io
+import wave
+
+from resonate import tts
+from resonate.tts import AudioCache, synthesize
+
+TEXT = " ".join(f"This is sentence number {n} of a narration that spans several speech chunks." for n in range(20))
+
+
+def make_wav(text):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"\x00\x00" * len(text))
+    return buf.getvalue()
+
+
+class FakeTTS:
+    def __init__(self, fmt):
+        self.fmt = fmt
+        self.calls = []
+
+    async def aquery_audio(self, text):
+        self.calls.append(text)
+        if self.fmt == "down":
+            return None
+        return make_wav(text) if self.fmt == "wav" else b"fLaC" + text.encode()
+
+
+def run(fmt, monkeypatch):
+    gtts_calls = []
+    monkeypatch.setattr(tts, "_gtts_bytes", lambda text: gtts_calls.append(text) or b"ID3\x00\x00\x00\x00\x00\x00\x00mp3")
+    engine, chunks = FakeTTS(fmt), []
+    parts, mime = synthesize(engine, TEXT, on_chunk=lambda *args: chunks.append(args), cache=AudioCache())
+    return engine, gtts_calls, chunks, parts, mime
+
+
+def test_flac_chunks_play_as_sequential_parts(monkeypatch):
+    total = len(tts.split_for_speech(TEXT))
+    assert total > 1
+    engine, gtts_calls, chunks, parts, mime = run("flac", monkeypatch)
+    # One request per chunk, nothing synthesized twice and no gTTS
+    assert len(engine.calls) == total and not gtts_calls
+    assert mime == "audio/flac" and len(parts) == total and all(part.startswith(b"fLaC") for part in parts)
+    assert parts[0] == b"fLaC" + tts.split_for_speech(TEXT)[0].encode()
+    assert sorted(index for index, *_ in chunks) == list(range(total))
+    assert {(chunk_total, chunk_mime) for _, chunk_total, _, chunk_mime in chunks} == {(total, "audio/flac")}
+
+
+def test_wav_chunks_are_stitched(monkeypatch):
+    engine, gtts_calls, chunks, parts, mime = run("wav", monkeypatch)
+    total = len(tts.split_for_speech(TEXT))
+    assert len(engine.calls) == total and not gtts_calls
+    assert mime == "audio/wav" and len(parts) == 1 and tts.is_wav(parts[0])
+    assert sorted(index for index, *_ in chunks) == list(range(total))
+    assert {chunk_mime for *_, chunk_mime in chunks} == {"audio/wav"}
+
+
+def test_gtts_narrates_everything_when_the_neural_voice_fails(monkeypatch):
+    engine, gtts_calls, chunks, parts, mime = run("down", monkeypatch)
+    assert len(gtts_calls) == len(tts.split_for_speech(TEXT))
+    assert mime == "audio/mpeg" and len(parts) == 1